@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Measure the encoding detection of file data over a corpus of mixed
+encoding files, the files under a directory or a generated one.
+
+    python benchmarks/encoding.py --size 4 --repeat 3
+    python benchmarks/encoding.py --dir /path/to/sources
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from qgitc.common import decodeFileData  # noqa: E402
+from qgitc.encodingdetector import EncodingDetector  # noqa: E402
+
+
+_texts = {
+    "ascii": "int main(int argc, char **argv) { return 0; }\n",
+    "utf-8": "/* 中文注释，日本語のコメント */ int value = 1;\n",
+    "gbk": "/* 这是一个中文注释 */ int value = 1;\n",
+    "shift_jis": "// 日本語のコメントです\nint value = 1;\n",
+    "cp1252": "/* résumé, naïve café */ int value = 1;\n",
+    "utf-16": "/* 中文注释 and some ascii */ int value = 1;\n",
+}
+
+
+def _generate(size):
+    corpus = []
+    for encoding, text in _texts.items():
+        data = text.encode(encoding)
+        count = max(1, size // len(data))
+        # utf-16 has the BOM only once
+        if encoding == "utf-16":
+            data = (text * count).encode(encoding)
+        else:
+            data = data * count
+        corpus.append((encoding, data))
+    return corpus
+
+
+def _readDir(dir, size):
+    corpus = []
+    for root, dirs, files in os.walk(dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read(size)
+            except OSError:
+                continue
+            if data and b'\0' not in data[:1024]:
+                corpus.append((os.path.relpath(path, dir), data))
+    return corpus
+
+
+def _legacyDecode(data, encoding="utf-8"):
+    """the decodeFileData before the detector, for comparing"""
+    try:
+        return data.decode(encoding), encoding
+    except UnicodeDecodeError:
+        pass
+
+    for e in ["gb18030", "utf16"]:
+        try:
+            return data.decode(e), e
+        except UnicodeDecodeError:
+            pass
+
+    import chardet
+    encoding = chardet.detect(data)["encoding"]
+    if encoding:
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            pass
+
+    return data.decode("utf-8", "replace"), None
+
+
+def _measure(func, corpus, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        for name, data in corpus:
+            func(name, data)
+        times.append((time.time() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="qgitc encoding detection benchmark")
+    parser.add_argument(
+        "--dir", metavar="<dir>",
+        help="Use the files under <dir> instead of the generated ones.")
+    parser.add_argument(
+        "--size", type=float, default=2,
+        help="Size in MB of each file, or the max to read with --dir.")
+    parser.add_argument(
+        "--repeat", "-n", type=int, default=3,
+        help="Number of runs for each method.")
+    parser.add_argument(
+        "--legacy", action="store_true",
+        help="Also measure the old detection, very slow for big files.")
+    args = parser.parse_args()
+
+    size = int(args.size * 1024 * 1024)
+    corpus = _readDir(args.dir, size) if args.dir else _generate(size)
+    if not corpus:
+        print("No file to detect")
+        return 1
+
+    total = sum(len(data) for _, data in corpus)
+    print("{} files, {:.1f} MB".format(len(corpus), total / 1024 / 1024))
+
+    # import it before measuring
+    import chardet  # noqa: F401
+
+    detector = EncodingDetector()
+    methods = [
+        ("detect", lambda name, data: EncodingDetector().detect(data)),
+        ("cached", lambda name, data: detector.detect(data, name)),
+        ("decode", lambda name, data: decodeFileData(data)),
+    ]
+    if args.legacy:
+        methods.append(("legacy", lambda name, data: _legacyDecode(data)))
+
+    print("{:<10}{:>10}{:>10}{:>10}".format(
+        "method", "min(ms)", "median", "max"))
+    for method, func in methods:
+        times = _measure(func, corpus, args.repeat)
+        print("{:<10}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+            method, min(times), statistics.median(times), max(times)))
+
+    print()
+    for name, data in corpus:
+        _, encoding = decodeFileData(data)
+        print("{:<40}{}".format(name[-40:], encoding))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
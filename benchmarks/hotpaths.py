@@ -0,0 +1,329 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Measure the fetch and parse hot paths over the generated repositories,
+each benchmark runs in its own process with the offscreen Qt platform.
+The records/sec, peak RSS and latency percentiles are written as JSON.
+
+    python -m benchmarks.hotpaths --shape linear merges --output out.json
+    python benchmarks/hotpaths.py --bench diff blame --scale 2
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.repogen import SHAPES, generateRepo  # noqa: E402
+
+
+BENCHES = ["log", "log-slim", "lanes", "refs", "diff", "blame", "find"]
+
+# the size of each read of the fetcher, about what QProcess gives
+CHUNK_SIZE = 65536
+# the commits to diff
+MAX_DIFF_COMMITS = 200
+FIND_PATTERNS = ["value", r"parse\(\w+", "not-found"]
+# the first one reads all the refs, the rest check for changes only
+REFS_REPEAT = 20
+
+
+def _peakRss():
+    """in KB, None if not supported"""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _percentiles(latencies):
+    if not latencies:
+        return {}
+
+    latencies = sorted(latencies)
+
+    def _at(p):
+        index = min(len(latencies) - 1, int(len(latencies) * p / 100))
+        return round(latencies[index] * 1000, 4)
+
+    return {"p50": _at(50), "p90": _at(90), "p99": _at(99),
+            "max": round(latencies[-1] * 1000, 4)}
+
+
+def _gitOutput(repoDir, args):
+    return subprocess.check_output(["git"] + args, cwd=repoDir)
+
+
+class _Output:
+    """Stands for the process of the fetcher, gives the output chunk
+    by chunk as the real one does"""
+
+    def __init__(self):
+        self.chunk = None
+
+    def readAllStandardOutput(self):
+        from PySide2.QtCore import QByteArray
+        return QByteArray(self.chunk)
+
+
+def _feed(fetcher, data):
+    """returns the latency of each chunk parsed by @fetcher"""
+    from PySide2.QtCore import QProcess
+
+    output = _Output()
+    fetcher._process = output
+    latencies = []
+    for i in range(0, len(data), CHUNK_SIZE):
+        output.chunk = data[i:i + CHUNK_SIZE]
+        start = time.perf_counter()
+        fetcher.onDataAvailable()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    fetcher.onDataFinished(0, QProcess.NormalExit)
+    latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def _benchLog(repoDir, file, slim=False):
+    from qgitc.logview import LogsFetcher
+
+    fetcher = LogsFetcher()
+    fetcher.slim = slim
+    records = []
+    fetcher.logsAvailable.connect(
+        lambda commits: records.append(len(commits)))
+
+    data = _gitOutput(repoDir, fetcher.makeArgs((None, ["--all"])))
+    latencies = _feed(fetcher, data)
+    return sum(records), latencies
+
+
+def _benchLogSlim(repoDir, file):
+    return _benchLog(repoDir, file, True)
+
+
+def _benchLanes(repoDir, file):
+    from qgitc.common import Commit, slim_log_fmt
+    from qgitc.lanes import Lanes
+
+    data = _gitOutput(repoDir, ["log", "-z", "--topo-order", "--parents",
+                                "--pretty=format:" + slim_log_fmt, "--all"])
+    commits = [Commit.fromSlimString(log)
+               for log in data.decode("utf-8").split('\0')]
+
+    lanes = Lanes()
+    latencies = []
+    for commit in commits:
+        start = time.perf_counter()
+        lanes.update(commit.sha1, commit.parents)
+        latencies.append(time.perf_counter() - start)
+
+    return len(commits), latencies
+
+
+def _benchRefs(repoDir, file):
+    from qgitc.gitutils import RefDatabase
+
+    records = 0
+    latencies = []
+    for _ in range(REFS_REPEAT):
+        start = time.perf_counter()
+        refMap = RefDatabase.load().refMap()
+        latencies.append(time.perf_counter() - start)
+        records += sum(len(refs) for refs in refMap.values())
+
+    return records, latencies
+
+
+def _benchDiff(repoDir, file):
+    from qgitc.diffview import DiffFetcher
+
+    fetcher = DiffFetcher()
+    records = []
+    fetcher.diffAvailable.connect(
+        lambda lineItems, fileItems: records.append(len(lineItems)))
+
+    sha1s = _gitOutput(repoDir, ["rev-list", "--all", "--max-count={0}"
+                                 .format(MAX_DIFF_COMMITS)]).split()
+    latencies = []
+    for sha1 in sha1s:
+        data = _gitOutput(repoDir, fetcher.makeArgs(
+            (sha1.decode(), None, None)))
+        fetcher.resetRow(0)
+        latencies.extend(_feed(fetcher, data))
+
+    return sum(records), latencies
+
+
+def _benchBlame(repoDir, file):
+    from qgitc.blameview import BlameFetcher
+
+    fetcher = BlameFetcher()
+    records = []
+    fetcher.dataAvailable.connect(lambda lines: records.append(len(lines)))
+
+    data = _gitOutput(repoDir, fetcher.makeArgs((file, "HEAD")))
+    latencies = _feed(fetcher, data)
+    return sum(records), latencies
+
+
+def _benchFind(repoDir, file):
+    from qgitc.common import decodeFileData
+    from qgitc.textviewer import FindFlags, TextViewer
+
+    with open(os.path.join(repoDir, file), "rb") as f:
+        text, _ = decodeFileData(f.read())
+
+    viewer = TextViewer()
+    viewer.appendLines(text.splitlines())
+
+    records = 0
+    latencies = []
+    for pattern in FIND_PATTERNS:
+        start = time.perf_counter()
+        viewer.findAll(pattern, FindFlags.UseRegExp)
+        latencies.append(time.perf_counter() - start)
+        records += viewer.textLineCount()
+
+    return records, latencies
+
+
+_benches = {
+    "log": _benchLog,
+    "log-slim": _benchLogSlim,
+    "lanes": _benchLanes,
+    "refs": _benchRefs,
+    "diff": _benchDiff,
+    "blame": _benchBlame,
+    "find": _benchFind,
+}
+
+
+def _child(bench, repoDir, file):
+    from qgitc.gitutils import Git
+    from qgitc.application import Application
+
+    Git.REPO_DIR = repoDir
+    app = Application(["qgitc"])  # noqa: F841
+
+    baseRss = _peakRss()
+    records, latencies = _benches[bench](repoDir, file)
+    seconds = sum(latencies)
+
+    result = {
+        "records": records,
+        "seconds": round(seconds, 6),
+        "recordsPerSec": round(records / seconds, 1) if seconds else None,
+        "baseRssKB": baseRss,
+        "peakRssKB": _peakRss(),
+        "latencyMs": _percentiles(latencies),
+    }
+    sys.stdout.write(json.dumps(result) + "\n")
+    sys.stdout.flush()
+    os._exit(0)
+
+
+def _run(bench, info, timeout):
+    file = info.bigFile if bench == "find" else info.blameFiles[0]
+    env = dict(os.environ)
+    env["QT_QPA_PLATFORM"] = "offscreen"
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child",
+         bench, info.path, file],
+        stderr=subprocess.DEVNULL,
+        cwd=info.path,
+        env=env,
+        universal_newlines=True,
+        timeout=timeout)
+
+    result = {"shape": info.shape, "bench": bench,
+              "commits": info.commits, "refs": info.refs}
+    result.update(json.loads(output.splitlines()[-1]))
+    return result
+
+
+def _gitVersion():
+    return subprocess.check_output(
+        ["git", "--version"], universal_newlines=True).strip()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child(*sys.argv[2:5])
+        return 1
+
+    parser = argparse.ArgumentParser(
+        description="qgitc fetch and parse benchmark")
+    parser.add_argument(
+        "--shape", nargs="+", choices=sorted(SHAPES),
+        default=list(SHAPES),
+        help="The repositories to generate, all by default.")
+    parser.add_argument(
+        "--bench", nargs="+", choices=BENCHES, default=BENCHES,
+        help="The benchmarks to run, all by default.")
+    parser.add_argument(
+        "--scale", type=int, default=1,
+        help="Multiply the commits or the file size of the repositories.")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed of the generated content.")
+    parser.add_argument(
+        "--dir", metavar="<dir>",
+        help="Keep the repositories under <dir> instead of a temp one.")
+    parser.add_argument(
+        "--output", "-o", metavar="<file>",
+        help="Write the JSON to <file> instead of the standard output.")
+    parser.add_argument(
+        "--timeout", type=int, default=600,
+        help="Seconds to wait for a single benchmark.")
+    args = parser.parse_args()
+
+    from qgitc.version import VERSION
+
+    report = {
+        "version": VERSION,
+        "time": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": _gitVersion(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        baseDir = args.dir or tempDir
+        for shape in args.shape:
+            sys.stderr.write("Generating {0}...\n".format(shape))
+            info = generateRepo(os.path.join(baseDir, shape), shape,
+                                args.scale, args.seed)
+            for bench in args.bench:
+                sys.stderr.write("  {0}\n".format(bench))
+                report["results"].append(_run(bench, info, args.timeout))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
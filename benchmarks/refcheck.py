@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Check the refs read by RefReader against `git for-each-ref` on a
+generated repository, with loose and packed refs, annotated tags,
+detached HEAD and worktrees. Exit with 1 if any of them differs.
+
+    python -m benchmarks.refcheck --scale 2
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.repogen import generateRepo  # noqa: E402
+from qgitc.gitutils import RefDatabase  # noqa: E402
+from qgitc.refreader import RefReader  # noqa: E402
+
+
+# for the annotated tags
+_env = dict(os.environ,
+            GIT_COMMITTER_NAME="Bench Author",
+            GIT_COMMITTER_EMAIL="bench@example.com")
+
+
+def _git(repoDir, args):
+    return subprocess.check_output(
+        ["git"] + args, cwd=repoDir, env=_env, universal_newlines=True)
+
+
+def _gitRecords(repoDir):
+    fields = RefDatabase._fields + ["*objecttype"]
+    fmt = "%00".join(["%(" + field + ")" for field in fields])
+    data = _git(repoDir, ["for-each-ref", "--format=" + fmt])
+
+    records = []
+    for line in data.splitlines():
+        parts = line.split("\0")
+        # for-each-ref derefs once, the reader peels to the end
+        # like the packed-refs does
+        if parts.pop() == "tag":
+            parts[1] = _git(repoDir, ["rev-parse", parts[2] + "^{}"]).strip()
+        records.append(tuple(parts))
+
+    return records
+
+
+def _gitHead(repoDir):
+    try:
+        _git(repoDir, ["symbolic-ref", "-q", "HEAD"])
+        return None
+    except subprocess.CalledProcessError:
+        return _git(repoDir, ["rev-parse", "HEAD"]).strip()
+
+
+def _check(name, repoDir):
+    """the reader of @repoDir is kept by RefReader, so the cache of the
+    changed refs is checked too"""
+    records, detachedOid = RefReader.forRepo(repoDir).read()
+    records = [tuple(record) for record in records]
+    expected = _gitRecords(repoDir)
+
+    errors = []
+    if records != expected:
+        for record in sorted(set(records) - set(expected)):
+            errors.append("  unexpected {0}".format(record))
+        for record in sorted(set(expected) - set(records)):
+            errors.append("  missing    {0}".format(record))
+        if not errors:
+            errors.append("  different order")
+
+    head = _gitHead(repoDir)
+    if detachedOid != head:
+        errors.append("  detached HEAD {0}, expected {1}".format(
+            detachedOid, head))
+
+    print("{0:<40}{1:>6} refs  {2}".format(
+        name, len(expected), "FAILED" if errors else "OK"))
+    for error in errors:
+        print(error)
+
+    return not errors
+
+
+def _revs(repoDir, count):
+    return _git(repoDir, ["rev-list", "--max-count={0}".format(count),
+                          "HEAD"]).split()
+
+
+def _run(repoDir, worktreeDir):
+    ok = _check("loose refs", repoDir)
+
+    revs = _revs(repoDir, 20)
+    for i, rev in enumerate(revs[:5]):
+        _git(repoDir, ["tag", "-a", "-m", "tag", "annotated{0}".format(i),
+                       rev])
+    # a tag of a tag is peeled to the commit
+    _git(repoDir, ["-c", "advice.nestedTag=false", "tag", "-a", "-m", "tag",
+                   "nested", "annotated0"])
+    _git(repoDir, ["symbolic-ref", "refs/remotes/origin/HEAD",
+                   "refs/remotes/origin/feature0"])
+    ok = _check("annotated tags and symref", repoDir) and ok
+
+    _git(repoDir, ["pack-refs", "--all"])
+    ok = _check("packed refs", repoDir) and ok
+
+    _git(repoDir, ["update-ref", "refs/heads/feature1", revs[10]])
+    _git(repoDir, ["update-ref", "-d", "refs/heads/feature2"])
+    _git(repoDir, ["tag", "-d", "annotated1"])
+    _git(repoDir, ["branch", "loose", revs[11]])
+    _git(repoDir, ["tag", "-a", "-m", "tag", "annotated-loose", revs[12]])
+    ok = _check("packed and loose refs", repoDir) and ok
+
+    _git(repoDir, ["checkout", "-q", "--detach", revs[3]])
+    ok = _check("detached HEAD", repoDir) and ok
+    _git(repoDir, ["checkout", "-q", "master"])
+    ok = _check("attached HEAD", repoDir) and ok
+
+    _git(repoDir, ["worktree", "add", "-q", "-b", "worktree",
+                   worktreeDir, revs[5]])
+    _git(worktreeDir, ["update-ref", "refs/worktree/mark", revs[6]])
+    _git(worktreeDir, ["update-ref", "refs/bisect/bad", revs[7]])
+    _git(worktreeDir, ["branch", "from-worktree", revs[8]])
+    ok = _check("worktree", worktreeDir) and ok
+    ok = _check("main of worktree", repoDir) and ok
+
+    _git(worktreeDir, ["checkout", "-q", "--detach"])
+    _git(repoDir, ["pack-refs", "--all"])
+    ok = _check("packed worktree", worktreeDir) and ok
+    ok = _check("packed main of worktree", repoDir) and ok
+
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the refs read by qgitc against git")
+    parser.add_argument(
+        "--scale", type=int, default=1,
+        help="Multiply the commits and refs of the repository.")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed of the generated content.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        repoDir = os.path.join(tempDir, "refs")
+        info = generateRepo(repoDir, "refs", args.scale, args.seed)
+        print("{0} commits, {1} refs".format(info.commits, info.refs))
+        ok = _run(repoDir, os.path.join(tempDir, "worktree"))
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Generate the local repositories of the benchmarks with git fast-import.
+The same shape, scale and seed always give the same commits, so the
+results of different runs are comparable.
+
+    python -m benchmarks.repogen --shape merges --scale 2 /tmp/merges
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+
+
+__all__ = ["SHAPES", "generateRepo", "RepoInfo"]
+
+
+# the commit time of the first commit, fixed for the same sha1s
+BASE_TIME = 1500000000
+AUTHOR = b"Bench Author <bench@example.com>"
+
+_words = ["alpha", "beta", "gamma", "delta", "value", "count", "index",
+          "buffer", "result", "config", "update", "render", "parse"]
+
+_encodingTexts = {
+    "gbk": "// 这是一个中文注释，用于测试编码\n",
+    "shift_jis": "// 日本語のコメントです、テスト\n",
+    "cp1252": "/* résumé, naïve café, déjà vu */\n",
+    "utf-8": "/* 中文注释，日本語のコメント, naïve */\n",
+    "utf-16": "/* 中文注释 and some ascii */\n",
+}
+
+
+class RepoInfo:
+
+    def __init__(self, path, shape):
+        self.path = path
+        self.shape = shape
+        self.commits = 0
+        self.refs = 0
+        # the files to blame, most changed first
+        self.blameFiles = []
+        # the big file of the repo, for the find
+        self.bigFile = None
+
+
+class _Writer:
+    """Write the fast-import stream of the commits"""
+
+    def __init__(self, stream, rand):
+        self._stream = stream
+        self._rand = rand
+        self._mark = 0
+        self._time = BASE_TIME
+        # marks of the commits
+        self.commits = []
+
+    def _newMark(self):
+        self._mark += 1
+        return self._mark
+
+    def _data(self, data):
+        self._stream.write(b"data %d\n" % len(data))
+        self._stream.write(data)
+        self._stream.write(b"\n")
+
+    def blob(self, data):
+        mark = self._newMark()
+        self._stream.write(b"blob\nmark :%d\n" % mark)
+        self._data(data)
+        return mark
+
+    def commit(self, ref, message, files, parents=()):
+        """@files is {path: blobMark}, returns the mark of the commit"""
+        mark = self._newMark()
+        self._time += self._rand.randint(60, 3600)
+        stamp = b"%d +0000" % self._time
+
+        self._stream.write(b"commit %s\nmark :%d\n" % (ref, mark))
+        self._stream.write(b"author %s %s\n" % (AUTHOR, stamp))
+        self._stream.write(b"committer %s %s\n" % (AUTHOR, stamp))
+        self._data(message.encode("utf-8"))
+        for i, parent in enumerate(parents):
+            cmd = b"from" if i == 0 else b"merge"
+            self._stream.write(b"%s :%d\n" % (cmd, parent))
+        for path, blob in sorted(files.items()):
+            self._stream.write(b"M 100644 :%d %s\n" % (blob, path.encode()))
+        self._stream.write(b"\n")
+
+        self.commits.append(mark)
+        return mark
+
+    def reset(self, ref, commit):
+        self._stream.write(b"reset %s\nfrom :%d\n\n" % (ref, commit))
+
+
+class _SourceFile:
+    """A source file changed a few lines each commit"""
+
+    def __init__(self, rand, lines):
+        self._rand = rand
+        self.lines = [self._line() for _ in range(lines)]
+
+    def _line(self):
+        words = self._rand.sample(_words, 3)
+        return "    {0} = {1}({2}, {3});\n".format(
+            words[0], words[1], words[2], self._rand.randint(0, 9999))
+
+    def change(self, count=3):
+        for _ in range(count):
+            i = self._rand.randrange(len(self.lines))
+            if self._rand.random() < 0.2:
+                self.lines.insert(i, self._line())
+            else:
+                self.lines[i] = self._line()
+
+    def data(self, encoding="utf-8"):
+        return "".join(self.lines).encode(encoding)
+
+
+def _message(rand, i):
+    return "Change {0} of {1}\n\nUpdate the {2} and {3}.\n".format(
+        i, rand.choice(_words), rand.choice(_words), rand.choice(_words))
+
+
+def _linear(writer, rand, info, scale, files=8):
+    sources = ["src/file{0}.c".format(i) for i in range(files)]
+    contents = {path: _SourceFile(rand, 200) for path in sources}
+    tree = {path: writer.blob(contents[path].data()) for path in sources}
+
+    head = writer.commit(b"refs/heads/master", _message(rand, 0), tree)
+    for i in range(1, 2000 * scale):
+        # the first file changes most, for the blame
+        path = sources[0] if i % 2 else rand.choice(sources)
+        contents[path].change()
+        tree[path] = writer.blob(contents[path].data())
+        head = writer.commit(b"refs/heads/master", _message(rand, i),
+                             {path: tree[path]}, [head])
+
+    info.blameFiles = sources[:1]
+    return head
+
+
+def _merges(writer, rand, info, scale, lanes=24):
+    path = "src/main.c"
+    main = _SourceFile(rand, 400)
+    head = writer.commit(b"refs/heads/master", _message(rand, 0),
+                         {path: writer.blob(main.data())})
+
+    # each branch has its own file to merge without conflicts
+    branches = {}
+    for i in range(1, 1000 * scale):
+        if len(branches) < lanes or rand.random() < 0.2:
+            lane = rand.randrange(lanes * 2)
+        else:
+            lane = rand.choice(list(branches))
+
+        if lane not in branches:
+            branches[lane] = (head, _SourceFile(rand, 50))
+
+        parent, content = branches[lane]
+        content.change(2)
+        branchPath = "lanes/lane{0}.c".format(lane)
+        commit = writer.commit(
+            b"refs/heads/lane%d" % lane, _message(rand, i),
+            {branchPath: writer.blob(content.data())}, [parent])
+        branches[lane] = (commit, content)
+
+        if rand.random() < 0.15:
+            main.change(2)
+            head = writer.commit(
+                b"refs/heads/master", "Merge lane {0}\n".format(lane),
+                {path: writer.blob(main.data())}, [head, commit])
+            del branches[lane]
+
+    info.blameFiles = [path]
+    return head
+
+
+def _hugeFiles(writer, rand, info, scale):
+    path = "data/huge.c"
+    content = _SourceFile(rand, 100000 * scale)
+    head = writer.commit(b"refs/heads/master", _message(rand, 0),
+                         {path: writer.blob(content.data())})
+    for i in range(1, 20):
+        content.change(500 * scale)
+        head = writer.commit(b"refs/heads/master", _message(rand, i),
+                             {path: writer.blob(content.data())}, [head])
+
+    info.blameFiles = [path]
+    info.bigFile = path
+    return head
+
+
+def _manyRefs(writer, rand, info, scale):
+    head = _linear(writer, rand, info, scale, 2)
+    # a tag and branches every few commits
+    for i, commit in enumerate(writer.commits[::3]):
+        writer.reset(b"refs/tags/v%d.%d" % (i // 100, i % 100), commit)
+        writer.reset(b"refs/heads/feature%d" % i, commit)
+        writer.reset(b"refs/remotes/origin/feature%d" % i, commit)
+        info.refs += 3
+    return head
+
+
+def _mixedEncodings(writer, rand, info, scale):
+    paths = {}
+    contents = {}
+    for encoding, text in _encodingTexts.items():
+        path = "enc/{0}.c".format(encoding.replace("-", ""))
+        paths[encoding] = path
+        contents[encoding] = _SourceFile(rand, 200)
+        contents[encoding].lines[::10] = [text] * 20
+
+    tree = {paths[e]: writer.blob(c.data(e)) for e, c in contents.items()}
+    head = writer.commit(b"refs/heads/master", _message(rand, 0), tree)
+    for i in range(1, 500 * scale):
+        encoding = rand.choice(list(contents))
+        content = contents[encoding]
+        content.change()
+        content.lines[rand.randrange(len(content.lines))] = \
+            _encodingTexts[encoding]
+        head = writer.commit(
+            b"refs/heads/master", _message(rand, i),
+            {paths[encoding]: writer.blob(content.data(encoding))}, [head])
+
+    info.blameFiles = [paths["gbk"], paths["utf-8"]]
+    return head
+
+
+SHAPES = {
+    "linear": _linear,
+    "merges": _merges,
+    "huge": _hugeFiles,
+    "refs": _manyRefs,
+    "encodings": _mixedEncodings,
+}
+
+
+def generateRepo(path, shape, scale=1, seed=0):
+    """create the repo of @shape under @path, returns its RepoInfo"""
+    os.makedirs(path, exist_ok=True)
+    subprocess.check_call(["git", "init", "-q", path])
+
+    info = RepoInfo(path, shape)
+    rand = random.Random("{0}:{1}".format(shape, seed))
+
+    process = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"],
+        cwd=path, stdin=subprocess.PIPE)
+    writer = _Writer(process.stdin, rand)
+    SHAPES[shape](writer, rand, info, scale)
+    process.stdin.write(b"done\n")
+    process.stdin.close()
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode,
+                                            "git fast-import")
+
+    subprocess.check_call(["git", "checkout", "-q", "-f", "master"],
+                          cwd=path)
+    info.commits = len(writer.commits)
+    if not info.bigFile:
+        info.bigFile = info.blameFiles[0]
+
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a repository for the benchmarks")
+    parser.add_argument(
+        "--shape", choices=sorted(SHAPES), default="linear",
+        help="The shape of the history.")
+    parser.add_argument(
+        "--scale", type=int, default=1,
+        help="Multiply the commits or the file size.")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="Seed of the random content.")
+    parser.add_argument(
+        "dir", metavar="<dir>",
+        help="The directory of the new repository.")
+    args = parser.parse_args()
+
+    info = generateRepo(args.dir, args.shape, args.scale, args.seed)
+    print("{0}: {1} commits, {2} refs".format(
+        info.path, info.commits, info.refs))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
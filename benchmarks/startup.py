@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""Measure the cold start time of qgitc subcommands, that is from
+spawning the interpreter to the first paint of the window.
+
+Run it under the repository to open, for example:
+
+    python benchmarks/startup.py --repeat 5 log blame
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _child(argv):
+    sys.path.insert(0, ROOT_DIR)
+
+    from PySide2.QtCore import QObject, QEvent
+
+    import qgitc.main as qgitcMain
+    from qgitc.application import Application
+
+    # always start a new instance
+    qgitcMain.forwardRequest = lambda request: False
+
+    class PaintWatcher(QObject):
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                sys.stdout.write("%f\n" % time.time())
+                sys.stdout.flush()
+                os._exit(0)
+            return False
+
+    class BenchApplication(Application):
+
+        def __init__(self, argv):
+            super().__init__(argv)
+            self._paintWatcher = PaintWatcher(self)
+            self.installEventFilter(self._paintWatcher)
+
+    qgitcMain.Application = BenchApplication
+
+    sys.argv = ["qgitc"] + argv
+    qgitcMain.main()
+    os._exit(1)
+
+
+def _firstFile():
+    data = subprocess.check_output(
+        ["git", "ls-files"], universal_newlines=True)
+    files = data.splitlines()
+    return files[0] if files else None
+
+
+def _measure(argv, timeout):
+    start = time.time()
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), "--child"] + argv,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+        timeout=timeout)
+    return (float(output.strip()) - start) * 1000
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child(sys.argv[2:])
+        return 0
+
+    parser = argparse.ArgumentParser(
+        description="qgitc time to first paint benchmark")
+    parser.add_argument(
+        "commands", metavar="<command>", nargs="*",
+        default=["log", "blame"],
+        help="The subcommands to measure, log and blame by default.")
+    parser.add_argument(
+        "--repeat", "-n", type=int, default=5,
+        help="Number of runs for each subcommand.")
+    parser.add_argument(
+        "--file", metavar="<file>",
+        help="The file to blame, the first tracked file by default.")
+    parser.add_argument(
+        "--timeout", type=int, default=60,
+        help="Seconds to wait for a single run.")
+    args = parser.parse_args()
+
+    print("{:<10}{:>10}{:>10}{:>10}".format(
+        "command", "min(ms)", "median", "max"))
+    for cmd in args.commands:
+        argv = [cmd]
+        if cmd == "blame":
+            file = args.file or _firstFile()
+            if not file:
+                print("No file to blame")
+                return 1
+            argv.append(file)
+
+        times = [_measure(argv, args.timeout) for _ in range(args.repeat)]
+        print("{:<10}{:>10.1f}{:>10.1f}{:>10.1f}".format(
+            cmd, min(times), statistics.median(times), max(times)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,13 +15,11 @@ from .settings import Settings
 from .events import (
     BlameEvent,
     ShowCommitEvent,
-    OpenLinkEvent)
-from .blamewindow import BlameWindow
-from .mainwindow import MainWindow
+    OpenLinkEvent,
+    ShowLogEvent)
 from .gitutils import Git
 from .textline import Link
-from .versionchecker import VersionChecker
-from .newversiondialog import NewVersionDialog
+from .instanceserver import InstanceServer
 
 from datetime import datetime
 
@@ -50,9 +48,13 @@ class Application(QApplication):
         self._logWindow = None
         self._blameWindow = None
 
-        cwd = os.getcwd()
-        repoDir = Git.repoTopLevelDir(cwd)
-        Git.REPO_DIR = repoDir or cwd
+        if not Git.REPO_DIR:
+            cwd = os.getcwd()
+            repoDir = Git.repoTopLevelDir(cwd)
+            Git.REPO_DIR = repoDir or cwd
+
+        self._instanceServer = InstanceServer(self)
+        self._instanceServer.listen()
 
         QTimer.singleShot(0, self._onDelayInit)
 
@@ -79,12 +81,15 @@ class Application(QApplication):
         window = None
         if type == Application.LogWindow:
             if not self._logWindow:
+                # the windows are imported on demand for fast startup
+                from .mainwindow import MainWindow
                 self._logWindow = MainWindow()
                 self._logWindow.destroyed.connect(
                     self._onLogWindowDestroyed)
             window = self._logWindow
         elif type == Application.BlameWindow:
             if not self._blameWindow:
+                from .blamewindow import BlameWindow
                 self._blameWindow = BlameWindow()
                 self._blameWindow.destroyed.connect(
                     self._onBlameWindowDestroyed)
@@ -111,6 +116,14 @@ class Application(QApplication):
             window.showCommit(event.sha1)
             self._ensureVisible(window)
             return True
+        elif type == ShowLogEvent.Type:
+            window = self.getWindow(Application.LogWindow)
+            if event.compareMode and not window.gitViewB:
+                window.setMode(window.CompareMode)
+            if event.filterFile:
+                window.setFilterFile(event.filterFile)
+            self._ensureVisible(window)
+            return True
         elif type == OpenLinkEvent.Type:
             url = None
             link = event.link
@@ -169,6 +182,8 @@ class Application(QApplication):
         if ignoredVersion == version:
             return
 
+        from .newversiondialog import NewVersionDialog
+
         parent = self.activeWindow()
         versionDlg = NewVersionDialog(version, parent)
         versionDlg.exec_()
@@ -190,6 +205,7 @@ class Application(QApplication):
                 haveToCheck = diff.days >= days
 
             if haveToCheck:
+                from .versionchecker import VersionChecker
                 self._checker = VersionChecker(self)
                 self._checker.newVersionAvailable.connect(
                     self._onNewVersionAvailable)
@@ -202,6 +218,7 @@ class Application(QApplication):
             if window.isMinimized():
                 window.setWindowState(
                     window.windowState() & ~Qt.WindowMinimized)
+            window.raise_()
             window.activateWindow()
             return
         if window.restoreState():
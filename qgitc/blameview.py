@@ -23,14 +23,19 @@ from PySide2.QtCore import (
     QRect,
     QRectF,
     QPointF,
-    QUrl)
+    QUrl,
+    QThread,
+    QObject,
+    QTimer)
 
+from collections import OrderedDict, Counter
 from datetime import datetime
 from .datafetcher import DataFetcher
 from .stylehelper import dpiScaled
 from .sourceviewer import SourceViewer
 from .textline import LinkTextLine, Link
-from .gitutils import Git
+from .gitutils import Git, RefDatabase
+from .refreader import RefReader
 from .colorschema import ColorSchema
 from .events import (
     BlameEvent,
@@ -39,14 +44,30 @@ from .events import (
 from .waitingspinnerwidget import QtWaitingSpinner
 from .textviewer import TextViewer
 from .common import decodeFileData
+from .encodingdetector import detectEncoding
+from .syntax import SyntaxHighlighter, lexerForPath
 
 import re
 import os
+import copy
+import queue
+import subprocess
+import threading
 
 
 __all__ = ["BlameView"]
 
 ABBREV_N = 4
+# max revisions to blame in background for the visible lines
+MAX_PREFETCH = 8
+
+# rough memory used by a BlameLine besides its text
+LINE_OVERHEAD = 256
+# give up reusing if more than this ratio of lines need re-blaming
+MAX_REBLAME_RATIO = 0.5
+
+hunk_re = re.compile(rb"^@@ -([0-9]+)(?:,([0-9]+))? \+([0-9]+)(?:,([0-9]+))? @@")
+sha1_re = re.compile(r"^([0-9a-f]{40}|[0-9a-f]{64})$")
 
 
 class BlameLine:
@@ -83,18 +104,241 @@ def _decode(data):
     return data.decode("utf-8")
 
 
-class BlameFetcher(DataFetcher):
+def _repoPath(file):
+    if os.path.isabs(file) and Git.REPO_DIR:
+        file = os.path.relpath(file, Git.REPO_DIR)
+    return file.replace("\\", "/")
 
-    dataAvailable = Signal(list)
 
-    def __init__(self, parent=None):
+def _workTreeStamp(path):
+    """the blame of working tree file depends on both HEAD and the file,
+    None if unknown without running git"""
+    if not RefReader.forRepo(Git.REPO_DIR):
+        return None
+
+    try:
+        st = os.stat(os.path.join(Git.REPO_DIR, path))
+    except OSError:
+        return None
+
+    headSha1 = RefDatabase.load().headSha1
+    return (headSha1, st.st_mtime_ns, st.st_size)
+
+
+class BlameEntry:
+
+    def __init__(self, lines, texts, stamp=None):
+        self.lines = lines
+        self.texts = texts
+        self.stamp = stamp
+        self.size = sum(len(text) for text in texts) + \
+            len(lines) * LINE_OVERHEAD
+
+    def hasPrevious(self, sha1):
+        for line in self.lines:
+            if line.previous == sha1:
+                return True
+        return False
+
+
+class BlameCache:
+    """LRU cache of the blame results, bounded by memory"""
+
+    def __init__(self, maxBytes=64 * 1024 * 1024):
+        self._entries = OrderedDict()
+        self._maxBytes = maxBytes
+        self._totalBytes = 0
+
+    @staticmethod
+    def makeKey(path, sha1, options=()):
+        return (Git.REPO_DIR, path, sha1, tuple(options))
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        # None means working tree
+        if key[2] is None:
+            stamp = _workTreeStamp(key[1])
+            if stamp is None or entry.stamp != stamp:
+                self.remove(key)
+                return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.remove(key)
+        if entry.size > self._maxBytes:
+            return
+
+        self._entries[key] = entry
+        self._totalBytes += entry.size
+        while self._totalBytes > self._maxBytes:
+            _, oldEntry = self._entries.popitem(last=False)
+            self._totalBytes -= oldEntry.size
+
+    def remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._totalBytes -= entry.size
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def clear(self):
+        self._entries.clear()
+        self._totalBytes = 0
+
+
+_blameCache = BlameCache()
+
+
+class BlameReusePlanner(QThread):
+    """Map lines of a cached blame to its parent revision @rev
+
+    Unchanged lines attributed to an ancestor of @rev keep their
+    attribution, so only the others need to be blamed with -L ranges.
+    """
+
+    def __init__(self, entry, baseSha1, basePath, sha1, path, parent=None):
         super().__init__(parent)
+        self._entry = entry
+        self._baseSha1 = baseSha1
+        self._basePath = basePath
+        self._sha1 = sha1
+        self._path = path
+
+        # for each line of @rev, the line index in @entry, -1 to re-blame
+        self.reuse = None
+        self.ranges = None
+
+    @property
+    def entry(self):
+        return self._entry
+
+    def run(self):
+        reuse = self._mapLines()
+        if not reuse or self.isInterruptionRequested():
+            return
+
+        changed = self._changedCommits()
+        if changed is None or self.isInterruptionRequested():
+            return
+
+        data = Git.checkOutput(
+            ["cat-file", "-p", "{}:{}".format(self._sha1, self._path)])
+        if data is None:
+            return
+        texts = data.split(b'\n')
+        if texts and not texts[-1]:
+            texts.pop()
+        if len(texts) != len(reuse):
+            return
+
+        # lines repeated (like braces) may be aligned differently by
+        # the commits in between, only reuse the unique ones
+        baseTexts = self._entry.texts
+        baseCount = Counter(baseTexts)
+        count = Counter(texts)
+
+        lines = self._entry.lines
+        total = 0
+        for i in range(len(reuse)):
+            index = reuse[i]
+            if index == -1:
+                total += 1
+            elif lines[index].sha1 in changed or \
+                    lines[index].sha1 == Git.LUC_SHA1 or \
+                    lines[index].sha1 == Git.LCC_SHA1 or \
+                    texts[i] != baseTexts[index] or \
+                    count[texts[i]] != 1 or \
+                    baseCount[texts[i]] != 1:
+                reuse[i] = -1
+                total += 1
+
+        if total > len(reuse) * MAX_REBLAME_RATIO:
+            return
+
+        ranges = []
+        begin = -1
+        for i in range(len(reuse) + 1):
+            if i < len(reuse) and reuse[i] == -1:
+                if begin == -1:
+                    begin = i
+            elif begin != -1:
+                ranges.append((begin + 1, i))
+                begin = -1
+
+        self.reuse = reuse
+        self.ranges = ranges
+
+    def _mapLines(self):
+        args = ["diff", "-U0", "--no-color", "--no-ext-diff", "--no-textconv"]
+        if self._baseSha1:
+            args.append("{}:{}".format(self._sha1, self._path))
+            args.append("{}:{}".format(self._baseSha1, self._basePath))
+        elif self._path == self._basePath:
+            args.extend([self._sha1, "--", self._path])
+        else:
+            return None
+
+        data = Git.checkOutput(args)
+        if data is None:
+            return None
+
+        reuse = []
+        oldLine = 1
+        newLine = 1
+        for line in data.split(b'\n'):
+            if line.startswith(b"Binary files "):
+                return None
+            m = hunk_re.match(line)
+            if not m:
+                continue
+
+            oldCount = int(m.group(2)) if m.group(2) else 1
+            newCount = int(m.group(4)) if m.group(4) else 1
+            oldStart = int(m.group(1)) + (0 if oldCount else 1)
+            newStart = int(m.group(3)) + (0 if newCount else 1)
+
+            while oldLine < oldStart:
+                reuse.append(newLine - 1)
+                oldLine += 1
+                newLine += 1
+            if newLine != newStart:
+                return None
+
+            reuse.extend([-1] * oldCount)
+            oldLine += oldCount
+            newLine += newCount
+
+        total = len(self._entry.lines)
+        if newLine > total + 1:
+            return None
+        while newLine <= total:
+            reuse.append(newLine - 1)
+            newLine += 1
+
+        return reuse
+
+    def _changedCommits(self):
+        args = ["rev-list", self._baseSha1 or "HEAD", "^" + self._sha1]
+        data = Git.checkOutput(args)
+        if data is None:
+            return None
+
+        return set(data.decode("utf-8").split())
+
+
+class BlameParser:
+
+    def __init__(self):
         self._curLine = BlameLine()
 
-    def parse(self, data):
+    def parse(self, lines):
         results = []
-        # TODO: support utf16 32 split...
-        lines = data.rstrip(self.separator).split(self.separator)
         for line in lines:
             if line[0] == 9:  # \t
                 self._curLine.text = line[1:]
@@ -145,22 +389,191 @@ class BlameFetcher(DataFetcher):
                     if len(parts) == 4:
                         self._curLine.groupLines = int(parts[3])
 
+        return results
+
+    def reset(self):
+        self._curLine = BlameLine()
+
+
+class BlameFetcher(DataFetcher):
+
+    dataAvailable = Signal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._parser = BlameParser()
+
+    def parse(self, data):
+        # TODO: support utf16 32 split...
+        lines = data.rstrip(self.separator).split(self.separator)
+        results = self._parser.parse(lines)
         if results:
             self.dataAvailable.emit(results)
 
     def makeArgs(self, args):
         file = args[0]
         rev = args[1]
+        ranges = args[2] if len(args) > 2 else None
 
-        blameArgs = ["blame", "--porcelain", "--", file]
+        blameArgs = ["blame", "--porcelain"]
+        if ranges:
+            for begin, end in ranges:
+                blameArgs.append("-L{},{}".format(begin, end))
         if rev:
-            blameArgs.insert(1, rev)
+            blameArgs.append(rev)
+        blameArgs.extend(["--", file])
 
         return blameArgs
 
     def reset(self):
         super().reset()
-        self._curLine = BlameLine()
+        self._parser.reset()
+
+
+class BlamePrefetchThread(QThread):
+
+    blameAvailable = Signal(object, object)
+
+    def __init__(self, jobs, parent=None):
+        super().__init__(parent)
+        self._jobs = jobs
+        self._key = None
+        self._process = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                key, file = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+
+            entry = self._blame(key, file)
+            self.blameAvailable.emit(key, entry)
+
+    def cancel(self, keepKey=None):
+        with self._lock:
+            if self._process and self._key != keepKey:
+                self._process.kill()
+
+    def _blame(self, key, file):
+        repoDir, _, sha1, _ = key
+        startupinfo = None
+        creationflags = 0
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            creationflags = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+
+        with self._lock:
+            if self.isInterruptionRequested():
+                return None
+            self._key = key
+            self._process = subprocess.Popen(
+                ["git", "blame", "--porcelain", sha1, "--", file],
+                cwd=repoDir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                startupinfo=startupinfo,
+                creationflags=creationflags)
+            process = self._process
+
+        if os.name != "nt":
+            try:
+                os.setpriority(os.PRIO_PROCESS, process.pid, 10)
+            except OSError:
+                pass
+
+        data, _ = process.communicate()
+        with self._lock:
+            self._process = None
+            self._key = None
+
+        if process.returncode != 0 or not data:
+            return None
+
+        lines = BlameParser().parse(data.rstrip(b'\n').split(b'\n'))
+        texts = []
+        for line in lines:
+            texts.append(line.text)
+            line.text = None
+
+        return BlameEntry(lines, texts)
+
+
+class BlamePrefetcher(QObject):
+    """Blame the likely next revisions in background"""
+
+    blameAvailable = Signal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = queue.Queue()
+        self._pending = set()
+        self._threads = []
+
+        maxThreads = max(1, min(4, (os.cpu_count() or 2) // 2))
+        for i in range(maxThreads):
+            thread = BlamePrefetchThread(self._jobs, self)
+            thread.blameAvailable.connect(self._onBlameAvailable)
+            thread.finished.connect(self._startThreads)
+            self._threads.append(thread)
+
+    def prefetch(self, jobs):
+        self._clearJobs()
+        for key, file in jobs:
+            if key in self._pending or key in _blameCache:
+                continue
+            self._pending.add(key)
+            self._jobs.put((key, file))
+
+        self._startThreads()
+
+    def isPending(self, key):
+        return key in self._pending
+
+    def cancel(self, keepKey=None):
+        keep = self._clearJobs(keepKey)
+        for thread in self._threads:
+            thread.cancel(keepKey)
+        if keep:
+            self._pending.add(keep[0])
+            self._jobs.put(keep)
+
+    def stop(self):
+        self._clearJobs()
+        for thread in self._threads:
+            thread.requestInterruption()
+            thread.cancel()
+        for thread in self._threads:
+            thread.wait()
+        self._pending.clear()
+
+    def _clearJobs(self, keepKey=None):
+        keep = None
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job[0] == keepKey:
+                keep = job
+            self._pending.discard(job[0])
+
+        return keep
+
+    def _startThreads(self):
+        if self._jobs.empty():
+            return
+        for thread in self._threads:
+            if not thread.isRunning():
+                thread.start(QThread.LowPriority)
+
+    def _onBlameAvailable(self, key, entry):
+        self._pending.discard(key)
+        if entry:
+            _blameCache.put(key, entry)
+        self.blameAvailable.emit(key, entry)
 
 
 class RevisionPanel(TextViewer):
@@ -425,11 +838,15 @@ class BlameSourceViewer(SourceViewer):
         self._curIndexForMenu = -1
         self._preferEncoding = "utf-8"
         self._detected = False
+        self._encodingKey = None
+        self._highlighter = None
 
     def clear(self):
         super().clear()
         self._panel.clear()
         self._detected = False
+        self._encodingKey = None
+        self._highlighter = None
 
     def beginReading(self):
         super().beginReading()
@@ -439,11 +856,27 @@ class BlameSourceViewer(SourceViewer):
         super().endReading()
         self._panel.endReading()
 
-    def toTextLine(self, data):
-        if not self._detected:
-            self._preferEncoding = self._detectEncoding(data)
-            self._detected = True
+    def setEncodingKey(self, key):
+        """the encoding detected is cached with @key"""
+        self._encodingKey = key
+
+    def setHighlightFile(self, file):
+        """highlight the source with the lexer of @file"""
+        lexer = lexerForPath(file)
+        self._highlighter = None
+        if lexer:
+            self._highlighter = SyntaxHighlighter(lexer, self._codeText)
 
+    def _codeText(self, lineNo):
+        textLine = self.textLineAt(lineNo)
+        return (textLine.text(), 0) if textLine else None
+
+    def initTextLine(self, textLine, lineNo):
+        super().initTextLine(textLine, lineNo)
+        if self._highlighter:
+            textLine.setHighlighter(self._highlighter)
+
+    def toTextLine(self, data):
         text, encoding = decodeFileData(data, self._preferEncoding)
         if encoding:
             self._preferEncoding = encoding
@@ -480,9 +913,19 @@ class BlameSourceViewer(SourceViewer):
             # to save memory as revision panel no need text
             line.text = None
 
+        if not self._detected and texts:
+            self._preferEncoding = detectEncoding(
+                b'\n'.join(texts), self._encodingKey) or "utf-8"
+            self._detected = True
+
         self._panel.appendRevisions(lines)
         self.appendLines(texts)
 
+    def visibleRevisions(self):
+        revs = self._panel.revisions
+        firstLine = self.firstVisibleLine()
+        return revs[firstLine:firstLine + self._linesPerPage() + 1]
+
     def _onMenuShowCommitLog(self):
         if self._curIndexForMenu == -1:
             return
@@ -522,27 +965,6 @@ class BlameSourceViewer(SourceViewer):
 
         return lineRect.toRect()
 
-    def _detectEncoding(self, data):
-        if len(data) < 4:
-            return "utf-8"
-
-        b1 = data[0]
-        b2 = data[1]
-        b3 = data[2]
-        b4 = data[3]
-        if b1 == 0xFE and b2 == 0xFF:
-            return "utf-16be"
-        elif b1 == 0xFF and b2 == 0xFE:
-            return "utf-16le"
-        elif b1 == 0xEF and b2 == 0xBB and b3 == 0xBF:
-            return "utf-8"
-        elif b1 == 0x00 and b2 == 0x00 and b3 == 0xFE and b4 == 0xFF:
-            return "utf-32be"
-        elif b1 == 0xFF and b2 == 0xFE and b3 == 0x00 and b4 == 0x00:
-            return "utf-32le"
-
-        return "utf-8"
-
     def mousePressEvent(self, event):
         oldLine = self._cursor.beginLine()
         super().mousePressEvent(event)
@@ -795,6 +1217,26 @@ class BlameView(QWidget):
         self._rev = None
         self._lineNo = -1
 
+        # the blame result showing, to be reused by the previous commit
+        self._curKey = None
+        self._curEntry = None
+        self._pendingLines = []
+        self._pendingTexts = []
+        self._reusePlanner = None
+        # (reuse, base entry) while fetching the re-blamed ranges
+        self._reusePlan = None
+        self._waitingPrefetch = False
+
+        self._prefetcher = BlamePrefetcher(self)
+        self._prefetcher.blameAvailable.connect(
+            self._onPrefetchAvailable)
+        self._prefetchTimer = QTimer(self)
+        self._prefetchTimer.setSingleShot(True)
+        self._prefetchTimer.setInterval(300)
+        self._prefetchTimer.timeout.connect(self._schedulePrefetch)
+        self._viewer.verticalScrollBar().valueChanged.connect(
+            self._prefetchTimer.start)
+
         self._fetcher = BlameFetcher(self)
         self._fetcher.dataAvailable.connect(
             self._onFetchDataAvailable)
@@ -817,9 +1259,123 @@ class BlameView(QWidget):
             qApp.postEvent(qApp, OpenLinkEvent(link))
 
     def _onFetchDataAvailable(self, lines):
-        self._viewer.appendBlameLines(lines)
+        self._pendingLines.extend(lines)
+        for line in lines:
+            self._pendingTexts.append(line.text)
+
+        if not self._reusePlan:
+            self._viewer.appendBlameLines(lines)
 
     def _onFetchFinished(self, exitCode):
+        lines = self._pendingLines
+        texts = self._pendingTexts
+        self._pendingLines = []
+        self._pendingTexts = []
+
+        if self._reusePlan:
+            reuse, entry = self._reusePlan
+            self._reusePlan = None
+            if exitCode != 0 or not self._mergeLines(reuse, entry, lines):
+                # something wrong, blame the whole file instead
+                self._fetcher.fetch(self._file, self._rev)
+                return
+        elif exitCode == 0 and lines:
+            key = self._curKey
+            stamp = None
+            if key and key[2] is None:
+                stamp = _workTreeStamp(key[1])
+            self._curEntry = BlameEntry(lines, texts, stamp)
+            if key and (key[2] or stamp):
+                _blameCache.put(key, self._curEntry)
+
+        self._finishBlame(self._fetcher.errorData)
+
+    def _onReusePlanFinished(self):
+        planner = self._reusePlanner
+        self._reusePlanner = None
+
+        if planner.reuse is None:
+            self._fetcher.fetch(self._file, self._rev)
+        elif not planner.ranges:
+            self._mergeLines(planner.reuse, planner.entry, [])
+            self._finishBlame()
+        else:
+            self._reusePlan = (planner.reuse, planner.entry)
+            self._fetcher.fetch(self._file, self._curKey[2], planner.ranges)
+
+    def _mergeLines(self, reuse, entry, fetchedLines):
+        fetched = {}
+        for line in fetchedLines:
+            fetched[line.newLineNo] = line
+
+        lines = []
+        texts = []
+        for i in range(len(reuse)):
+            index = reuse[i]
+            if index == -1:
+                line = fetched.get(i + 1)
+                if line is None:
+                    return False
+            else:
+                line = copy.copy(entry.lines[index])
+                line.newLineNo = i + 1
+                line.text = entry.texts[index]
+            lines.append(line)
+            texts.append(line.text)
+
+        self._curEntry = BlameEntry(lines, texts)
+        _blameCache.put(self._curKey, self._curEntry)
+        self._viewer.appendBlameLines(lines)
+        return True
+
+    def _replayEntry(self, entry):
+        # the lines of the entry are shared by the later hits
+        lines = []
+        for i in range(len(entry.lines)):
+            line = copy.copy(entry.lines[i])
+            line.text = entry.texts[i]
+            lines.append(line)
+        self._viewer.appendBlameLines(lines)
+        self._finishBlame()
+
+    def _onPrefetchAvailable(self, key, entry):
+        if not self._waitingPrefetch or key != self._curKey:
+            return
+
+        self._waitingPrefetch = False
+        if entry:
+            self._curEntry = entry
+            self._replayEntry(entry)
+        else:
+            self._fetcher.fetch(self._file, self._rev)
+
+    def _schedulePrefetch(self):
+        if not self._curEntry or self._fetcher.process or \
+                self._reusePlanner or self._waitingPrefetch:
+            return
+
+        revs = self._viewer.visibleRevisions()
+        # the line under cursor is the most likely one
+        lineNo = self._viewer.textCursor.beginLine()
+        if lineNo >= 0 and lineNo < len(self._viewer.panel.revisions):
+            revs.insert(0, self._viewer.panel.revisions[lineNo])
+
+        jobs = []
+        keys = set()
+        for rev in revs:
+            if not rev.previous:
+                continue
+            key = BlameCache.makeKey(rev.prevFileName, rev.previous)
+            if key in keys:
+                continue
+            keys.add(key)
+            jobs.append((key, rev.prevFileName))
+            if len(jobs) >= MAX_PREFETCH:
+                break
+
+        self._prefetcher.prefetch(jobs)
+
+    def _finishBlame(self, errorData=None):
         self.blameFileChanged.emit(self._file)
         self._headerWidget.notifyFecthingFinished()
         if self._lineNo > 0:
@@ -827,9 +1383,24 @@ class BlameView(QWidget):
             self._viewer.panel.setActiveRevByLineNumber(self._lineNo - 1)
             self._lineNo = -1
         self._viewer.endReading()
-        if not self._viewer.hasTextLines() and self._fetcher.errorData:
+        if not self._viewer.hasTextLines() and errorData:
             QMessageBox.critical(self, self.window().windowTitle(),
-                                 self._fetcher.errorData.decode("utf-8"))
+                                 errorData.decode("utf-8"))
+        else:
+            self._prefetchTimer.start()
+
+    def _cancelBlame(self):
+        self._fetcher.cancel()
+        self._pendingLines = []
+        self._pendingTexts = []
+        self._reusePlan = None
+        self._waitingPrefetch = False
+
+        if self._reusePlanner:
+            self._reusePlanner.disconnect(self)
+            self._reusePlanner.requestInterruption()
+            self._reusePlanner.wait()
+            self._reusePlanner = None
 
     def _findFileBySHA1(self, sha1):
         file = self._viewer.panel.getFileBySHA1(sha1)
@@ -843,17 +1414,55 @@ class BlameView(QWidget):
         if self._file == file and self._rev == rev:
             return
 
+        baseKey = self._curKey
+        baseEntry = self._curEntry
+
+        self._cancelBlame()
         self._headerWidget.notifyFecthingStarted()
         self.blameFileAboutToChange.emit(file)
         self.clear()
         self._viewer.beginReading()
-        self._fetcher.fetch(file, rev)
 
         self._file = file
         self._rev = rev
         self._lineNo = lineNo
 
         self._headerWidget.addBlameInfo(file, rev)
+        self._viewer.setHighlightFile(file)
+
+        # the other revs are not cached, to not run git here
+        sha1 = rev if rev and sha1_re.match(rev) else None
+        path = _repoPath(file)
+        self._curKey = None
+        self._curEntry = None
+        if rev is None or sha1:
+            self._curKey = BlameCache.makeKey(path, sha1)
+            self._viewer.setEncodingKey(self._curKey)
+            entry = _blameCache.get(self._curKey)
+            if entry:
+                self._prefetcher.cancel()
+                self._curEntry = entry
+                self._replayEntry(entry)
+                return
+
+        self._prefetcher.cancel(self._curKey)
+        if self._prefetcher.isPending(self._curKey):
+            self._waitingPrefetch = True
+            return
+
+        if sha1 and baseKey and baseEntry and baseKey[0] == Git.REPO_DIR \
+                and baseEntry.hasPrevious(sha1):
+            self._reusePlanner = BlameReusePlanner(
+                baseEntry, baseKey[2], baseKey[1], sha1, path, self)
+            self._reusePlanner.finished.connect(self._onReusePlanFinished)
+            self._reusePlanner.start()
+            return
+
+        self._fetcher.fetch(file, rev)
+
+    def cancelPrefetch(self):
+        self._prefetchTimer.stop()
+        self._prefetcher.stop()
 
     @property
     def viewer(self):
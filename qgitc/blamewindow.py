@@ -190,6 +190,10 @@ class BlameWindow(StateWindow):
     def blame(self, file, rev=None, lineNo=0):
         self._view.blame(file, rev, lineNo)
 
+    def closeEvent(self, event):
+        self._view.cancelPrefetch()
+        super().closeEvent(event)
+
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
             if self._findWidget and self._findWidget.isVisible():
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import threading
+import os
+
+
+__all__ = ["CatFileBatch", "parseCommitParents"]
+
+
+def parseCommitParents(data):
+    """returns the parents of the raw commit object @data"""
+    parents = []
+    for line in data.split(b'\n'):
+        if not line:
+            break
+        if line.startswith(b"parent "):
+            parents.append(line[7:].decode("utf-8"))
+        elif parents:
+            # parents always follow the tree
+            break
+    return parents
+
+
+class CatFileBatch():
+    """A long running `git cat-file --batch` to read the objects
+    one by one without spawning git each time"""
+
+    def __init__(self, repoDir):
+        self._repoDir = repoDir
+        self._process = None
+        self._lock = threading.Lock()
+
+    @property
+    def repoDir(self):
+        return self._repoDir
+
+    def _ensureProcess(self):
+        if self._process and self._process.poll() is None:
+            return True
+
+        startupinfo = None
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        try:
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self._repoDir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                startupinfo=startupinfo)
+        except OSError:
+            self._process = None
+            return False
+
+        return True
+
+    def read(self, oid):
+        """returns (type, data) of object @oid, None if missing"""
+        with self._lock:
+            if not self._ensureProcess():
+                return None
+
+            try:
+                self._process.stdin.write(oid.encode("utf-8") + b"\n")
+                self._process.stdin.flush()
+
+                header = self._process.stdout.readline()
+                parts = header.split()
+                if len(parts) != 3:
+                    return None
+
+                size = int(parts[2])
+                data = self._process.stdout.read(size + 1)
+            except (OSError, ValueError):
+                self._close()
+                return None
+
+            return parts[1].decode("utf-8"), data[:size]
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if not self._process:
+            return
+
+        try:
+            self._process.stdin.close()
+            self._process.wait(1)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
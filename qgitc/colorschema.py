@@ -12,6 +12,8 @@ class ColorSchema():
     Newline = QColor(0, 0, 255)
     Adding = QColor(0, 128, 0)
     Deletion = QColor(255, 0, 0)
+    AddingWord = QColor(172, 242, 189)
+    DeletionWord = QColor(253, 184, 192)
     Info = QColor(170, 170, 170)
     Link = QColor(Qt.blue)
     Whitespace = QColor(Qt.lightGray)
@@ -20,3 +22,10 @@ class ColorSchema():
     Submodule = QColor(0, 160, 0)
     Submodule2 = QColor(255, 0, 0)
     FindResult = QColor(246, 185, 77)
+
+    Keyword = QColor(0, 0, 160)
+    Type = QColor(128, 0, 128)
+    String = QColor(163, 21, 21)
+    Number = QColor(9, 134, 88)
+    Comment = QColor(106, 115, 125)
+    Preprocessor = QColor(175, 0, 219)
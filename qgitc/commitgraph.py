@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+
+
+__all__ = ["CommitGraph", "topoOrder"]
+
+
+GRAPH_SIGNATURE = b"CGPH"
+GRAPH_PARENT_NONE = 0x70000000
+GRAPH_EXTRA_EDGES = 0x80000000
+GRAPH_EDGE_LAST = 0x80000000
+
+CHUNK_OID_FANOUT = b"OIDF"
+CHUNK_OID_LOOKUP = b"OIDL"
+CHUNK_DATA = b"CDAT"
+CHUNK_EXTRA_EDGES = b"EDGE"
+
+
+class GraphLayer():
+    """A single commit-graph file"""
+
+    def __init__(self, data, offset):
+        self.data = data
+        # the position of the first commit in the whole graph
+        self.offset = offset
+
+        if len(data) < 8 or data[:4] != GRAPH_SIGNATURE or data[4] != 1:
+            raise ValueError("Bad commit-graph")
+
+        self.hashSize = 20 if data[5] == 1 else 32
+        numChunks = data[6]
+
+        chunks = {}
+        pos = 8
+        for _ in range(numChunks):
+            id, chunkOffset = struct.unpack_from(">4sQ", data, pos)
+            chunks[id] = chunkOffset
+            pos += 12
+
+        for id in [CHUNK_OID_FANOUT, CHUNK_OID_LOOKUP, CHUNK_DATA]:
+            if id not in chunks:
+                raise ValueError("Missing chunk " + id.decode())
+
+        self.fanout = struct.unpack_from(">256I", data,
+                                         chunks[CHUNK_OID_FANOUT])
+        self.count = self.fanout[255]
+        self.oidOffset = chunks[CHUNK_OID_LOOKUP]
+        self.dataOffset = chunks[CHUNK_DATA]
+        self.edgeOffset = chunks.get(CHUNK_EXTRA_EDGES)
+
+    def oid(self, index):
+        start = self.oidOffset + index * self.hashSize
+        return self.data[start:start + self.hashSize]
+
+    def find(self, oid):
+        """returns the local index of the binary @oid, -1 if not found"""
+        first = oid[0]
+        lo = self.fanout[first - 1] if first > 0 else 0
+        hi = self.fanout[first]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self.oid(mid)
+            if value == oid:
+                return mid
+            if value < oid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return -1
+
+    def commitData(self, index):
+        """returns (parent1, parent2, generation, commitTime)"""
+        start = self.dataOffset + index * (self.hashSize + 16)
+        p1, p2, high, low = struct.unpack_from(
+            ">IIII", self.data, start + self.hashSize)
+        generation = high >> 2
+        commitTime = ((high & 0x3) << 32) | low
+        return p1, p2, generation, commitTime
+
+    def extraEdges(self, index):
+        edges = []
+        if self.edgeOffset is None:
+            return edges
+
+        pos = self.edgeOffset + index * 4
+        while True:
+            edge, = struct.unpack_from(">I", self.data, pos)
+            edges.append(edge & ~GRAPH_EDGE_LAST)
+            if edge & GRAPH_EDGE_LAST:
+                break
+            pos += 4
+        return edges
+
+
+class CommitGraph():
+    """Reader of `objects/info/commit-graph` or the split commit-graph
+    chain, the commits are addressed by the position in the graph"""
+
+    def __init__(self, layers):
+        self._layers = layers
+        self._count = sum(layer.count for layer in layers)
+
+    @staticmethod
+    def exists(commonDir):
+        """a quick check without reading the graph"""
+        # git ignores the commit-graph as the history might be changed
+        for name in ["shallow", os.path.join("info", "grafts")]:
+            if os.path.exists(os.path.join(commonDir, name)):
+                return False
+        replaceDir = os.path.join(commonDir, "refs", "replace")
+        if os.path.isdir(replaceDir) and os.listdir(replaceDir):
+            return False
+
+        infoDir = os.path.join(commonDir, "objects", "info")
+        return os.path.exists(os.path.join(infoDir, "commit-graph")) or \
+            os.path.exists(os.path.join(
+                infoDir, "commit-graphs", "commit-graph-chain"))
+
+    @staticmethod
+    def load(commonDir):
+        """returns None if no commit-graph or can't be used"""
+        if not CommitGraph.exists(commonDir):
+            return None
+
+        infoDir = os.path.join(commonDir, "objects", "info")
+        files = [os.path.join(infoDir, "commit-graph")]
+        if not os.path.exists(files[0]):
+            graphsDir = os.path.join(infoDir, "commit-graphs")
+            try:
+                with open(os.path.join(graphsDir, "commit-graph-chain")) as f:
+                    hashes = [line.strip() for line in f if line.strip()]
+            except OSError:
+                return None
+            files = [os.path.join(graphsDir, "graph-" + hash + ".graph")
+                     for hash in hashes]
+
+        layers = []
+        offset = 0
+        try:
+            for file in files:
+                with open(file, "rb") as f:
+                    layer = GraphLayer(f.read(), offset)
+                layers.append(layer)
+                offset += layer.count
+        except (OSError, ValueError, struct.error):
+            return None
+
+        return CommitGraph(layers) if layers else None
+
+    @property
+    def count(self):
+        return self._count
+
+    def _layer(self, pos):
+        if len(self._layers) == 1:
+            return self._layers[0], pos
+        for layer in reversed(self._layers):
+            if pos >= layer.offset:
+                return layer, pos - layer.offset
+        raise IndexError(pos)
+
+    def find(self, oid):
+        """returns the position of hex @oid, -1 if not in the graph"""
+        try:
+            binOid = bytes.fromhex(oid)
+        except ValueError:
+            return -1
+
+        for layer in self._layers:
+            index = layer.find(binOid)
+            if index != -1:
+                return layer.offset + index
+        return -1
+
+    def oid(self, pos):
+        layer, index = self._layer(pos)
+        return layer.oid(index).hex()
+
+    def parents(self, pos):
+        layer, index = self._layer(pos)
+        p1, p2, _, _ = layer.commitData(index)
+        parents = []
+        if p1 != GRAPH_PARENT_NONE:
+            parents.append(p1)
+        if p2 & GRAPH_EXTRA_EDGES:
+            parents.extend(layer.extraEdges(p2 & ~GRAPH_EXTRA_EDGES))
+        elif p2 != GRAPH_PARENT_NONE:
+            parents.append(p2)
+        return parents
+
+    def generation(self, pos):
+        layer, index = self._layer(pos)
+        return layer.commitData(index)[2]
+
+    def commitTime(self, pos):
+        layer, index = self._layer(pos)
+        return layer.commitData(index)[3]
+
+    def parentOids(self, oid):
+        """returns the parents of hex @oid, None if not in the graph"""
+        pos = self.find(oid)
+        if pos == -1:
+            return None
+        return [self.oid(p) for p in self.parents(pos)]
+
+    def log(self, tips, missingParents=None, isInterrupted=None):
+        """returns [(sha1, parents)] reachable from @tips in topo order,
+        @missingParents(sha1) returns the parents of the commits not in
+        the graph, None is returned if failed"""
+
+        # walk with the positions, much faster than the sha1
+        def _key(oid):
+            pos = self.find(oid)
+            return oid if pos == -1 else pos
+
+        def _parentsOf(key):
+            if not isinstance(key, str):
+                return self.parents(key)
+            if missingParents is None:
+                return None
+            parents = missingParents(key)
+            if parents is None:
+                return None
+            return [_key(oid) for oid in parents]
+
+        result = topoOrder([_key(oid) for oid in tips],
+                           _parentsOf, isInterrupted)
+        if result is None:
+            return None
+
+        oids = {}
+        for key, _ in result:
+            oids[key] = key if isinstance(key, str) else self.oid(key)
+
+        # the parents are always in the result
+        return [(oids[key], [oids[p] for p in parents])
+                for key, parents in result]
+
+
+def topoOrder(tips, parentsOf, isInterrupted=None):
+    """returns [(commit, parents)] reachable from @tips in the order of
+    `git log --topo-order`, @parentsOf(commit) returns the parents,
+    or None if unknown"""
+    parentMap = {}
+    indegree = {}
+    stack = []
+    for tip in tips:
+        if tip not in indegree:
+            indegree[tip] = 0
+            stack.append(tip)
+
+    while stack:
+        if isInterrupted and isInterrupted():
+            return None
+
+        oid = stack.pop()
+        parents = parentsOf(oid)
+        if parents is None:
+            return None
+
+        parentMap[oid] = parents
+        for parent in parents:
+            if parent in indegree:
+                indegree[parent] += 1
+            else:
+                indegree[parent] = 1
+                stack.append(parent)
+
+    # the tips are emitted first, parents only after all their children
+    queue = [tip for tip in reversed(tips) if indegree[tip] == 0]
+    result = []
+    while queue:
+        oid = queue.pop()
+        for parent in parentMap[oid]:
+            indegree[parent] -= 1
+            if indegree[parent] == 0:
+                queue.append(parent)
+        result.append((oid, parentMap[oid]))
+
+    return result
@@ -1,13 +1,15 @@
 # -*- coding: utf-8 -*-
 
-import cProfile
-import pstats
-import io
 import os
-import chardet
+
+from datetime import datetime, timedelta, timezone
+
+from .encodingdetector import encodingCandidates
 
 
 log_fmt = "%H%x01%B%x01%an <%ae>%x01%ai%x01%cn <%ce>%x01%ci%x01%P"
+# the rest are read later when needed
+slim_log_fmt = "%H%x01%s%x01%P"
 html_escape_table = {
     "&": "&amp;",
     '"': "&quot;",
@@ -19,6 +21,11 @@ html_escape_table = {
 
 class Commit():
 
+    # there might be a huge number of commits
+    __slots__ = ("sha1", "comments", "author", "authorDate",
+                 "committer", "committerDate", "parents", "children",
+                 "subject", "authorName", "date")
+
     def __init__(self):
 
         self.sha1 = ""
@@ -30,6 +37,21 @@ class Commit():
         self.parents = []
         self.children = None
 
+        # for display only
+        self.subject = ""
+        self.authorName = ""
+        self.date = ""
+
+    def updateDisplayFields(self):
+        self.subject = self.comments.split('\n', 1)[0]
+        # name <email>
+        idx = self.author.rfind(" <")
+        if idx != -1 and self.author.endswith(">"):
+            self.authorName = self.author[:idx]
+        else:
+            self.authorName = self.author
+        self.date = self.authorDate.split(' ', 1)[0]
+
     def __str__(self):
         return "Commit: {0}\n"  \
                "Author: {1} {2}\n"  \
@@ -54,6 +76,58 @@ class Commit():
         commit.committer = parts[4]
         commit.committerDate = parts[5]
         commit.parents = [x for x in parts[6].split(" ") if x]
+        commit.updateDisplayFields()
+
+        return commit
+
+    @classmethod
+    def fromSlimString(cls, string):
+        commit = cls()
+
+        parts = string.split("\x01")
+        if len(parts) != 3:
+            return commit
+
+        commit.sha1 = parts[0]
+        commit.comments = parts[1]
+        commit.parents = [x for x in parts[2].split(" ") if x]
+        commit.subject = commit.comments
+
+        return commit
+
+    @classmethod
+    def fromRawObject(cls, sha1, data):
+        """parse the raw commit object @data of `git cat-file`"""
+        commit = cls()
+        commit.sha1 = sha1
+
+        header, _, message = data.partition(b"\n\n")
+        lines = header.split(b"\n")
+
+        encoding = "utf-8"
+        for line in lines:
+            if line.startswith(b"encoding "):
+                encoding = line[9:].decode("utf-8")
+                break
+
+        def _decode(value):
+            try:
+                return value.decode(encoding)
+            except (LookupError, UnicodeDecodeError):
+                return value.decode("utf-8", "replace")
+
+        for line in lines:
+            if line.startswith(b"parent "):
+                commit.parents.append(line[7:].decode("utf-8"))
+            elif line.startswith(b"author "):
+                commit.author, commit.authorDate = _splitIdent(
+                    _decode(line[7:]))
+            elif line.startswith(b"committer "):
+                commit.committer, commit.committerDate = _splitIdent(
+                    _decode(line[10:]))
+
+        commit.comments = _decode(message).strip("\n")
+        commit.updateDisplayFields()
 
         return commit
 
@@ -61,10 +135,14 @@ class Commit():
 class MyProfile():
 
     def __init__(self):
+        import cProfile
         self.pr = cProfile.Profile()
         self.pr.enable()
 
     def __del__(self):
+        import io
+        import pstats
+
         self.pr.disable()
         s = io.StringIO()
         ps = pstats.Stats(self.pr, stream=s).sort_stats("cumulative")
@@ -117,6 +195,27 @@ FIND_NOTFOUND = -1
 FIND_CANCELED = -2
 
 
+def _splitIdent(ident):
+    """returns ("name <email>", "date") of the @ident in commit object,
+    the date is the same as %ai of git log"""
+    idx = ident.rfind("> ")
+    if idx == -1:
+        return ident, ""
+
+    parts = ident[idx + 2:].split(" ")
+    try:
+        tz = parts[1]
+        offset = int(tz[1:3]) * 60 + int(tz[3:5])
+        if tz[0] == "-":
+            offset = -offset
+        date = datetime.fromtimestamp(
+            int(parts[0]), timezone(timedelta(minutes=offset)))
+    except (IndexError, ValueError, OverflowError, OSError):
+        return ident[:idx + 1], ""
+
+    return ident[:idx + 1], date.strftime("%Y-%m-%d %H:%M:%S ") + tz
+
+
 def htmlEscape(text):
     return "".join(html_escape_table.get(c, c) for c in text)
 
@@ -140,26 +239,16 @@ def decodeFileData(data, encoding="utf-8"):
     except UnicodeDecodeError:
         pass
 
-    encodings = ["utf-8", "gb18030", "utf16"]
-    if encoding in encodings:
-        encodings.remove(encoding)
-
-    # try the prefer encodings first
-    for e in encodings:
+    # only the ones able to decode a sample of data are tried
+    for e in encodingCandidates(data, encoding):
+        if e == encoding:
+            continue
         try:
             data = _fix_data(data, e)
             return data.decode(e), e
         except UnicodeDecodeError:
             pass
 
-    # try the buggy chardet
-    encoding = chardet.detect(data)["encoding"]
-    if encoding and encoding not in encodings:
-        try:
-            return data.decode(encoding), encoding
-        except UnicodeDecodeError:
-            pass
-
     # the last chance
     print(b"Warning: can't decode '%s'" % data)
     return data.decode(encoding, "replace"), None
@@ -18,27 +18,66 @@ from .colorschema import ColorSchema
 from .sourceviewer import SourceViewer
 from .textviewer import FindPart
 from .events import OpenLinkEvent
-
+from .encodingdetector import (
+    cacheEncoding,
+    cachedEncoding,
+    detectEncoding,
+    isWideEncoding)
+from .intraline import IntralineDiffer, MAX_HUNK_LINES
+from .syntax import LineSide, SyntaxHighlighter, lexerForPath
+from .stylehelper import dpiScaled
+
+from collections import OrderedDict
+
+import bisect
+import fnmatch
 import re
+import tempfile
 
 
 diff_re = re.compile(b"^diff --(git a/(.*) b/(.*)|cc (.*))")
 diff_begin_re = re.compile(r"^@{2,}( (\+|\-)[0-9]+(,[0-9]+)?)+ @{2,}")
 diff_begin_bre = re.compile(rb"^@{2,}( (\+|\-)[0-9]+(,[0-9]+)?)+ @{2,}")
+# the blobs of the file, "a,b..c" for the combined diff
+index_re = re.compile(rb"^index ([0-9a-f]+(,[0-9a-f]+)*\.\.[0-9a-f]+)")
 
 submodule_re = re.compile(
     rb"^Submodule (.*) [a-z0-9]{7,}\.{2,3}[a-z0-9]{7,}.*$")
 
 diff_encoding = "utf-8"
 
+# the diff content of a file used to detect its encoding
+DIFF_SAMPLE_SIZE = 64 * 1024
+
+# the collapsed diff lines are kept in memory until this size
+SPOOL_MEMORY_SIZE = 4 * 1024 * 1024
+
+# (repoDir, sha1, filterPath, gitArgs): {file: (added, deleted)}
+MAX_CACHED_STATS = 64
+_statsCache = OrderedDict()
+
+
+def detectDiffEncoding(data, key):
+    """detect the encoding of the diff lines @data of the blobs @key,
+    gb18030 decodes almost anything so it is never reused"""
+    encoding = detectEncoding(data, None, diff_encoding)
+    if key is not None and encoding and encoding != "gb18030" and \
+            not data.isascii():
+        cacheEncoding(key, encoding)
+    return encoding
+
 
 class FileListModel(QAbstractListModel):
 
     RowRole = Qt.UserRole
+    # (added, deleted), -1 for binary file
+    StatRole = Qt.UserRole + 1
+    SizeRole = Qt.UserRole + 2
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self._fileList = []
+        self._stats = {}
 
     def rowCount(self, parent=QModelIndex()):
         if parent.isValid():
@@ -79,6 +118,11 @@ class FileListModel(QAbstractListModel):
             return self._fileList[row][0]
         elif role == FileListModel.RowRole:
             return self._fileList[row][1]
+        elif role == FileListModel.StatRole:
+            return self._stats.get(self._fileList[row][0])
+        elif role == FileListModel.SizeRole:
+            stat = self._stats.get(self._fileList[row][0])
+            return max(0, stat[0]) + max(0, stat[1]) if stat else 0
 
         return None
 
@@ -103,14 +147,159 @@ class FileListModel(QAbstractListModel):
         self._fileList.append((file, row))
         self.endInsertRows()
 
+    def shiftRows(self, row, delta):
+        """the viewer rows after @row are moved by @delta"""
+        for i in range(len(self._fileList)):
+            file, fileRow = self._fileList[i]
+            if fileRow > row:
+                self._fileList[i] = (file, fileRow + delta)
+
+    def setStats(self, stats):
+        self._stats = stats
+        if self._fileList:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(self.rowCount() - 1, 0),
+                                  [FileListModel.StatRole,
+                                   FileListModel.SizeRole])
+
     def clear(self):
         self.removeRows(0, self.rowCount())
+        self._stats = {}
+
+
+class FileListProxyModel(QSortFilterProxyModel):
+
+    def lessThan(self, left, right):
+        # the comments always go first
+        ascending = self.sortOrder() == Qt.AscendingOrder
+        if left.row() == 0:
+            return ascending
+        if right.row() == 0:
+            return not ascending
+
+        return left.data(FileListModel.SizeRole) < \
+            right.data(FileListModel.SizeRole)
+
+
+class FileListDelegate(QStyledItemDelegate):
+
+    BarBlocks = 5
+
+    def paint(self, painter, option, index):
+        stat = index.data(FileListModel.StatRole)
+        if stat is None:
+            super().paint(painter, option, index)
+            return
+
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+
+        added, deleted = stat
+        if added < 0:
+            texts = [(self.tr("bin"), opt.palette.color(QPalette.Text))]
+        else:
+            texts = [("+%d" % added, ColorSchema.Adding),
+                     ("-%d" % deleted, ColorSchema.Deletion)]
+
+        fm = opt.fontMetrics
+        space = fm.width(' ')
+        blockSize = int(dpiScaled(6))
+        barWidth = FileListDelegate.BarBlocks * (blockSize + 1)
+        statWidth = sum(fm.width(text) for text, _ in texts) + \
+            space * (len(texts) + 1) + barWidth
+
+        # leave the space for the stat
+        nameWidth = opt.rect.width() - statWidth - space * 2
+        opt.text = fm.elidedText(opt.text, opt.textElideMode, nameWidth)
+
+        widget = opt.widget
+        style = widget.style() if widget else qApp.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, widget)
+
+        painter.save()
+        x = opt.rect.right() - statWidth
+        for text, color in texts:
+            width = fm.width(text)
+            rc = QRect(x, opt.rect.top(), width, opt.rect.height())
+            painter.setPen(color)
+            painter.drawText(rc, Qt.AlignLeft | Qt.AlignVCenter, text)
+            x += width + space
+
+        total = max(0, added) + max(0, deleted)
+        blocks = []
+        if total:
+            n = round(FileListDelegate.BarBlocks * added / total)
+            blocks = [ColorSchema.Adding] * n + \
+                [ColorSchema.Deletion] * (FileListDelegate.BarBlocks - n)
+        y = opt.rect.top() + (opt.rect.height() - blockSize) // 2
+        for i in range(FileListDelegate.BarBlocks):
+            color = blocks[i] if blocks else ColorSchema.Info
+            painter.fillRect(QRect(x, y, blockSize, blockSize), color)
+            x += blockSize + 1
+        painter.restore()
 
 
 class DiffType:
     File = 0
     FileInfo = 1
     Diff = 2
+    Collapsed = 3
+
+
+class DiffSpool():
+    """Keep the collapsed diff lines in a temp file, in memory if small"""
+
+    def __init__(self):
+        self._file = tempfile.SpooledTemporaryFile(SPOOL_MEMORY_SIZE)
+        self._size = 0
+        self._buffer = []
+
+    def append(self, line):
+        """returns the offset of @line"""
+        offset = self._size
+        self._buffer.append(line)
+        self._size += len(line) + 1
+        return offset
+
+    def flush(self):
+        if self._buffer:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(b'\n'.join(self._buffer) + b'\n')
+            self._buffer = []
+
+    def read(self, offset, size):
+        self.flush()
+        self._file.seek(offset)
+        return self._file.read(size)
+
+
+class CollapsedDiff():
+    """The diff lines of a file not loaded into the viewer"""
+
+    def __init__(self, spool, encodingKey, encoding):
+        self.spool = spool
+        self.encodingKey = encodingKey
+        self.encoding = encoding
+        # [offset, size] of each hunk in the spool
+        self.hunks = []
+        self.lineCount = 0
+
+    def append(self, line):
+        offset = self.spool.append(line)
+        if not self.hunks or line.startswith(b"@@"):
+            self.hunks.append([offset, 0])
+        self.hunks[-1][1] += len(line) + 1
+        self.lineCount += 1
+
+    def lines(self):
+        if not self.hunks:
+            return []
+
+        # the hunks are continuous
+        offset = self.hunks[0][0]
+        size = sum(hunk[1] for hunk in self.hunks)
+        data = self.spool.read(offset, size)
+        return data[:-1].split(b'\n')
 
 
 class DiffFetcher(DataFetcher):
@@ -122,10 +311,41 @@ class DiffFetcher(DataFetcher):
         self._isDiffContent = False
         self._row = 0
         self._firstPatch = True
+        self._encodingKey = None
+        self._encoding = None
+        self._spool = None
+        # the collapsed lines of current file
+        self._collapsed = None
+        self._collapseFile = False
+        self._fileLines = 0
+        self._collapsePatterns = []
+        self._maxFileLines = 0
+
+    def setCollapseRules(self, patterns, maxFileLines):
+        """collapse the files matched @patterns, or the lines after
+        @maxFileLines, 0 to never collapse by lines"""
+        self._collapsePatterns = patterns
+        self._maxFileLines = maxFileLines
+
+    def _needCollapse(self, path):
+        name = os.path.basename(path)
+        for pattern in self._collapsePatterns:
+            if fnmatch.fnmatch(name, pattern) or \
+                    fnmatch.fnmatch(path, pattern):
+                return True
+        return False
+
+    def _beginFile(self, path):
+        self._collapsed = None
+        self._collapseFile = path is not None and \
+            self._needCollapse(path.decode(diff_encoding, "replace"))
+        self._fileLines = 0
 
     def parse(self, data):
         lineItems = []
         fileItems = {}
+        # the diff lines waiting for the encoding of current file
+        pending = []
 
         if data[-1] == ord(self.separator):
             data = data[:-1]
@@ -141,19 +361,24 @@ class DiffFetcher(DataFetcher):
                     fileA = match.group(2)
                     fileB = match.group(3)
 
+                self._detectEncoding(lineItems, pending)
                 if not self._firstPatch:
-                    lineItems.append((DiffType.Diff, b''))
+                    lineItems.append((DiffType.Diff, b'', diff_encoding))
                     self._row += 1
                 self._firstPatch = False
 
                 fileItems[fileA.decode(diff_encoding)] = self._row
                 # renames, keep new file name only
                 if fileB and fileB != fileA:
-                    lineItems.append((DiffType.File, fileB))
+                    lineItems.append((DiffType.File, fileB, diff_encoding))
                     fileItems[fileB.decode(diff_encoding)] = self._row
                 else:
-                    lineItems.append((DiffType.File, fileA))
+                    lineItems.append((DiffType.File, fileA, diff_encoding))
 
+                # known from the index line
+                self._encodingKey = None
+                self._encoding = None
+                self._beginFile(fileB or fileA)
                 self._row += 1
                 self._isDiffContent = False
 
@@ -161,19 +386,24 @@ class DiffFetcher(DataFetcher):
 
             match = submodule_re.match(line)
             if match:
+                self._detectEncoding(lineItems, pending)
                 if not self._firstPatch:
-                    lineItems.append((DiffType.Diff, b''))
+                    lineItems.append((DiffType.Diff, b'', diff_encoding))
                     self._row += 1
                 self._firstPatch = False
 
                 submodule = match.group(1)
-                lineItems.append((DiffType.File, submodule))
+                lineItems.append((DiffType.File, submodule, diff_encoding))
                 fileItems[submodule.decode(diff_encoding)] = self._row
                 self._row += 1
 
-                lineItems.append((DiffType.FileInfo, line))
+                lineItems.append((DiffType.FileInfo, line, diff_encoding))
                 self._row += 1
 
+                self._encodingKey = None
+                self._encoding = diff_encoding
+                self._beginFile(None)
+
                 self._isDiffContent = True
                 continue
 
@@ -191,16 +421,72 @@ class DiffFetcher(DataFetcher):
 
             if itemType != DiffType.Diff:
                 line = line.rstrip(b'\r')
-            lineItems.append((itemType, line))
+                lineItems.append((itemType, line, diff_encoding))
+                match = index_re.match(line)
+                if match:
+                    self._encodingKey = (Git.REPO_DIR, match.group(1))
+                    self._encoding = cachedEncoding(self._encodingKey)
+            elif self._collapsed or self._collapseFile or \
+                    (self._maxFileLines and
+                     self._fileLines >= self._maxFileLines):
+                if not self._collapsed:
+                    self._collapsed = CollapsedDiff(
+                        self._spool, self._encodingKey, self._encoding)
+                    lineItems.append(
+                        (DiffType.Collapsed, b'', self._collapsed))
+                    self._row += 1
+                self._collapsed.append(line)
+                continue
+            else:
+                self._fileLines += 1
+                if self._encoding is None:
+                    pending.append(len(lineItems))
+                lineItems.append((itemType, line, self._encoding))
             self._row += 1
 
+        self._detectEncoding(lineItems, pending)
+        if self._collapsed:
+            self._spool.flush()
         if lineItems:
             self.diffAvailable.emit(lineItems, fileItems)
 
+    def _detectEncoding(self, lineItems, pending):
+        """detect the encoding of current file once with the first
+        DIFF_SAMPLE_SIZE bytes of its diff lines in @pending"""
+        if not pending:
+            return
+
+        sample = []
+        size = 0
+        for i in pending:
+            content = lineItems[i][1]
+            sample.append(content)
+            size += len(content)
+            if size >= DIFF_SAMPLE_SIZE:
+                break
+
+        data = b'\n'.join(sample)
+        encoding = detectDiffEncoding(data, self._encodingKey)
+        # not sure with plain ascii, detect again with the rest lines
+        if not data.isascii():
+            self._encoding = encoding
+
+        for i in pending:
+            itemType, content, _ = lineItems[i]
+            lineItems[i] = (itemType, content, encoding)
+        pending.clear()
+
     def resetRow(self, row):
         self._row = row
         self._isDiffContent = False
         self._firstPatch = True
+        self._encodingKey = None
+        self._encoding = None
+        # the previous one is freed with its collapsed lines
+        self._spool = DiffSpool()
+        self._collapsed = None
+        self._collapseFile = False
+        self._fileLines = 0
 
     def cancel(self):
         self._isDiffContent = False
@@ -211,15 +497,90 @@ class DiffFetcher(DataFetcher):
         filePath = args[1]
         gitArgs = args[2]
 
-        if sha1 == Git.LCC_SHA1:
-            git_args = ["diff-index", "--cached", "HEAD"]
-        elif sha1 == Git.LUC_SHA1:
-            git_args = ["diff-files"]
-        else:
-            git_args = ["diff-tree", "-r", "--root", sha1]
+        git_args = diffCommandArgs(sha1)
+        git_args.extend(["-p", "--submodule", "-U3"])
+        git_args.extend(DIFF_OPTIONS)
+
+        if gitArgs:
+            git_args.extend(gitArgs)
+
+        if filePath:
+            git_args.append("--")
+            git_args.extend(filePath)
+
+        return git_args
+
+
+# the same changes for the diff and its stats
+DIFF_OPTIONS = ["--textconv", "-C", "--cc", "--no-commit-id"]
+
+
+def diffCommandArgs(sha1):
+    if sha1 == Git.LCC_SHA1:
+        return ["diff-index", "--cached", "HEAD"]
+    elif sha1 == Git.LUC_SHA1:
+        return ["diff-files"]
+    return ["diff-tree", "-r", "--root", sha1]
+
+
+class NumstatFetcher(DataFetcher):
+    """Fetch the added and deleted lines of each file"""
+
+    # {file: (added, deleted)}, -1 for binary file
+    statsAvailable = Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.separator = b'\0'
+        self._stats = {}
+        self._stat = None
+        # the old and new paths of a rename
+        self._renamePaths = None
+        self._key = None
+
+    def parse(self, data):
+        if data[-1] == 0:
+            data = data[:-1]
+
+        for field in data.split(b'\0'):
+            if self._renamePaths is not None:
+                self._renamePaths.append(field.decode(diff_encoding))
+                if len(self._renamePaths) == 2:
+                    for path in self._renamePaths:
+                        self._stats[path] = self._stat
+                    self._renamePaths = None
+                continue
 
-        git_args.extend(["-p", "--textconv", "--submodule",
-                         "-C", "--cc", "--no-commit-id", "-U3"])
+            parts = field.split(b'\t', 2)
+            if len(parts) != 3:
+                continue
+
+            if parts[0] == b'-':
+                self._stat = (-1, -1)
+            else:
+                self._stat = (int(parts[0]), int(parts[1]))
+
+            if parts[2]:
+                self._stats[parts[2].decode(diff_encoding)] = self._stat
+            else:
+                # renamed, the old and new paths follow
+                self._renamePaths = []
+
+    def reset(self):
+        super().reset()
+        self._stats = {}
+        self._stat = None
+        self._renamePaths = None
+
+    def makeArgs(self, args):
+        sha1 = args[0]
+        filePath = args[1]
+        gitArgs = args[2]
+        self._key = args[3]
+
+        git_args = diffCommandArgs(sha1)
+        git_args.extend(["--numstat", "-z"])
+        git_args.extend(DIFF_OPTIONS)
 
         if gitArgs:
             git_args.extend(gitArgs)
@@ -230,6 +591,21 @@ class DiffFetcher(DataFetcher):
 
         return git_args
 
+    def onDataFinished(self, exitCode, exitStatus):
+        stats = self._stats
+        key = self._key
+        super().onDataFinished(exitCode, exitStatus)
+
+        if exitCode != 0:
+            return
+
+        if key is not None:
+            _statsCache[key] = stats
+            if len(_statsCache) > MAX_CACHED_STATS:
+                _statsCache.popitem(False)
+
+        self.statsAvailable.emit(stats)
+
 
 class DiffView(QWidget):
     requestCommit = Signal(str, bool, bool)
@@ -249,6 +625,9 @@ class DiffView(QWidget):
         self.branchDir = None
         self.gitArgs = []
         self.fetcher = DiffFetcher(self)
+        self.statFetcher = NumstatFetcher(self)
+        # {file: (added, deleted)} of current commit
+        self.stats = {}
 
         self.twMenu.addAction(self.tr("External &diff"),
                               self.__onExternalDiff)
@@ -272,15 +651,20 @@ class DiffView(QWidget):
                               self.__onBlameFile)
         self.twMenu.addAction(self.tr("Blame parent commit"),
                               self.__onBlameParentCommit)
+        self.twMenu.addSeparator()
+        self.acSortBySize = self.twMenu.addAction(
+            self.tr("Sort by si&ze"), self.__onSortBySize)
+        self.acSortBySize.setCheckable(True)
 
         self.splitter = QSplitter(self)
         self.splitter.addWidget(self.viewer)
 
         self.fileListView.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.fileListModel = FileListModel(self)
-        self.fileListProxy = QSortFilterProxyModel(self)
+        self.fileListProxy = FileListProxyModel(self)
         self.fileListProxy.setSourceModel(self.fileListModel)
         self.fileListView.setModel(self.fileListProxy)
+        self.fileListView.setItemDelegate(FileListDelegate(self))
 
         fileListFilter = QLineEdit(self)
         fileListFilter.textChanged.connect(
@@ -314,6 +698,7 @@ class DiffView(QWidget):
                 self.__onFileListViewDoubleClicked)
 
         self.viewer.fileRowChanged.connect(self.__onFileRowChanged)
+        self.viewer.collapsedExpanded.connect(self.__onCollapsedExpanded)
         self.viewer.requestCommit.connect(self.requestCommit)
         self.viewer.requestBlame.connect(self.requestBlame)
 
@@ -330,6 +715,8 @@ class DiffView(QWidget):
             self.__onDiffAvailable)
         self.fetcher.fetchFinished.connect(
             self.__onFetchFinished)
+        self.statFetcher.statsAvailable.connect(
+            self.__onStatsAvailable)
 
         self._difftoolProc = None
         self._withinFileRowChanged = False
@@ -486,6 +873,38 @@ class DiffView(QWidget):
 
         self.twMenu.exec_(self.fileListView.mapToGlobal(pos))
 
+    def __onCollapsedExpanded(self, lineNo, delta):
+        self.fileListModel.shiftRows(lineNo, delta)
+
+    def __onSortBySize(self):
+        if self.acSortBySize.isChecked():
+            self.fileListProxy.sort(0, Qt.DescendingOrder)
+        else:
+            # back to the diff order
+            self.fileListProxy.sort(-1)
+
+    def __onStatsAvailable(self, stats):
+        self.stats = stats
+        self.fileListModel.setStats(stats)
+
+    def __fetchStats(self, sha1):
+        self.statFetcher.cancel()
+        if not qApp.settings().diffStat():
+            return
+
+        # the local changes are not fixed
+        key = None
+        if sha1 not in [Git.LUC_SHA1, Git.LCC_SHA1]:
+            key = (self.branchDir or Git.REPO_DIR, sha1,
+                   tuple(self.filterPath or ()), tuple(self.gitArgs))
+            stats = _statsCache.get(key)
+            if stats is not None:
+                _statsCache.move_to_end(key)
+                self.__onStatsAvailable(stats)
+                return
+
+        self.statFetcher.fetch(sha1, self.filterPath, self.gitArgs, key)
+
     def __onDiffAvailable(self, lineItems, fileItems):
         self.__addToFileListView(fileItems)
         self.viewer.appendLines(lineItems)
@@ -571,14 +990,19 @@ class DiffView(QWidget):
 
         self.viewer.setParentCount(len(commit.parents))
         self.viewer.beginReading()
+        sett = qApp.settings()
+        self.fetcher.setCollapseRules(sett.collapsePatterns(),
+                                      sett.maxDiffFileLines())
         self.fetcher.resetRow(self.viewer.textLineCount())
         self.fetcher.fetch(commit.sha1, self.filterPath, self.gitArgs)
+        self.__fetchStats(commit.sha1)
         # FIXME: delay showing the spinner when loading small diff to avoid flicker
         self.beginFetch.emit()
 
     def clear(self):
         self.fileListModel.clear()
         self.viewer.clear()
+        self.stats = {}
 
     def setFilterPath(self, path):
         # no need update
@@ -599,6 +1023,7 @@ class DiffView(QWidget):
     def setBranchDir(self, branchDir):
         self.branchDir = branchDir
         self.fetcher.cwd = branchDir
+        self.statFetcher.cwd = branchDir
 
     def _onFileListFilterChanged(self, text):
         self.fileListProxy.setFilterRegExp(text)
@@ -687,6 +1112,21 @@ class InfoTextLine(TextLine):
         self._layout.setAdditionalFormats(formats)
 
 
+class CollapsedTextLine(InfoTextLine):
+
+    def __init__(self, viewer, text, collapsed):
+        super().__init__(viewer, DiffType.Collapsed, text)
+        self.collapsed = collapsed
+
+    def rehighlight(self):
+        fmt = QTextCharFormat()
+        fmt.setFontItalic(True)
+        fmt.setForeground(ColorSchema.Link)
+        fmtRg = createFormatRange(0, len(self.text()), fmt)
+
+        self._layout.setAdditionalFormats([fmtRg])
+
+
 class AuthorTextLine(LinkTextLine):
 
     def __init__(self, viewer, text):
@@ -707,6 +1147,8 @@ class PatchViewer(SourceViewer):
     fileRowChanged = Signal(int)
     requestCommit = Signal(str, bool, bool)
     requestBlame = Signal(str, bool)
+    # lineNo, the count of lines added
+    collapsedExpanded = Signal(int, int)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -719,36 +1161,92 @@ class PatchViewer(SourceViewer):
 
         self._parentCount = 1
 
+        # lineNo: [(start, length)] of the changed words
+        self._intralineSpans = {}
+        self._intralineDiffer = IntralineDiffer(self)
+        self._intralineDiffer.resultAvailable.connect(
+            self._onIntralineAvailable)
+
+        # the first line of each file and its highlighter
+        self._sectionLines = []
+        self._highlighters = []
+
         self.verticalScrollBar().valueChanged.connect(
             self._onVScollBarValueChanged)
         self.linkActivated.connect(self._onLinkActivated)
         self.findResultAvailable.connect(self._onFindResultAvailable)
+        self.textLineClicked.connect(self._onTextLineClicked)
 
     def endReading(self):
         super().endReading()
         if self.findWidget and self.findWidget.isVisible():
             # redo a find
             self._onFind(self.findWidget.text)
+        # the last hunk might be incomplete when painted
+        self.viewport().update()
+
+    def clear(self):
+        super().clear()
+        self._intralineSpans.clear()
+        self._intralineDiffer.cancel()
+        self._sectionLines.clear()
+        self._highlighters.clear()
+
+    def appendLines(self, lines):
+        lineNo = self.textLineCount()
+        for i in range(len(lines)):
+            if lines[i][0] == DiffType.File:
+                self._addSection(lineNo + i, lines[i][1])
+        super().appendLines(lines)
+
+    def initTextLine(self, textLine, lineNo):
+        super().initTextLine(textLine, lineNo)
+        if isinstance(textLine, DiffTextLine):
+            index = bisect.bisect_right(self._sectionLines, lineNo) - 1
+            if index >= 0 and self._highlighters[index]:
+                textLine.setHighlighter(self._highlighters[index])
 
     def toTextLine(self, item):
-        type, content = item
+        type, content, encoding = item
 
         # alloc too many objects at the same time is too slow
         # so delay construct TextLine and decode bytes here
         if type == DiffType.Diff:
-            text, _ = decodeFileData(content, diff_encoding)
+            text = self._decodeDiff(content, encoding)
             # FIXME: The git may generate some patch with \x00 char (such as: b'- \x00')
             # The origin file is a normal text file and not Unicode encoding
             textLine = DiffTextLine(self, text.replace(
                 '\x00', ''), self._parentCount)
         elif type == DiffType.File or \
                 type == DiffType.FileInfo:
-            textLine = InfoTextLine(self, type, content.decode(diff_encoding))
+            textLine = InfoTextLine(self, type, content.decode(encoding))
+        elif type == DiffType.Collapsed:
+            # the encoding is the collapsed lines
+            text = self.tr("{0} lines in {1} hunks are collapsed,"
+                           " click to load").format(
+                encoding.lineCount, len(encoding.hunks))
+            textLine = CollapsedTextLine(self, text, encoding)
         else:
             assert(False)
 
         return textLine
 
+    @staticmethod
+    def _decodeDiff(content, encoding):
+        # utf-8 is strict enough to go first, the encoding detected for
+        # the file might be wrong for the mixed content
+        candidates = [encoding] if encoding else []
+        if not encoding or not isWideEncoding(encoding):
+            candidates.insert(0, diff_encoding)
+        for candidate in candidates:
+            try:
+                return content.decode(candidate)
+            except UnicodeDecodeError:
+                pass
+
+        text, _ = decodeFileData(content, encoding or diff_encoding)
+        return text
+
     def addAuthorLine(self, name):
         textLine = AuthorTextLine(self, name)
         self.appendTextLine(textLine)
@@ -770,6 +1268,9 @@ class PatchViewer(SourceViewer):
         formats = []
 
         if isinstance(textLine, DiffTextLine):
+            fmt = self._createIntralineFormats(textLine)
+            if fmt:
+                formats.extend(fmt)
             fmt = self._createDiffFormats(textLine)
             if fmt:
                 formats.extend(fmt)
@@ -863,6 +1364,163 @@ class PatchViewer(SourceViewer):
 
         return None
 
+    def _createIntralineFormats(self, textLine):
+        # not for the combined diff
+        if self._parentCount > 1:
+            return None
+
+        text = textLine.text()
+        if not text or (text[0] != '+' and text[0] != '-'):
+            return None
+
+        spans = self._intralineSpans.get(textLine.lineNo())
+        if spans is None:
+            self._diffHunk(textLine.lineNo())
+            return None
+
+        if not spans:
+            return None
+
+        fmt = QTextCharFormat()
+        if text[0] == '+':
+            fmt.setBackground(ColorSchema.AddingWord)
+        else:
+            fmt.setBackground(ColorSchema.DeletionWord)
+
+        return [createFormatRange(start, length, fmt)
+                for start, length in spans]
+
+    def _isHunkLine(self, lineNo):
+        textLine = self.textLineAt(lineNo)
+        if not isinstance(textLine, DiffTextLine):
+            return False
+
+        text = textLine.text()
+        return text and text[0] in " +-\\"
+
+    def _diffHunk(self, lineNo):
+        """diff the changed words of the hunk of @lineNo in background"""
+        # marked as no changed words before the result available
+        begin = lineNo
+        while begin > 0 and lineNo - begin < MAX_HUNK_LINES and \
+                self._isHunkLine(begin - 1):
+            begin -= 1
+
+        end = lineNo + 1
+        count = self.textLineCount()
+        while end < count and end - begin < MAX_HUNK_LINES and \
+                self._isHunkLine(end):
+            end += 1
+
+        # wait for the rest lines
+        if end == count and self._inReading:
+            return
+
+        for i in range(begin, end):
+            self._intralineSpans[i] = []
+
+        # too big to diff, keep them marked
+        if end - begin >= MAX_HUNK_LINES:
+            return
+
+        blocks = []
+        removed = []
+        added = []
+        for i in range(begin, end + 1):
+            text = self.textLineAt(i).text() if i < end else ""
+            if text.startswith('\\'):
+                continue
+            if text.startswith('-') and not added:
+                removed.append((i, text))
+                continue
+            if text.startswith('+') and removed:
+                added.append((i, text))
+                continue
+
+            if removed and added:
+                blocks.append((removed, added))
+            removed = []
+            added = []
+            if text.startswith('-'):
+                removed.append((i, text))
+
+        if blocks:
+            self._intralineDiffer.diff(begin, blocks)
+
+    def _addSection(self, lineNo, path):
+        lexer = lexerForPath(path.decode(diff_encoding, "replace"))
+        highlighter = None
+        if lexer:
+            highlighter = SyntaxHighlighter(lexer, self._codeText, lineNo)
+        self._sectionLines.append(lineNo)
+        self._highlighters.append(highlighter)
+
+    def _codeText(self, lineNo):
+        textLine = self.textLineAt(lineNo)
+        if not isinstance(textLine, DiffTextLine):
+            return None
+
+        # the prefix of each parent
+        n = self._parentCount
+        text = textLine.text()
+        if text.startswith("@@"):
+            # a new hunk
+            return None, 0
+        if len(text) < n:
+            return None
+        for i in range(n):
+            if text[i] not in " +-":
+                return None
+
+        prefix = text[:n]
+        if '-' in prefix:
+            sides = LineSide.Old
+        elif '+' in prefix:
+            sides = LineSide.New
+        else:
+            sides = LineSide.Both
+
+        return text[n:], n, sides
+
+    def _expandCollapsed(self, textLine):
+        collapsed = textLine.collapsed
+        lines = collapsed.lines()
+
+        encoding = collapsed.encoding
+        if not encoding and collapsed.encodingKey:
+            encoding = cachedEncoding(collapsed.encodingKey)
+        if not encoding:
+            data = b'\n'.join(lines)[:DIFF_SAMPLE_SIZE]
+            encoding = detectDiffEncoding(data, collapsed.encodingKey)
+
+        lineNo = textLine.lineNo()
+        self.replaceLines(lineNo, 1, [(DiffType.Diff, line, encoding)
+                                      for line in lines])
+
+        delta = len(lines) - 1
+        index = bisect.bisect_right(self._sectionLines, lineNo)
+        if index > 0 and self._highlighters[index - 1]:
+            self._highlighters[index - 1].invalidate(lineNo)
+        for i in range(index, len(self._sectionLines)):
+            self._sectionLines[i] += delta
+            if self._highlighters[i]:
+                self._highlighters[i].setFirstLine(self._sectionLines[i])
+
+        self._intralineSpans.clear()
+        self._intralineDiffer.cancel()
+
+        self.collapsedExpanded.emit(lineNo, delta)
+
+    def _onTextLineClicked(self, textLine):
+        # the rows of the files after are unknown yet
+        if isinstance(textLine, CollapsedTextLine) and \
+                not self._inReading:
+            self._expandCollapsed(textLine)
+
+    def _onIntralineAvailable(self, key, result):
+        self._intralineSpans.update(result)
+        self.viewport().update()
+
     def _onVScollBarValueChanged(self, value):
         if not self.hasTextLines():
             return
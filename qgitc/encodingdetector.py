@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import threading
+
+from collections import OrderedDict
+
+
+__all__ = ["EncodingDetector", "detectEncoding", "cachedEncoding",
+           "cacheEncoding", "encodingCandidates", "isWideEncoding"]
+
+
+# the bytes checked at both the head and tail of big data
+SAMPLE_SIZE = 32 * 1024
+# chardet is very slow, feed it a prefix only
+CHARDET_SIZE = 16 * 1024
+# the guess of chardet for a mixed content is mostly wrong
+MIN_CONFIDENCE = 0.5
+MAX_CACHED_ENCODINGS = 1024
+
+# utf-32 first as its BOM starts with the utf-16 one
+_boms = [
+    (codecs.BOM_UTF32_BE, "utf-32be"),
+    (codecs.BOM_UTF32_LE, "utf-32le"),
+    (codecs.BOM_UTF16_BE, "utf-16be"),
+    (codecs.BOM_UTF16_LE, "utf-16le"),
+    (codecs.BOM_UTF8, "utf-8"),
+]
+
+
+def _sniffBom(data):
+    for bom, encoding in _boms:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+
+def isWideEncoding(encoding):
+    """utf-16 or utf-32, any bytes can be a part of their chars"""
+    return "16" in encoding or "32" in encoding
+
+
+def _isValid(data, encoding):
+    """check the head and tail only for big @data"""
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)
+        if len(data) <= 2 * SAMPLE_SIZE:
+            decoder().decode(data, True)
+            return True
+
+        # a truncated char at the end is fine
+        decoder().decode(data[:SAMPLE_SIZE], False)
+        if not isWideEncoding(encoding):
+            tail = data[-SAMPLE_SIZE:]
+            # line feed is never a part of multibyte char
+            pos = tail.find(b'\n')
+            if pos != -1:
+                decoder().decode(tail[pos + 1:], True)
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+    return True
+
+
+def _chardet(data, minConfidence):
+    # it is slow to import
+    import chardet
+    result = chardet.detect(data[:CHARDET_SIZE])
+    encoding = result["encoding"]
+    if not encoding or (result["confidence"] or 0) < minConfidence:
+        return None
+    return encoding.lower()
+
+
+def encodingCandidates(data, preferEncoding="utf-8", minConfidence=0):
+    """yields the encodings that might decode @data, the most likely
+    first, the ones failed to decode the sample are skipped"""
+    tried = set()
+
+    encoding = _sniffBom(data)
+    if encoding:
+        tried.add(encoding)
+        yield encoding
+
+    # the wide ones can decode almost anything, trust them with zeros
+    hasZero = b'\0' in data
+    for encoding in [preferEncoding, "utf-8", "gb18030", "utf16"]:
+        if encoding in tried:
+            continue
+        tried.add(encoding)
+        if (hasZero or not isWideEncoding(encoding)) and \
+                _isValid(data, encoding):
+            yield encoding
+
+    if data.isascii():
+        return
+
+    encoding = _chardet(data, minConfidence)
+    if encoding and encoding not in tried and _isValid(data, encoding):
+        yield encoding
+
+
+class EncodingDetector():
+    """Detect the encoding of file data, the result is cached with
+    the key like blob sha1 or path for the next time"""
+
+    def __init__(self, maxCount=MAX_CACHED_ENCODINGS):
+        self._maxCount = maxCount
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, key):
+        """returns the encoding of @key, None if not detected"""
+        with self._lock:
+            encoding = self._cache.get(key)
+            if encoding:
+                self._cache.move_to_end(key)
+            return encoding
+
+    def detect(self, data, key=None, preferEncoding="utf-8"):
+        """returns the encoding of @data, None if unknown"""
+        if key is not None:
+            encoding = self.cached(key)
+            if encoding:
+                return encoding
+
+        if not data:
+            return preferEncoding
+
+        candidates = encodingCandidates(data, preferEncoding, MIN_CONFIDENCE)
+        encoding = next(candidates, None)
+        # plain ascii tells nothing about the rest of file
+        if encoding and key is not None and not data.isascii():
+            self.cache(key, encoding)
+
+        return encoding
+
+    def cache(self, key, encoding):
+        with self._lock:
+            self._cache[key] = encoding
+            self._cache.move_to_end(key)
+            if len(self._cache) > self._maxCount:
+                self._cache.popitem(False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_detector = EncodingDetector()
+
+
+def detectEncoding(data, key=None, preferEncoding="utf-8"):
+    return _detector.detect(data, key, preferEncoding)
+
+
+def cachedEncoding(key):
+    return _detector.cached(key)
+
+
+def cacheEncoding(key, encoding):
+    _detector.cache(key, encoding)
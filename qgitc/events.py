@@ -30,3 +30,13 @@ class OpenLinkEvent(QEvent):
     def __init__(self, link):
         super().__init__(QEvent.Type(OpenLinkEvent.Type))
         self.link = link
+
+
+class ShowLogEvent(QEvent):
+
+    Type = QEvent.User + 4
+
+    def __init__(self, filterFile=None, compareMode=False):
+        super().__init__(QEvent.Type(ShowLogEvent.Type))
+        self.filterFile = filterFile
+        self.compareMode = compareMode
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from .gitutils import Git, GitProcess, Ref
+from .lanes import Lanes
+
+import json
+
+
+__all__ = ["exportLogArgs", "exportLog"]
+
+
+READ_SIZE = 65536
+
+_refTypes = {
+    Ref.TAG: "tag",
+    Ref.HEAD: "head",
+    Ref.REMOTE: "remote",
+}
+
+
+def exportLogArgs(logArgs=None):
+    """the git log args, the lanes require the topo order"""
+    args = ["log", "-z", "--topo-order", "--parents", "--no-color",
+            "--pretty=format:%H%x01%P"]
+    if logArgs:
+        args.extend(logArgs)
+    return args
+
+
+def _readCommits(stream):
+    """yields (sha1, parents) read from @stream chunk by chunk"""
+    pending = b''
+    while True:
+        data = stream.read(READ_SIZE)
+        if not data:
+            break
+
+        parts = (pending + data).split(b'\0')
+        pending = parts[-1]
+        for part in parts[:-1]:
+            yield _parseCommit(part)
+
+    if pending:
+        yield _parseCommit(pending)
+
+
+def _parseCommit(data):
+    sha1, parents = data.decode("utf-8").split("\x01")
+    return sha1, parents.split() if parents else []
+
+
+def exportLog(output, logArgs=None, repoDir=None):
+    """write each commit of git log as a JSON line to @output, only
+    the lanes of current commit are kept so the memory doesn't grow
+    with the commits. Returns (exitCode, error)"""
+    refMap = Git.refs() or {}
+    lanes = Lanes()
+
+    process = GitProcess(repoDir or Git.REPO_DIR, exportLogArgs(logArgs))
+    try:
+        for sha1, parents in _readCommits(process.process.stdout):
+            refs = [{"name": ref.name, "type": _refTypes.get(ref.type)}
+                    for ref in refMap.get(sha1, [])]
+            row = {"sha1": sha1,
+                   "parents": parents,
+                   "lanes": lanes.update(sha1, parents),
+                   "refs": refs}
+            output.write(json.dumps(row, separators=(",", ":")))
+            output.write("\n")
+    except BaseException:
+        process.process.kill()
+        process.process.wait()
+        raise
+
+    error = process.process.stderr.read()
+    process.process.wait()
+
+    return process.returncode, error.decode("utf-8", "replace")
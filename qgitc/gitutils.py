@@ -4,10 +4,16 @@ from collections import defaultdict
 
 import subprocess
 import os
-import bisect
 import re
+import threading
 
 from .common import log_fmt
+from .refreader import RefReader
+
+
+# RefReader: (result of the reader, RefDatabase)
+_refDbCache = {}
+_refDbLock = threading.Lock()
 
 
 class GitProcess():
@@ -72,39 +78,154 @@ class Ref():
     def name(self, name):
         self._name = name
 
-    @classmethod
-    def fromRawString(cls, string):
-        if not string or len(string) < 46:
-            return None
 
-        sha1 = string[0:40]
-        name = string[41:]
+class RefDatabase():
+    """The refs of a repo read from the ref files directly,
+    or loaded by a single `for-each-ref` call"""
 
-        if not name.startswith("refs/"):
-            return None
+    _fields = ["objectname", "*objectname", "refname", "HEAD", "symref"]
 
-        name = name[5:]
-
-        _type = Ref.INVALID
-        _name = None
-
-        if name.startswith("heads/"):
-            _type = Ref.HEAD
-            _name = name[6:]
-        elif name.startswith("remotes") \
-                and not name.endswith("HEAD"):
-            _type = Ref.REMOTE
-            _name = name
-        elif name.startswith("tags/"):
-            _type = Ref.TAG
-            if name.endswith("^{}"):
-                _name = name[5:-3]
-            else:
-                _name = name[5:]
-        else:
+    def __init__(self):
+        # name: sha1
+        self._heads = {}
+        self._remotes = {}
+        # name: (sha1 of tag object, sha1 of the peeled target)
+        self._tags = {}
+
+        self._head = None
+        self._headSha1 = None
+        self._refMap = None
+
+    @staticmethod
+    def load():
+        """returns None if failed to read the refs"""
+        reader = RefReader.forRepo(Git.REPO_DIR)
+        if not reader:
+            return RefDatabase.loadFromGit()
+
+        result = reader.read()
+        with _refDbLock:
+            cache = _refDbCache.get(reader)
+        # nothing changed
+        if cache and cache[0] is result:
+            return cache[1]
+
+        records, detachedOid = result
+        refDb = RefDatabase()
+        refDb.addRecords(records)
+        if refDb._head is None:
+            refDb._headSha1 = detachedOid
+
+        with _refDbLock:
+            _refDbCache[reader] = (result, refDb)
+        return refDb
+
+    @staticmethod
+    def loadFromGit():
+        fmt = "%00".join(["%(" + field + ")"
+                          for field in RefDatabase._fields])
+        data = Git.checkOutput(["for-each-ref", "--format=" + fmt])
+        if data is None:
             return None
 
-        return cls(_type, _name)
+        refDb = RefDatabase()
+        refDb.parse(data)
+        # detached HEAD, or not born yet
+        if refDb._head is None:
+            refDb._headSha1 = Git.revHead()
+
+        return refDb
+
+    def parse(self, data):
+        """parse the output of `for-each-ref` with the fields"""
+        records = []
+        for line in data.decode("utf-8").split('\n'):
+            parts = line.split('\0')
+            if len(parts) == len(RefDatabase._fields):
+                records.append(parts)
+
+        self.addRecords(records)
+
+    def addRecords(self, records):
+        """add the list of (sha1, peeled, refname, head, symref)"""
+        for sha1, peeled, refname, head, symref in records:
+            if refname.startswith("refs/heads/"):
+                name = refname[11:]
+                self._heads[name] = sha1
+                if head == "*":
+                    self._head = name
+                    self._headSha1 = sha1
+            elif refname.startswith("refs/remotes/"):
+                # the default branch of remote
+                if symref:
+                    continue
+                self._remotes[refname[5:]] = sha1
+            elif refname.startswith("refs/tags/"):
+                self._tags[refname[10:]] = (sha1, peeled or sha1)
+
+        self._refMap = None
+
+    @property
+    def head(self):
+        """the current branch name, None if detached"""
+        return self._head
+
+    @property
+    def headSha1(self):
+        return self._headSha1
+
+    @property
+    def heads(self):
+        return self._heads
+
+    @property
+    def remotes(self):
+        return self._remotes
+
+    @property
+    def tags(self):
+        return self._tags
+
+    def tagTarget(self, name):
+        tag = self._tags.get(name)
+        return tag[1] if tag else None
+
+    def refMap(self):
+        """the refs of each sha1, tags go first"""
+        if self._refMap is not None:
+            return self._refMap
+
+        refMap = defaultdict(list)
+        for name, (_, sha1) in self._tags.items():
+            refMap[sha1].append(Ref(Ref.TAG, name))
+        for name, sha1 in self._heads.items():
+            refMap[sha1].append(Ref(Ref.HEAD, name))
+        for name, sha1 in self._remotes.items():
+            refMap[sha1].append(Ref(Ref.REMOTE, name))
+
+        self._refMap = refMap
+        return refMap
+
+    def branchNames(self):
+        """returns the branch names to show and the index of current one"""
+        names = []
+        curIndex = -1
+        if self._head is None and self._headSha1:
+            names.append("(HEAD detached at {0})".format(
+                self._headSha1[:7]))
+            curIndex = 0
+
+        for name in self._heads.keys():
+            if name == self._head:
+                curIndex = len(names)
+            names.append(name)
+
+        # the branches of origin only as before
+        names.extend(name for name in self._remotes.keys()
+                     if name.startswith("remotes/origin/") and
+                     name != "remotes/origin/HEAD")
+
+        return names, curIndex
 
 
 class Git():
@@ -113,6 +234,11 @@ class Git():
     REF_MAP = {}
     REV_HEAD = None
 
+    # (repoDir, {branch: worktree dir})
+    _worktreesCache = None
+    _worktreesSerial = 0
+    _worktreesLock = threading.Lock()
+
     # local uncommitted changes
     LUC_SHA1 = "0000000000000000000000000000000000000000"
     # local changes checked
@@ -151,22 +277,45 @@ class Git():
 
     @staticmethod
     def refs():
-        args = ["show-ref", "-d"]
-        data = Git.checkOutput(args)
-        if not data:
+        refDb = RefDatabase.load()
+        if not refDb:
             return None
-        lines = data.decode("utf-8").split('\n')
-        refMap = defaultdict(list)
 
-        for line in lines:
-            ref = Ref.fromRawString(line)
-            if not ref:
-                continue
+        return refDb.refMap()
 
-            sha1 = line[0:40]
-            bisect.insort(refMap[sha1], ref)
+    @staticmethod
+    def updateRefs(refDb=None):
+        """update REF_MAP in place, returns the sha1 whose refs changed"""
+        if refDb is None:
+            refDb = RefDatabase.load()
+        refMap = refDb.refMap() if refDb else {}
+        if Git.REF_MAP is None:
+            Git.REF_MAP = defaultdict(list)
 
-        return refMap
+        def _refNames(refs):
+            return [(ref.type, ref.name) for ref in refs]
+
+        changed = set()
+        for sha1 in list(Git.REF_MAP.keys()):
+            if sha1 not in refMap:
+                del Git.REF_MAP[sha1]
+                changed.add(sha1)
+
+        for sha1, refs in refMap.items():
+            oldRefs = Git.REF_MAP.get(sha1)
+            if oldRefs is None or _refNames(oldRefs) != _refNames(refs):
+                Git.REF_MAP[sha1] = refs
+                changed.add(sha1)
+
+        return changed
+
+    @staticmethod
+    def isAncestor(ancestor, rev):
+        args = ["merge-base", "--is-ancestor", ancestor, rev]
+        process = Git.run(args)
+        process.communicate()
+
+        return process.returncode == 0
 
     @staticmethod
     def revHead():
@@ -178,13 +327,14 @@ class Git():
         return data.decode("utf-8").rstrip('\n')
 
     @staticmethod
-    def branches():
-        args = ["branch", "-a"]
+    def revParse(rev):
+        """resolve @rev to the full commit sha1"""
+        args = ["rev-parse", "--verify", "-q", rev + "^{commit}"]
         data = Git.checkOutput(args)
         if not data:
             return None
 
-        return data.decode("utf-8").split('\n')
+        return data.decode("utf-8").rstrip('\n')
 
     @staticmethod
     def commitSummary(sha1):
@@ -222,6 +372,15 @@ class Git():
 
     @staticmethod
     def commitRawDiff(sha1, filePath=None, gitArgs=None):
+        args = Git.rawDiffArgs(sha1, filePath, gitArgs)
+        data = Git.checkOutput(args)
+        if not data:
+            return None
+
+        return data
+
+    @staticmethod
+    def rawDiffArgs(sha1, filePath=None, gitArgs=None):
         if sha1 == Git.LCC_SHA1:
             args = ["diff-index", "--cached", "HEAD"]
         elif sha1 == Git.LUC_SHA1:
@@ -239,11 +398,7 @@ class Git():
             args.append("--")
             args.append(filePath)
 
-        data = Git.checkOutput(args)
-        if not data:
-            return None
-
-        return data
+        return args
 
     @staticmethod
     def externalDiff(branchDir, commit, path=None, tool=None):
@@ -381,47 +536,49 @@ class Git():
         if branch.startswith("(HEAD detached"):
             return Git.REPO_DIR
 
-        args = ["worktree", "list"]
-        data = Git.checkOutput(args)
-        if not data:
-            return ""
-
-        worktree_re = re.compile(
-            r"(\S+)\s+[a-f0-9]+\s+(\[(\S+)\]|\(detached HEAD\))$")
-        worktrees = data.rstrip(b'\n').decode("utf8").split('\n')
-
-        for wt in worktrees:
-            m = worktree_re.fullmatch(wt)
-            if not m:
-                print("Oops! Wrong format for worktree:", wt)
-            elif m.group(3) == branch:
-                return m.group(1)
-
-        return ""
+        return Git.worktrees().get(branch, "")
 
     @staticmethod
-    def generateDiff(sha1, filePath):
-        data = Git.commitRawDiff(sha1)
-        if not data:
-            return False
+    def worktrees():
+        """returns the map of branch name to its worktree dir"""
+        repoDir = Git.REPO_DIR
+        with Git._worktreesLock:
+            if Git._worktreesCache and Git._worktreesCache[0] == repoDir:
+                return Git._worktreesCache[1]
+            serial = Git._worktreesSerial
 
-        with open(filePath, "wb+") as f:
-            f.write(data)
+        worktrees = {}
+        args = ["worktree", "list", "--porcelain"]
+        data = Git.checkOutput(args)
+        if data is None:
+            return worktrees
 
-        return True
+        path = None
+        for line in data.decode("utf8").split('\n'):
+            if line.startswith("worktree "):
+                path = line[9:]
+            elif line.startswith("branch refs/heads/"):
+                if path:
+                    worktrees[line[18:]] = path
+            elif not line:
+                path = None
 
-    @staticmethod
-    def generatePatch(sha1, filePath):
-        args = ["format-patch", "-1", "--stdout", sha1]
+        with Git._worktreesLock:
+            # not invalidated during the query
+            if serial == Git._worktreesSerial:
+                Git._worktreesCache = (repoDir, worktrees)
 
-        data = Git.checkOutput(args)
-        if not data:
-            return False
+        return worktrees
 
-        with open(filePath, "wb+") as f:
-            f.write(data)
+    @staticmethod
+    def invalidateWorktrees():
+        with Git._worktreesLock:
+            Git._worktreesCache = None
+            Git._worktreesSerial += 1
 
-        return True
+    @staticmethod
+    def patchArgs(sha1):
+        return ["format-patch", "-1", "--stdout", sha1]
 
     @staticmethod
     def revertCommit(branch, sha1):
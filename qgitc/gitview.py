@@ -7,7 +7,7 @@ import PySide2
 
 from .ui_gitview import *
 from .common import *
-from .gitutils import Git
+from .gitutils import Git, RefDatabase
 from .stylehelper import dpiScaled
 from .events import BlameEvent
 
@@ -87,7 +87,7 @@ class GitView(QWidget):
         self.ui.leSha1.returnPressed.connect(self.reqCommit)
         self.ui.leFindWhat.returnPressed.connect(self.reqFind)
 
-    def __updateBranches(self, activeBranch=None):
+    def __updateBranches(self, activeBranch=None, refDb=None):
         self.ui.cbBranch.clear()
         self.ui.logView.clear()
         self.ui.diffView.clear()
@@ -96,33 +96,19 @@ class GitView(QWidget):
         if not Git.REPO_DIR:
             return
 
-        branches = Git.branches()
-        if not branches:
+        if refDb is None:
+            refDb = RefDatabase.load()
+        names, curBranchIdx = refDb.branchNames() if refDb else ([], -1)
+        if not names:
             self.window().showMessage(self.tr("Can't get branch"))
             return
 
-        curBranchIdx = -1
-        self.ui.cbBranch.blockSignals(True)
+        if activeBranch:
+            curBranchIdx = names.index(activeBranch) \
+                if activeBranch in names else -1
 
-        for branch in branches:
-            branch = branch.strip()
-            if branch.startswith("remotes/origin/"):
-                if not branch.startswith("remotes/origin/HEAD"):
-                    self.ui.cbBranch.addItem(branch)
-                    if activeBranch and activeBranch == branch:
-                        curBranchIdx = self.ui.cbBranch.count() - 1
-            elif branch:
-                if branch.startswith("*"):
-                    pure_branch = branch.replace("*", "").strip()
-                    self.ui.cbBranch.addItem(pure_branch)
-                    if curBranchIdx == -1 and (not activeBranch or activeBranch == pure_branch):
-                        curBranchIdx = self.ui.cbBranch.count() - 1
-                else:
-                    if branch.startswith("+ "):
-                        branch = branch[2:]
-                    self.ui.cbBranch.addItem(branch.strip())
-                    if activeBranch and activeBranch == branch:
-                        curBranchIdx = self.ui.cbBranch.count() - 1
+        self.ui.cbBranch.blockSignals(True)
+        self.ui.cbBranch.addItems(names)
 
         if curBranchIdx != -1:
             self.ui.cbBranch.setCurrentIndex(curBranchIdx)
@@ -131,6 +117,28 @@ class GitView(QWidget):
         branchIdx = self.ui.cbBranch.currentIndex()
         self.__onBranchChanged(branchIdx)
 
+    def __refreshBranches(self, refDb):
+        """update the branch list without reloading the logs,
+        returns False if current branch no longer exists"""
+        if not refDb:
+            return False
+
+        names, _ = refDb.branchNames()
+        curBranch = self.ui.cbBranch.currentText()
+        if curBranch not in names:
+            return False
+
+        count = self.ui.cbBranch.count()
+        oldNames = [self.ui.cbBranch.itemText(i) for i in range(count)]
+        if names != oldNames:
+            self.ui.cbBranch.blockSignals(True)
+            self.ui.cbBranch.clear()
+            self.ui.cbBranch.addItems(names)
+            self.ui.cbBranch.setCurrentIndex(names.index(curBranch))
+            self.ui.cbBranch.blockSignals(False)
+
+        return True
+
     def __onBranchChanged(self, index):
         if self.ui.cbBranch.count() == 0:
             return
@@ -208,7 +216,9 @@ class GitView(QWidget):
             result = self.ui.logView.findCommitSync(self.findPattern,
                                                     findRange,
                                                     self.findField)
-            self.__onFindFinished(result)
+            # None if finding in background
+            if result is not None:
+                self.__onFindFinished(result)
         else:
             param = FindParameter(findRange, findWhat,
                                   self.findField, findType)
@@ -284,8 +294,24 @@ class GitView(QWidget):
         self.branchA = False
         self.ui.logView.setBranchB()
 
-    def reloadBranches(self, activeBranch=None):
-        self.__updateBranches(activeBranch)
+    def reloadBranches(self, activeBranch=None, refDb=None):
+        """@refDb is the RefDatabase to list the branches,
+        load it if None"""
+        self.__updateBranches(activeBranch, refDb)
+
+    def refreshRefs(self, refDb=None):
+        if not Git.REPO_DIR or self.ui.cbBranch.count() == 0:
+            return
+
+        if refDb is None:
+            refDb = RefDatabase.load()
+        if self.__refreshBranches(refDb):
+            self.ui.logView.refreshLogs()
+        else:
+            self.__updateBranches(refDb=refDb)
+
+    def refreshLocalChanges(self):
+        self.ui.logView.refreshLocalChanges()
 
     def setCurrentBranch(self, branch):
         index = self.ui.cbBranch.findText(branch)
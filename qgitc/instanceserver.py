@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QObject,
+    QCoreApplication)
+from PySide2.QtNetwork import (
+    QLocalServer,
+    QLocalSocket)
+
+from .gitutils import Git
+from .events import (
+    BlameEvent,
+    ShowLogEvent)
+
+import getpass
+import json
+import os
+
+
+__all__ = ["InstanceServer", "forwardRequest"]
+
+# milliseconds to wait for the running instance
+CONNECT_TIMEOUT = 500
+REPLY_TIMEOUT = 3000
+
+Accepted = b"1\n"
+Rejected = b"0\n"
+
+
+def _serverName():
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = ""
+    return "qgitc-" + user if user else "qgitc"
+
+
+def _normPath(path):
+    return os.path.normcase(os.path.normpath(path)) if path else ""
+
+
+def forwardRequest(request):
+    """send @request to the running instance of the same repo
+    returns True if the instance accepted it"""
+    socket = QLocalSocket()
+    socket.connectToServer(_serverName())
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+
+    request["repoDir"] = Git.REPO_DIR
+    socket.write(json.dumps(request).encode("utf-8") + b"\n")
+    if not socket.waitForBytesWritten(REPLY_TIMEOUT):
+        return False
+
+    reply = b""
+    while not reply.endswith(b"\n"):
+        if not socket.waitForReadyRead(REPLY_TIMEOUT):
+            break
+        reply += socket.readAll().data()
+
+    socket.disconnectFromServer()
+    return reply == Accepted
+
+
+class InstanceServer(QObject):
+    """Serve the requests of the later launched qgitc,
+    so that they reuse the windows and caches of this one"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._server = QLocalServer(self)
+        self._server.setSocketOptions(QLocalServer.UserAccessOption)
+        self._server.newConnection.connect(self._onNewConnection)
+        self._buffers = {}
+
+    def listen(self):
+        name = _serverName()
+        if self._server.listen(name):
+            return True
+
+        # someone else is serving
+        socket = QLocalSocket()
+        socket.connectToServer(name)
+        if socket.waitForConnected(CONNECT_TIMEOUT):
+            socket.disconnectFromServer()
+            return False
+
+        # left by a crashed instance
+        QLocalServer.removeServer(name)
+        return self._server.listen(name)
+
+    def close(self):
+        self._server.close()
+
+    def _onNewConnection(self):
+        while self._server.hasPendingConnections():
+            socket = self._server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(
+                lambda s=socket: self._onReadyRead(s))
+            socket.disconnected.connect(
+                lambda s=socket: self._onDisconnected(s))
+
+    def _onReadyRead(self, socket):
+        data = self._buffers.get(socket, b"") + socket.readAll().data()
+        if not data.endswith(b"\n"):
+            self._buffers[socket] = data
+            return
+
+        self._buffers[socket] = b""
+        try:
+            request = json.loads(data.decode("utf-8"))
+        except ValueError:
+            request = None
+
+        accepted = self._handleRequest(request)
+        socket.write(Accepted if accepted else Rejected)
+        socket.flush()
+        socket.disconnectFromServer()
+
+    def _onDisconnected(self, socket):
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
+
+    def _handleRequest(self, request):
+        if not isinstance(request, dict):
+            return False
+
+        if _normPath(request.get("repoDir")) != _normPath(Git.REPO_DIR):
+            return False
+
+        cmd = request.get("cmd")
+        if cmd == "blame":
+            file = request.get("file")
+            if not file:
+                return False
+            event = BlameEvent(file, request.get("rev"),
+                               request.get("lineNo", 0))
+        elif cmd == "log":
+            event = ShowLogEvent(request.get("filterFile"),
+                                 request.get("compareMode", False))
+        else:
+            return False
+
+        QCoreApplication.postEvent(QCoreApplication.instance(), event)
+        return True
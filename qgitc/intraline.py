@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
+    Signal)
+
+from difflib import SequenceMatcher
+
+import re
+
+
+__all__ = ["IntralineDiffer", "diffWords", "diffBlock"]
+
+
+# the hunks or lines bigger than these are not highlighted
+MAX_HUNK_LINES = 500
+MAX_LINE_LENGTH = 1000
+# the pairs with less common text are not worth highlighting
+MIN_SIMILARITY = 0.5
+# how many added lines to look for the pair of a removed one
+MAX_PAIR_DISTANCE = 8
+
+_token_re = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def _tokenize(text):
+    tokens = _token_re.findall(text)
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+    return tokens, offsets
+
+
+def diffWords(oldText, newText):
+    """returns the changed (start, length) spans of @oldText and
+    @newText, None if they are too different to compare"""
+    if len(oldText) > MAX_LINE_LENGTH or len(newText) > MAX_LINE_LENGTH:
+        return None
+
+    a, offsetsA = _tokenize(oldText)
+    b, offsetsB = _tokenize(newText)
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+
+    oldSpans = []
+    newSpans = []
+    same = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            same += offsetsA[i2] - offsetsA[i1]
+            continue
+        if i2 > i1:
+            oldSpans.append((offsetsA[i1], offsetsA[i2] - offsetsA[i1]))
+        if j2 > j1:
+            newSpans.append((offsetsB[j1], offsetsB[j2] - offsetsB[j1]))
+
+    total = len(oldText) + len(newText)
+    if total == 0 or 2 * same / total < MIN_SIMILARITY:
+        return None
+
+    return oldSpans, newSpans
+
+
+def diffBlock(removed, added):
+    """returns {lineNo: spans} of a block of removed lines followed by
+    added lines, both are [(lineNo, text)] with the '-' or '+' prefix"""
+    result = {}
+    start = 0
+    for oldNo, oldText in removed:
+        end = min(len(added), start + MAX_PAIR_DISTANCE)
+        for i in range(start, end):
+            newNo, newText = added[i]
+            spans = diffWords(oldText[1:], newText[1:])
+            if spans is None:
+                continue
+
+            # skip the prefix
+            result[oldNo] = [(s + 1, n) for s, n in spans[0]]
+            result[newNo] = [(s + 1, n) for s, n in spans[1]]
+            start = i + 1
+            break
+
+    return result
+
+
+class IntralineRunnable(QRunnable):
+
+    def __init__(self, differ, serial, key, blocks):
+        super().__init__()
+        self._differ = differ
+        self._serial = serial
+        self._key = key
+        self._blocks = blocks
+
+    def run(self):
+        result = {}
+        for removed, added in self._blocks:
+            result.update(diffBlock(removed, added))
+        self._differ._resultReady.emit(self._serial, self._key, result)
+
+
+class IntralineDiffer(QObject):
+    """Compute the changed words of the paired lines in background"""
+
+    # key, {lineNo: [(start, length)]}
+    resultAvailable = Signal(object, object)
+
+    _resultReady = Signal(int, object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+        self._serial = 0
+
+        self._resultReady.connect(self._onResultReady)
+
+    def diff(self, key, blocks):
+        """@blocks is the list of (removed, added) of diffBlock"""
+        self._pool.start(IntralineRunnable(
+            self, self._serial, key, blocks))
+
+    def cancel(self):
+        # the results of previous serial are dropped
+        self._serial += 1
+        self._pool.clear()
+
+    def waitForDone(self):
+        self._pool.waitForDone()
+
+    def _onResultReady(self, serial, key, result):
+        if serial == self._serial:
+            self.resultAvailable.emit(key, result)
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+
+
+__all__ = ["Lane", "Lanes"]
+
+
+# reference to QGit source code
+class Lane():
+    EMPTY = 0
+    ACTIVE = 1
+    NOT_ACTIVE = 2
+    MERGE_FORK = 3
+    MERGE_FORK_R = 4
+    MERGE_FORK_L = 5
+    JOIN = 6
+    JOIN_R = 7
+    JOIN_L = 8
+    HEAD = 9
+    HEAD_R = 10
+    HEAD_L = 11
+    TAIL = 12
+    TAIL_R = 13
+    TAIL_L = 14
+    CROSS = 15
+    CROSS_EMPTY = 16
+    INITIAL = 17
+    BRANCH = 18
+    BOUNDARY = 19
+    BOUNDARY_C = 20
+    BOUNDARY_R = 21
+    BOUNDARY_L = 22
+    UNAPPLIED = 23
+    APPLIED = 24
+
+    @staticmethod
+    def isHead(t):
+        return t >= Lane.HEAD and \
+            t <= Lane.HEAD_L
+
+    @staticmethod
+    def isTail(t):
+        return t >= Lane.TAIL and \
+            t <= Lane.TAIL_L
+
+    @staticmethod
+    def isJoin(t):
+        return t >= Lane.JOIN and \
+            t <= Lane.JOIN_L
+
+    @staticmethod
+    def isFreeLane(t):
+        return t == Lane.NOT_ACTIVE or \
+            t == Lane.CROSS or \
+            Lane.isJoin(t)
+
+    @staticmethod
+    def isBoundary(t):
+        return t >= Lane.BOUNDARY and \
+            t <= Lane.BOUNDARY_L
+
+    @staticmethod
+    def isMerge(t):
+        return (t >= Lane.MERGE_FORK and
+                t <= Lane.MERGE_FORK_L) or \
+            Lane.isBoundary(t)
+
+    @staticmethod
+    def isActive(t):
+        return t == Lane.ACTIVE or \
+            t == Lane.INITIAL or \
+            t == Lane.BRANCH or \
+            Lane.isMerge(t)
+
+
+class Lanes():
+
+    def __init__(self):
+        self.activeLane = 0
+        self.types = []
+        self.nextSha = []
+        self.isBoundary = False
+        self.node = 0
+        self.node_l = 0
+        self.node_r = 0
+
+    def isEmpty(self):
+        return not self.types
+
+    def isFork(self, sha1):
+        pos = self.findNextSha1(sha1, 0)
+        isDiscontinuity = self.activeLane != pos
+        if pos == -1:  # new branch case
+            return False, isDiscontinuity
+
+        isFork = self.findNextSha1(sha1, pos + 1) != -1
+        return isFork, isDiscontinuity
+
+    def isBranch(self):
+        return self.types[self.activeLane] == Lane.BRANCH
+
+    def isNode(self, t):
+        return t == self.node or \
+            t == self.node_r or \
+            t == self.node_l
+
+    def findNextSha1(self, next, pos):
+        for i in range(pos, len(self.nextSha)):
+            if self.nextSha[i] == next:
+                return i
+
+        return -1
+
+    def init(self, sha1):
+        self.clear()
+        self.activeLane = 0
+        self.setBoundary(False)
+        self.add(Lane.BRANCH, sha1, self.activeLane)
+
+    def clear(self):
+        self.types.clear()
+        self.nextSha.clear()
+
+    def setBoundary(self, b):
+        if b:
+            self.node = Lane.BOUNDARY_C
+            self.node_r = Lane.BOUNDARY_R
+            self.node_l = Lane.BOUNDARY_L
+            self.types[self.activeLane] = Lane.BOUNDARY
+        else:
+            self.node = Lane.MERGE_FORK
+            self.node_r = Lane.MERGE_FORK_R
+            self.node_l = Lane.MERGE_FORK_L
+
+        self.isBoundary = b
+
+    def findType(self, type, pos):
+        for i in range(pos, len(self.types)):
+            if self.types[i] == type:
+                return i
+        return -1
+
+    def add(self, type, next, pos):
+        if pos < len(self.types):
+            pos = self.findType(Lane.EMPTY, pos)
+            if pos != -1:
+                self.types[pos] = type
+                self.nextSha[pos] = next
+                return pos
+
+        self.types.append(type)
+        self.nextSha.append(next)
+
+        return len(self.types) - 1
+
+    def changeActiveLane(self, sha1):
+        t = self.types[self.activeLane]
+        if t == Lane.INITIAL or Lane.isBoundary(t):
+            self.types[self.activeLane] = Lane.EMPTY
+        else:
+            self.types[self.activeLane] = Lane.NOT_ACTIVE
+
+        idx = self.findNextSha1(sha1, 0)
+        if idx != -1:
+            self.types[idx] = Lane.ACTIVE
+        else:
+            idx = self.add(Lane.BRANCH, sha1, self.activeLane)
+
+        self.activeLane = idx
+
+    def setFork(self, sha1):
+        s = e = idx = self.findNextSha1(sha1, 0)
+        while idx != -1:
+            e = idx
+            self.types[idx] = Lane.TAIL
+            idx = self.findNextSha1(sha1, idx + 1)
+
+        self.types[self.activeLane] = self.node
+        if self.types[s] == self.node:
+            self.types[s] = self.node_l
+
+        if self.types[e] == self.node:
+            self.types[e] = self.node_r
+
+        if self.types[s] == Lane.TAIL:
+            self.types[s] == Lane.TAIL_L
+
+        if self.types[e] == Lane.TAIL:
+            self.types[e] = Lane.TAIL_R
+
+        for i in range(s + 1, e):
+            if self.types[i] == Lane.NOT_ACTIVE:
+                self.types[i] = Lane.CROSS
+            elif self.types[i] == Lane.EMPTY:
+                self.types[i] = Lane.CROSS_EMPTY
+
+    def setMerge(self, parents):
+        if self.isBoundary:
+            return
+
+        t = self.types[self.activeLane]
+        wasFork = t == self.node
+        wasForkL = t == self.node_l
+        wasForkR = t == self.node_r
+
+        self.types[self.activeLane] = self.node
+
+        s = e = self.activeLane
+        startJoinWasACross = False
+        endJoinWasACross = False
+        # skip first parent
+        for i in range(1, len(parents)):
+            idx = self.findNextSha1(parents[i], 0)
+            if idx != -1:
+                if idx > e:
+                    e = idx
+                    endJoinWasACross = self.types[idx] == Lane.CROSS
+                if idx < s:
+                    s = idx
+                    startJoinWasACross = self.types[idx] == Lane.CROSS
+
+                self.types[idx] = Lane.JOIN
+            else:
+                e = self.add(Lane.HEAD, parents[i], e + 1)
+
+        if self.types[s] == self.node and not wasFork and not wasForkR:
+            self.types[s] = self.node_l
+        if self.types[e] == self.node and not wasFork and not wasForkL:
+            self.types[e] = self.node_r
+
+        if self.types[s] == Lane.JOIN and not startJoinWasACross:
+            self.types[s] = Lane.JOIN_L
+        if self.types[e] == Lane.JOIN and not endJoinWasACross:
+            self.types[e] = Lane.JOIN_R
+
+        if self.types[s] == Lane.HEAD:
+            self.types[s] = Lane.HEAD_L
+        if self.types[e] == Lane.HEAD:
+            self.types[e] = Lane.HEAD_R
+
+        for i in range(s + 1, e):
+            if self.types[i] == Lane.NOT_ACTIVE:
+                self.types[i] = Lane.CROSS
+            elif self.types[i] == Lane.EMPTY:
+                self.types[i] = Lane.CROSS_EMPTY
+            elif self.types[i] == Lane.TAIL_R or \
+                    self.types[i] == Lane.TAIL_L:
+                self.types[i] = Lane.TAIL
+
+    def setInitial(self):
+        t = self.types[self.activeLane]
+        # TODO: applied
+        if not self.isNode(t):
+            if self.isBoundary:
+                self.types[self.activeLane] = Lane.BOUNDARY
+            else:
+                self.types[self.activeLane] = Lane.INITIAL
+
+    def getLanes(self):
+        return list(self.types)
+
+    def nextParent(self, sha1):
+        if self.isBoundary:
+            self.nextSha[self.activeLane] = ""
+        else:
+            self.nextSha[self.activeLane] = sha1
+
+    def afterMerge(self):
+        if self.isBoundary:
+            return
+
+        for i in range(len(self.types)):
+            t = self.types[i]
+            if Lane.isHead(t) or Lane.isJoin(t) or t == Lane.CROSS:
+                self.types[i] = Lane.NOT_ACTIVE
+            elif t == Lane.CROSS_EMPTY:
+                self.types[i] = Lane.EMPTY
+            elif self.isNode(t):
+                self.types[i] = Lane.ACTIVE
+
+    def afterFork(self):
+        for i in range(len(self.types)):
+            t = self.types[i]
+            if t == Lane.CROSS:
+                self.types[i] = Lane.NOT_ACTIVE
+            elif Lane.isTail(t) or t == Lane.CROSS_EMPTY:
+                self.types[i] = Lane.EMPTY
+
+            if not self.isBoundary and self.isNode(t):
+                self.types[i] = Lane.ACTIVE
+
+        while self.types[-1] == Lane.EMPTY:
+            self.types.pop()
+            self.nextSha.pop()
+
+    def afterBranch(self):
+        self.types[self.activeLane] = Lane.ACTIVE
+
+    def update(self, sha1, parents):
+        """move to the commit @sha1, returns its lane types"""
+        if self.isEmpty():
+            self.init(sha1)
+
+        isFork, isDiscontinuity = self.isFork(sha1)
+        isMerge = (len(parents) > 1)
+        isInitial = (not parents)
+
+        if isDiscontinuity:
+            self.changeActiveLane(sha1)
+
+        self.setBoundary(False)  # TODO
+        if isFork:
+            self.setFork(sha1)
+        if isMerge:
+            self.setMerge(parents)
+        if isInitial:
+            self.setInitial()
+
+        l = self.getLanes()
+
+        if isInitial:
+            nextSha1 = ""
+        else:
+            nextSha1 = parents[0]
+
+        self.nextParent(nextSha1)
+
+        # TODO: applied
+        if isMerge:
+            self.afterMerge()
+        if isFork:
+            self.afterFork()
+        if self.isBranch():
+            self.afterBranch()
+
+        return l
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QFileSystemWatcher,
+    Signal,
+    Qt)
+from PySide2.QtWidgets import QApplication
+
+from .gitutils import Git
+
+import subprocess
+import threading
+import os
+
+
+__all__ = ["LocalChangesProbe"]
+
+# seconds to wait `git status` for a huge work tree
+PROBE_TIMEOUT = 10
+
+_probe = None
+
+
+def _gitArgs(args):
+    return ["git", "--no-optional-locks"] + args
+
+
+def _runGit(repoDir, args, timeout=None):
+    startupinfo = None
+    if os.name == "nt":
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+    process = subprocess.Popen(
+        _gitArgs(args),
+        cwd=repoDir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        startupinfo=startupinfo)
+    try:
+        data, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return None, None
+
+    return process.returncode, data
+
+
+def parseStatus(data):
+    """parse the output of `git status --porcelain=v2 -z`
+    returns (hasLCC, hasLUC)"""
+    hasLCC = False
+    hasLUC = False
+
+    entries = data.split(b'\0')
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        if len(entry) < 4:
+            continue
+
+        type = entry[0]
+        # 1: ordinary, 2: renamed or copied, u: unmerged
+        if type == 117:  # u
+            return True, True
+        elif type == 49 or type == 50:
+            if entry[2] != 46:  # '.'
+                hasLCC = True
+            if entry[3] != 46:
+                hasLUC = True
+            # the original path follows a renamed entry
+            if type == 50:
+                i += 1
+
+        if hasLCC and hasLUC:
+            break
+
+    return hasLCC, hasLUC
+
+
+class ProbeRunnable(QRunnable):
+
+    def __init__(self, probe, branch):
+        super().__init__()
+        self._probe = probe
+        self._branch = branch
+
+    def run(self):
+        branch = self._branch
+        repoDir = Git.branchDir(branch)
+        # only branch checked out can have local changes
+        if not repoDir:
+            self._probe._resultReady.emit(branch, "", "", False, False)
+            return
+
+        result = self._probe._cachedResult(repoDir)
+        if result:
+            self._probe._resultReady.emit(
+                branch, repoDir, "", result[0], result[1])
+            return
+
+        _, gitDir = _runGit(repoDir, ["rev-parse", "--absolute-git-dir"])
+        gitDir = gitDir.decode("utf-8").rstrip('\n') if gitDir else ""
+
+        args = ["status", "--porcelain=v2", "-z", "--untracked-files=no"]
+        returncode, data = _runGit(repoDir, args, PROBE_TIMEOUT)
+        if returncode is None:
+            # too slow to stat the work tree, check the index only
+            returncode, _ = _runGit(repoDir, ["diff", "--quiet", "--cached"])
+            self._probe._resultReady.emit(
+                branch, "", gitDir, returncode == 1, False)
+            return
+
+        hasLCC, hasLUC = parseStatus(data) if returncode == 0 \
+            else (False, False)
+        self._probe._resultReady.emit(branch, repoDir, gitDir, hasLCC, hasLUC)
+
+
+class LocalChangesProbe(QObject):
+    """Check the local changes of the checked out branches
+    with a shared thread pool, the results are cached per work tree
+    until the index or work tree changed"""
+
+    # branch, hasLCC, hasLUC
+    probeFinished = Signal(str, bool, bool)
+    # the cached result of work tree dir is no longer valid
+    invalidated = Signal(str)
+
+    _resultReady = Signal(str, str, str, bool, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._watchedPaths = {}
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._onPathChanged)
+        self._watcher.directoryChanged.connect(self._onPathChanged)
+
+        self._resultReady.connect(self._onResultReady)
+
+        app = QApplication.instance()
+        if app:
+            app.applicationStateChanged.connect(
+                self._onApplicationStateChanged)
+
+    @staticmethod
+    def instance():
+        global _probe
+        if _probe is None:
+            _probe = LocalChangesProbe(QApplication.instance())
+        return _probe
+
+    def probe(self, branch):
+        """the result will be notified by probeFinished"""
+        # A remote branch should never have local changes
+        if not branch or branch.startswith("remotes/"):
+            self._resultReady.emit(branch or "", "", "", False, False)
+            return
+
+        self._pool.start(ProbeRunnable(self, branch))
+
+    def invalidate(self, repoDir=None):
+        with self._lock:
+            if repoDir is None:
+                dirs = list(self._cache.keys())
+                self._cache.clear()
+            else:
+                dirs = [repoDir] if self._cache.pop(repoDir, None) else []
+
+        for dir in dirs:
+            self.invalidated.emit(dir)
+
+    def waitForDone(self):
+        self._pool.waitForDone()
+
+    def _cachedResult(self, repoDir):
+        with self._lock:
+            return self._cache.get(repoDir)
+
+    def _onResultReady(self, branch, repoDir, gitDir, hasLCC, hasLUC):
+        if repoDir:
+            with self._lock:
+                self._cache[repoDir] = (hasLCC, hasLUC)
+            if gitDir:
+                self._watch(repoDir, os.path.join(gitDir, "index"))
+                self._watch(repoDir, repoDir)
+
+        self.probeFinished.emit(branch, hasLCC, hasLUC)
+
+    def _watch(self, repoDir, path):
+        if path in self._watchedPaths or not os.path.exists(path):
+            return
+        self._watchedPaths[path] = repoDir
+        self._watcher.addPath(path)
+
+    def _onPathChanged(self, path):
+        repoDir = self._watchedPaths.get(path)
+        if repoDir is None:
+            return
+
+        # the index file is replaced on write
+        if not path in self._watcher.files() and \
+                not path in self._watcher.directories():
+            if os.path.exists(path):
+                self._watcher.addPath(path)
+            else:
+                del self._watchedPaths[path]
+
+        self.invalidate(repoDir)
+
+    def _onApplicationStateChanged(self, state):
+        # files may be changed outside
+        if state == Qt.ApplicationActive:
+            self.invalidate()
@@ -8,10 +8,21 @@ from .common import *
 from .gitutils import *
 from .datafetcher import DataFetcher
 from .stylehelper import dpiScaled
+from .localchanges import LocalChangesProbe
+from .commitgraph import CommitGraph
+from .catfile import CatFileBatch, parseCommitParents
+from .refreader import gitDirs
+from .lanes import Lane, Lanes
+from .patchexporter import (
+    ExportJob,
+    ExportProgressDialog,
+    formatPatchJobs)
 
 import re
 import bisect
 
+from collections import OrderedDict
+
 # for refs
 TAG_COLORS = [Qt.yellow,
               Qt.green,
@@ -31,6 +42,12 @@ GRAPH_COLORS = [Qt.black,
 
 HALF_LINE_PERCENT = 0.76
 
+# in pixels, the lane glyph may paint out of its cell a bit
+LANE_GLYPH_MARGIN = 3
+
+# the commits read at a time when finding in the ones without text
+FIND_BATCH_COMMITS = 256
+
 
 class LogsFetcher(DataFetcher):
 
@@ -39,12 +56,17 @@ class LogsFetcher(DataFetcher):
     def __init__(self, parent=None):
         super(LogsFetcher, self).__init__(parent)
         self.separator = b'\0'
+        # sha1, subject and parents only
+        self.slim = False
 
     def parse(self, data):
         logs = data.rstrip(self.separator) \
             .decode("utf-8", "replace") \
             .split('\0')
-        commits = [Commit.fromRawString(log) for log in logs]
+        if self.slim:
+            commits = [Commit.fromSlimString(log) for log in logs]
+        else:
+            commits = [Commit.fromRawString(log) for log in logs]
         self.logsAvailable.emit(commits)
 
     def makeArgs(self, args):
@@ -54,10 +76,11 @@ class LogsFetcher(DataFetcher):
         if branch and branch.startswith("(HEAD detached"):
             branch = None
 
+        fmt = slim_log_fmt if self.slim else log_fmt
         git_args = ["log", "-z", "--topo-order",
                     "--parents",
                     "--no-color",
-                    "--pretty=format:{0}".format(log_fmt)]
+                    "--pretty=format:{0}".format(fmt)]
         if branch:
             git_args.append(branch)
 
@@ -72,6 +95,275 @@ class LogsFetcher(DataFetcher):
         return self.process is not None
 
 
+class ReadCommitsRunnable(QRunnable):
+
+    def __init__(self, reader, serial, catFile, sha1s):
+        super(ReadCommitsRunnable, self).__init__()
+        self._reader = reader
+        self._serial = serial
+        self._catFile = catFile
+        self._sha1s = sha1s
+
+    def run(self):
+        commits = self._reader._readCommits(
+            self._catFile, self._sha1s, self._serial)
+        self._reader._resultReady.emit(self._serial, commits)
+
+
+class FindCommitsRunnable(QRunnable):
+
+    def __init__(self, reader, serial, catFile, commits, lazySha1s,
+                 findInCommit):
+        super(FindCommitsRunnable, self).__init__()
+        self._reader = reader
+        self._serial = serial
+        self._catFile = catFile
+        self._commits = commits
+        self._lazySha1s = lazySha1s
+        self._findInCommit = findInCommit
+
+    def run(self):
+        result, commits = self._reader._findCommits(
+            self._catFile, self._commits, self._lazySha1s,
+            self._findInCommit, self._serial)
+        self._reader._findReady.emit(self._serial, result, commits)
+
+
+class CommitsReader(QObject):
+    """Read the full commits with a long running `git cat-file --batch`,
+    in background or synchronously"""
+
+    commitsAvailable = Signal(list)
+    finished = Signal()
+    # index of the found commit, FIND_NOTFOUND or FIND_CANCELED
+    findFinished = Signal(int)
+
+    _resultReady = Signal(int, object)
+    _findReady = Signal(int, int, object)
+
+    def __init__(self, parent=None):
+        super(CommitsReader, self).__init__(parent)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self._catFile = None
+        self._serial = 0
+        self._loading = False
+
+        self._resultReady.connect(self._onResultReady)
+        self._findReady.connect(self._onFindReady)
+
+    def _ensureCatFile(self):
+        if self._catFile and self._catFile.repoDir != Git.REPO_DIR:
+            self._catFile.close()
+            self._catFile = None
+        if not self._catFile:
+            self._catFile = CatFileBatch(Git.REPO_DIR)
+        return self._catFile
+
+    def read(self, sha1s):
+        self.cancel()
+        self._loading = True
+        self._pool.start(ReadCommitsRunnable(
+            self, self._serial, self._ensureCatFile(), sha1s))
+
+    def readSync(self, sha1s):
+        return self._readCommits(self._ensureCatFile(), sha1s)
+
+    def find(self, commits, lazySha1s, findInCommit):
+        """find the first one of @commits, the list of (index, commit),
+        that @findInCommit returns True in background. The text of the
+        ones in @lazySha1s is read in batches before finding"""
+        self.cancel()
+        self._loading = True
+        self._pool.start(FindCommitsRunnable(
+            self, self._serial, self._ensureCatFile(), commits,
+            lazySha1s, findInCommit))
+
+    def _findCommits(self, catFile, commits, lazySha1s, findInCommit,
+                     serial):
+        logs = []
+        for begin in range(0, len(commits), FIND_BATCH_COMMITS):
+            batch = commits[begin:begin + FIND_BATCH_COMMITS]
+            sha1s = [commit.sha1 for _, commit in batch
+                     if commit.sha1 in lazySha1s]
+            loaded = {log.sha1: log
+                      for log in self._readCommits(catFile, sha1s, serial)}
+            if serial != self._serial:
+                return FIND_CANCELED, logs
+
+            logs.extend(loaded.values())
+            for index, commit in batch:
+                if findInCommit(loaded.get(commit.sha1, commit)):
+                    return index, logs
+
+        return FIND_NOTFOUND, logs
+
+    def _readCommits(self, catFile, sha1s, serial=None):
+        commits = []
+        for sha1 in sha1s:
+            # the background one is canceled
+            if serial is not None and serial != self._serial:
+                break
+
+            result = catFile.read(sha1)
+            if result and result[0] == "commit":
+                commits.append(Commit.fromRawObject(sha1, result[1]))
+
+        return commits
+
+    def cancel(self):
+        self._serial += 1
+        self._loading = False
+
+    def isLoading(self):
+        return self._loading
+
+    def close(self):
+        self.cancel()
+        self._pool.waitForDone()
+        if self._catFile:
+            self._catFile.close()
+            self._catFile = None
+
+    def _onResultReady(self, serial, commits):
+        if serial != self._serial:
+            return
+
+        self._loading = False
+        self.commitsAvailable.emit(commits)
+        self.finished.emit()
+
+    def _onFindReady(self, serial, result, commits):
+        if serial != self._serial:
+            return
+
+        self._loading = False
+        if commits:
+            self.commitsAvailable.emit(commits)
+        self.findFinished.emit(result)
+        self.finished.emit()
+
+
+class GraphLogsThread(QThread):
+
+    # too many commits not in the commit-graph, git log is faster
+    MAX_MISSING = 1000
+
+    def __init__(self, repoDir, commonDir, branch, parent=None):
+        super(GraphLogsThread, self).__init__(parent)
+
+        self._repoDir = repoDir
+        self._commonDir = commonDir
+        self._branch = branch
+        self._logs = None
+
+    @property
+    def logs(self):
+        if self.isFinished() and not self.isInterruptionRequested():
+            return self._logs
+        return None
+
+    def run(self):
+        self._logs = None
+
+        tip = Git.revParse(self._branch if self._branch else "HEAD")
+        if not tip or self.isInterruptionRequested():
+            return
+
+        graph = CommitGraph.load(self._commonDir)
+        if not graph:
+            return
+
+        catFile = CatFileBatch(self._repoDir)
+        missing = []
+
+        def _missingParents(sha1):
+            missing.append(sha1)
+            if len(missing) > GraphLogsThread.MAX_MISSING:
+                return None
+
+            result = catFile.read(sha1)
+            if not result or result[0] != "commit":
+                return None
+            return parseCommitParents(result[1])
+
+        try:
+            logs = graph.log([tip], _missingParents,
+                             self.isInterruptionRequested)
+        finally:
+            catFile.close()
+
+        if logs is None:
+            return
+
+        commits = []
+        for sha1, parents in logs:
+            commit = Commit()
+            commit.sha1 = sha1
+            commit.parents = parents
+            commits.append(commit)
+
+        self._logs = commits
+
+
+class GraphLogsFetcher(QObject):
+    """Build the topology from the commit-graph file,
+    the commits have sha1 and parents only"""
+
+    logsAvailable = Signal(list)
+    fetchFinished = Signal(int)
+    # the commit-graph can't be used
+    fetchFailed = Signal()
+
+    def __init__(self, parent=None):
+        super(GraphLogsFetcher, self).__init__(parent)
+        self._thread = None
+
+    def fetch(self, branch):
+        """returns False if no commit-graph"""
+        self.cancel()
+
+        if not Git.REPO_DIR:
+            return False
+
+        _, commonDir = gitDirs(Git.REPO_DIR)
+        if not commonDir or not CommitGraph.exists(commonDir):
+            return False
+
+        if branch and branch.startswith("(HEAD detached"):
+            branch = None
+
+        self._thread = GraphLogsThread(Git.REPO_DIR, commonDir, branch)
+        self._thread.finished.connect(self._onFinished)
+        self._thread.start()
+
+        return True
+
+    def cancel(self):
+        if self._thread and self._thread.isRunning():
+            self._thread.disconnect(self)
+            self._thread.requestInterruption()
+            self._thread.wait()
+        self._thread = None
+
+    def isLoading(self):
+        return self._thread is not None
+
+    def _onFinished(self):
+        # finished is emitted before the thread really ends
+        self._thread.wait()
+        logs = self._thread.logs
+        self._thread = None
+
+        if logs is None:
+            self.fetchFailed.emit()
+        else:
+            self.logsAvailable.emit(logs)
+            self.fetchFinished.emit(0)
+
+
 class Marker():
     CHAR_MARK = chr(0x2713)
 
@@ -115,298 +407,6 @@ class Marker():
         painter.restore()
 
 
-# reference to QGit source code
-class Lane():
-    EMPTY = 0
-    ACTIVE = 1
-    NOT_ACTIVE = 2
-    MERGE_FORK = 3
-    MERGE_FORK_R = 4
-    MERGE_FORK_L = 5
-    JOIN = 6
-    JOIN_R = 7
-    JOIN_L = 8
-    HEAD = 9
-    HEAD_R = 10
-    HEAD_L = 11
-    TAIL = 12
-    TAIL_R = 13
-    TAIL_L = 14
-    CROSS = 15
-    CROSS_EMPTY = 16
-    INITIAL = 17
-    BRANCH = 18
-    BOUNDARY = 19
-    BOUNDARY_C = 20
-    BOUNDARY_R = 21
-    BOUNDARY_L = 22
-    UNAPPLIED = 23
-    APPLIED = 24
-
-    @staticmethod
-    def isHead(t):
-        return t >= Lane.HEAD and \
-            t <= Lane.HEAD_L
-
-    @staticmethod
-    def isTail(t):
-        return t >= Lane.TAIL and \
-            t <= Lane.TAIL_L
-
-    @staticmethod
-    def isJoin(t):
-        return t >= Lane.JOIN and \
-            t <= Lane.JOIN_L
-
-    @staticmethod
-    def isFreeLane(t):
-        return t == Lane.NOT_ACTIVE or \
-            t == Lane.CROSS or \
-            Lane.isJoin(t)
-
-    @staticmethod
-    def isBoundary(t):
-        return t >= Lane.BOUNDARY and \
-            t <= Lane.BOUNDARY_L
-
-    @staticmethod
-    def isMerge(t):
-        return (t >= Lane.MERGE_FORK and
-                t <= Lane.MERGE_FORK_L) or \
-            Lane.isBoundary(t)
-
-    @staticmethod
-    def isActive(t):
-        return t == Lane.ACTIVE or \
-            t == Lane.INITIAL or \
-            t == Lane.BRANCH or \
-            Lane.isMerge(t)
-
-
-class Lanes():
-
-    def __init__(self):
-        self.activeLane = 0
-        self.types = []
-        self.nextSha = []
-        self.isBoundary = False
-        self.node = 0
-        self.node_l = 0
-        self.node_r = 0
-
-    def isEmpty(self):
-        return not self.types
-
-    def isFork(self, sha1):
-        pos = self.findNextSha1(sha1, 0)
-        isDiscontinuity = self.activeLane != pos
-        if pos == -1:  # new branch case
-            return False, isDiscontinuity
-
-        isFork = self.findNextSha1(sha1, pos + 1) != -1
-        return isFork, isDiscontinuity
-
-    def isBranch(self):
-        return self.types[self.activeLane] == Lane.BRANCH
-
-    def isNode(self, t):
-        return t == self.node or \
-            t == self.node_r or \
-            t == self.node_l
-
-    def findNextSha1(self, next, pos):
-        for i in range(pos, len(self.nextSha)):
-            if self.nextSha[i] == next:
-                return i
-
-        return -1
-
-    def init(self, sha1):
-        self.clear()
-        self.activeLane = 0
-        self.setBoundary(False)
-        self.add(Lane.BRANCH, sha1, self.activeLane)
-
-    def clear(self):
-        self.types.clear()
-        self.nextSha.clear()
-
-    def setBoundary(self, b):
-        if b:
-            self.node = Lane.BOUNDARY_C
-            self.node_r = Lane.BOUNDARY_R
-            self.node_l = Lane.BOUNDARY_L
-            self.types[self.activeLane] = Lane.BOUNDARY
-        else:
-            self.node = Lane.MERGE_FORK
-            self.node_r = Lane.MERGE_FORK_R
-            self.node_l = Lane.MERGE_FORK_L
-
-        self.isBoundary = b
-
-    def findType(self, type, pos):
-        for i in range(pos, len(self.types)):
-            if self.types[i] == type:
-                return i
-        return -1
-
-    def add(self, type, next, pos):
-        if pos < len(self.types):
-            pos = self.findType(Lane.EMPTY, pos)
-            if pos != -1:
-                self.types[pos] = type
-                self.nextSha[pos] = next
-                return pos
-
-        self.types.append(type)
-        self.nextSha.append(next)
-
-        return len(self.types) - 1
-
-    def changeActiveLane(self, sha1):
-        t = self.types[self.activeLane]
-        if t == Lane.INITIAL or Lane.isBoundary(t):
-            self.types[self.activeLane] = Lane.EMPTY
-        else:
-            self.types[self.activeLane] = Lane.NOT_ACTIVE
-
-        idx = self.findNextSha1(sha1, 0)
-        if idx != -1:
-            self.types[idx] = Lane.ACTIVE
-        else:
-            idx = self.add(Lane.BRANCH, sha1, self.activeLane)
-
-        self.activeLane = idx
-
-    def setFork(self, sha1):
-        s = e = idx = self.findNextSha1(sha1, 0)
-        while idx != -1:
-            e = idx
-            self.types[idx] = Lane.TAIL
-            idx = self.findNextSha1(sha1, idx + 1)
-
-        self.types[self.activeLane] = self.node
-        if self.types[s] == self.node:
-            self.types[s] = self.node_l
-
-        if self.types[e] == self.node:
-            self.types[e] = self.node_r
-
-        if self.types[s] == Lane.TAIL:
-            self.types[s] == Lane.TAIL_L
-
-        if self.types[e] == Lane.TAIL:
-            self.types[e] = Lane.TAIL_R
-
-        for i in range(s + 1, e):
-            if self.types[i] == Lane.NOT_ACTIVE:
-                self.types[i] = Lane.CROSS
-            elif self.types[i] == Lane.EMPTY:
-                self.types[i] = Lane.CROSS_EMPTY
-
-    def setMerge(self, parents):
-        if self.isBoundary:
-            return
-
-        t = self.types[self.activeLane]
-        wasFork = t == self.node
-        wasForkL = t == self.node_l
-        wasForkR = t == self.node_r
-
-        self.types[self.activeLane] = self.node
-
-        s = e = self.activeLane
-        startJoinWasACross = False
-        endJoinWasACross = False
-        # skip first parent
-        for i in range(1, len(parents)):
-            idx = self.findNextSha1(parents[i], 0)
-            if idx != -1:
-                if idx > e:
-                    e = idx
-                    endJoinWasACross = self.types[idx] == Lane.CROSS
-                if idx < s:
-                    s = idx
-                    startJoinWasACross = self.types[idx] == Lane.CROSS
-
-                self.types[idx] = Lane.JOIN
-            else:
-                e = self.add(Lane.HEAD, parents[i], e + 1)
-
-        if self.types[s] == self.node and not wasFork and not wasForkR:
-            self.types[s] = self.node_l
-        if self.types[e] == self.node and not wasFork and not wasForkL:
-            self.types[e] = self.node_r
-
-        if self.types[s] == Lane.JOIN and not startJoinWasACross:
-            self.types[s] = Lane.JOIN_L
-        if self.types[e] == Lane.JOIN and not endJoinWasACross:
-            self.types[e] = Lane.JOIN_R
-
-        if self.types[s] == Lane.HEAD:
-            self.types[s] = Lane.HEAD_L
-        if self.types[e] == Lane.HEAD:
-            self.types[e] = Lane.HEAD_R
-
-        for i in range(s + 1, e):
-            if self.types[i] == Lane.NOT_ACTIVE:
-                self.types[i] = Lane.CROSS
-            elif self.types[i] == Lane.EMPTY:
-                self.types[i] = Lane.CROSS_EMPTY
-            elif self.types[i] == Lane.TAIL_R or \
-                    self.types[i] == Lane.TAIL_L:
-                self.types[i] = Lane.TAIL
-
-    def setInitial(self):
-        t = self.types[self.activeLane]
-        # TODO: applied
-        if not self.isNode(t):
-            if self.isBoundary:
-                self.types[self.activeLane] = Lane.BOUNDARY
-            else:
-                self.types[self.activeLane] = Lane.INITIAL
-
-    def getLanes(self):
-        return list(self.types)
-
-    def nextParent(self, sha1):
-        if self.isBoundary:
-            self.nextSha[self.activeLane] = ""
-        else:
-            self.nextSha[self.activeLane] = sha1
-
-    def afterMerge(self):
-        if self.isBoundary:
-            return
-
-        for i in range(len(self.types)):
-            t = self.types[i]
-            if Lane.isHead(t) or Lane.isJoin(t) or t == Lane.CROSS:
-                self.types[i] = Lane.NOT_ACTIVE
-            elif t == Lane.CROSS_EMPTY:
-                self.types[i] = Lane.EMPTY
-            elif self.isNode(t):
-                self.types[i] = Lane.ACTIVE
-
-    def afterFork(self):
-        for i in range(len(self.types)):
-            t = self.types[i]
-            if t == Lane.CROSS:
-                self.types[i] = Lane.NOT_ACTIVE
-            elif Lane.isTail(t) or t == Lane.CROSS_EMPTY:
-                self.types[i] = Lane.EMPTY
-
-            if not self.isBoundary and self.isNode(t):
-                self.types[i] = Lane.ACTIVE
-
-        while self.types[-1] == Lane.EMPTY:
-            self.types.pop()
-            self.nextSha.pop()
-
-    def afterBranch(self):
-        self.types[self.activeLane] = Lane.ACTIVE
-
-
 class FindData():
 
     def __init__(self):
@@ -465,27 +465,6 @@ class FindData():
         return FIND_NOTFOUND
 
 
-class CheckLocalChangesThread(QThread):
-
-    checkFinished = Signal(bool, bool)
-
-    def __init__(self, branch, parent=None):
-        super().__init__(parent)
-        self._branch = branch
-
-    def run(self):
-        if self.isInterruptionRequested():
-            return
-        hasLCC = Git.hasLocalChanges(self._branch, True)
-
-        if self.isInterruptionRequested():
-            return
-        hasLUC = Git.hasLocalChanges(self._branch)
-
-        if not self.isInterruptionRequested():
-            self.checkFinished.emit(hasLCC, hasLUC)
-
-
 class LogGraph(QWidget):
 
     def __init__(self, parent=None):
@@ -534,7 +513,11 @@ class LogView(QAbstractScrollArea):
         self.delayVisible = False
         self.delayUpdateParents = False
 
-        self.checkThread = None
+        self.checkingLocalChanges = False
+        # keep the rows of local changes until the probe finished
+        self.refreshingLocalChanges = False
+        LocalChangesProbe.instance().probeFinished.connect(
+            self.__onCheckFinished)
 
         self.lineSpace = dpiScaled(5)
         self.marginX = dpiScaled(3)
@@ -547,8 +530,6 @@ class LogView(QAbstractScrollArea):
 
         self.logGraph = None
 
-        self.authorRe = re.compile("(.*) <.*>$")
-
         self.findProc = None
         self.isFindFinished = False
         self.findData = FindData()
@@ -559,6 +540,13 @@ class LogView(QAbstractScrollArea):
         self.filterPath = None
         self.menu = None
 
+        # sha1: (state, pixmap) of the rendered rows
+        self.rowCache = OrderedDict()
+        # the pre-rendered lanes to compose the graph
+        self.laneGlyphs = {}
+        self.graphsVersion = 0
+        self.graphState = None
+
         self.setContextMenuPolicy(Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.showContextMenu)
 
@@ -567,10 +555,38 @@ class LogView(QAbstractScrollArea):
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
 
         self.fetcher.logsAvailable.connect(
-            self.__onLogsAvailable)
+            self.__onFetcherLogsAvailable)
         self.fetcher.fetchFinished.connect(
             self.__onFetchFinished)
 
+        # for the new commits of current branch
+        self.newLogs = []
+        self.newLogsFetcher = LogsFetcher(self)
+        self.newLogsFetcher.logsAvailable.connect(
+            self.__onNewLogsAvailable)
+        self.newLogsFetcher.fetchFinished.connect(
+            self.__onNewLogsFetchFinished)
+
+        self.graphFetcher = GraphLogsFetcher(self)
+        self.graphFetcher.logsAvailable.connect(
+            self.__onGraphLogsAvailable)
+        self.graphFetcher.fetchFinished.connect(
+            self.__onFetchFinished)
+        self.graphFetcher.fetchFailed.connect(
+            self.__onGraphFetchFailed)
+
+        # sha1: commit, the ones from graph without text yet
+        self.lazyCommits = {}
+        self.lazyRange = None
+        self.commitsReader = CommitsReader(self)
+        self.commitsReader.commitsAvailable.connect(
+            self.__onCommitsTextAvailable)
+        self.commitsReader.finished.connect(
+            self.__onCommitsTextFetchFinished)
+        self.commitsReader.findFinished.connect(
+            self.__onFindCommentsFinished)
+        self.isFindingComments = False
+
         self.updateSettings()
 
         qApp.settings().logViewFontChanged.connect(
@@ -578,6 +594,7 @@ class LogView(QAbstractScrollArea):
 
     def __del__(self):
         self.cancelFindCommit()
+        self.commitsReader.close()
 
     def __ensureContextMenu(self):
         if self.menu:
@@ -607,6 +624,9 @@ class LogView(QAbstractScrollArea):
         self.acGenDiff = self.menu.addAction(
             self.tr("Generate &diff"),
             self.__onGenerateDiff)
+        self.acExportMarked = self.menu.addAction(
+            self.tr("E&xport marked commits"),
+            self.__onExportMarked)
 
         self.menu.addSeparator()
         self.acRevert = self.menu.addAction(
@@ -638,22 +658,233 @@ class LogView(QAbstractScrollArea):
     def showLogs(self, branch, args=None):
         self.curBranch = branch
         self.args = args
-        self.fetcher.fetch(branch, args)
+        self.newLogsFetcher.cancel()
+        self.newLogs = []
+        self.fetcher.cancel()
+
+        slim = qApp.settings().slimLog()
+        self.fetcher.slim = slim
+        self.newLogsFetcher.slim = slim
+        if args or not self.graphFetcher.fetch(branch):
+            self.graphFetcher.cancel()
+            self.fetcher.fetch(branch, args)
         self.beginFetch.emit()
 
-        if self.checkThread:
-            self.checkThread.disconnect(self)
-            self.checkThread.requestInterruption()
-            self.checkThread.wait()
-            self.checkThread = None
-
+        self.checkingLocalChanges = not args
+        self.refreshingLocalChanges = False
         if not args:
-            self.checkThread = CheckLocalChangesThread(self.curBranch)
-            self.checkThread.checkFinished.connect(self.__onCheckFinished)
-            self.checkThread.start()
+            LocalChangesProbe.instance().probe(self.curBranch)
+
+    def refreshLogs(self):
+        """fetch the new commits if the branch moved forward
+        otherwise reload all"""
+        if not self.curBranch or self.newLogsFetcher.isLoading():
+            return
+
+        if self.__isFetching():
+            self.__reloadLogs()
+            return
+
+        oldTip = None
+        for commit in self.data:
+            if commit.sha1 not in [Git.LCC_SHA1, Git.LUC_SHA1]:
+                oldTip = commit.sha1
+                break
+
+        branch = self.curBranch
+        if branch.startswith("(HEAD detached"):
+            branch = "HEAD"
+        newTip = Git.revParse(branch)
+
+        if not oldTip or not newTip:
+            self.__reloadLogs()
+        elif newTip == oldTip:
+            # refs only
+            self.viewport().update()
+            self.refreshLocalChanges()
+        elif Git.isAncestor(oldTip, newTip):
+            args = ["^" + oldTip]
+            if self.args:
+                args.extend(self.args)
+            self.newLogs = []
+            self.newLogsFetcher.fetch(newTip, args)
+        else:
+            self.__reloadLogs()
+
+    def refreshLocalChanges(self):
+        if self.args or self.__isFetching():
+            return
+
+        self.checkingLocalChanges = True
+        self.refreshingLocalChanges = True
+        LocalChangesProbe.instance().probe(self.curBranch)
+
+    def __isFetching(self):
+        return self.fetcher.isLoading() or self.graphFetcher.isLoading()
+
+    def __addLazyCommits(self, logs):
+        for commit in logs:
+            self.lazyCommits[commit.sha1] = commit
+
+    def __onFetcherLogsAvailable(self, logs):
+        if self.fetcher.slim:
+            self.__addLazyCommits(logs)
+        self.__onLogsAvailable(logs)
+
+    def __onGraphLogsAvailable(self, logs):
+        self.__addLazyCommits(logs)
+        self.__onLogsAvailable(logs)
+
+    def __onGraphFetchFailed(self):
+        self.fetcher.fetch(self.curBranch, self.args)
+
+    def __fetchCommitsText(self, begin, end):
+        if not self.lazyCommits:
+            return
+
+        if self.commitsReader.isLoading():
+            self.lazyRange = (begin, end)
+            return
+
+        sha1s = [commit.sha1 for commit in self.data[begin:end]
+                 if commit.sha1 in self.lazyCommits]
+        if sha1s:
+            self.commitsReader.read(sha1s)
+
+    def __onCommitsTextAvailable(self, logs):
+        for log in logs:
+            commit = self.lazyCommits.pop(log.sha1, None)
+            if commit:
+                self.__fillCommit(commit, log)
+        self.viewport().update()
+
+    def __onCommitsTextFetchFinished(self):
+        if self.lazyRange:
+            begin, end = self.lazyRange
+            self.lazyRange = None
+            self.__fetchCommitsText(begin, end)
+
+    def __fillCommit(self, commit, log):
+        commit.comments = log.comments
+        commit.author = log.author
+        commit.authorDate = log.authorDate
+        commit.committer = log.committer
+        commit.committerDate = log.committerDate
+        commit.subject = log.subject
+        commit.authorName = log.authorName
+        commit.date = log.date
+
+    def __ensureCommitsText(self, commits):
+        sha1s = [commit.sha1 for commit in commits
+                 if commit.sha1 in self.lazyCommits]
+        if not sha1s:
+            return
+
+        for log in self.commitsReader.readSync(sha1s):
+            commit = self.lazyCommits.pop(log.sha1, None)
+            if commit:
+                self.__fillCommit(commit, log)
+
+    def __reloadLogs(self):
+        sha1 = None
+        if self.curIdx != -1:
+            sha1 = self.data[self.curIdx].sha1
+            if sha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
+                sha1 = None
+
+        self.clear()
+        self.showLogs(self.curBranch, self.args)
+        if sha1:
+            self.preferSha1 = sha1
+
+    def __localChangesCount(self):
+        count = 0
+        while count < len(self.data) and \
+                self.data[count].sha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
+            count += 1
+        return count
+
+    def __removeLocalChanges(self):
+        """remove the local changes rows"""
+        count = self.__localChangesCount()
+        if count == 0:
+            return
+
+        del self.data[:count]
+        if self.data and self.data[0].children:
+            self.data[0].children = [
+                sha1 for sha1 in self.data[0].children
+                if sha1 not in [Git.LCC_SHA1, Git.LUC_SHA1]]
+
+        if self.curIdx != -1 and self.curIdx < count:
+            self.curIdx = 0 if self.data else -1
+        elif self.curIdx != -1:
+            self.curIdx -= count
+
+        self.__shiftMarker(-count)
+        self.clearFindData()
+        self.__resetGraphs()
+        self.updateGeometries()
+        self.viewport().update()
+
+    def __shiftMarker(self, offset):
+        if not self.marker.hasMark():
+            return
+
+        begin = self.marker.begin() + offset
+        end = self.marker.end() + offset
+        if begin < 0:
+            self.marker.clear()
+        else:
+            self.marker.mark(begin, end)
+
+    def __onNewLogsAvailable(self, logs):
+        self.newLogs.extend(logs)
+
+    def __onNewLogsFetchFinished(self, exitCode):
+        logs = self.newLogs
+        self.newLogs = []
+
+        if exitCode != 0:
+            self.__reloadLogs()
+            return
+
+        if logs:
+            if self.newLogsFetcher.slim:
+                self.__addLazyCommits(logs)
+            # the local changes are on top of the new logs
+            localCount = self.__localChangesCount()
+            if localCount < len(self.data):
+                # will be rebuilt when needed
+                self.data[localCount].children = None
+            if localCount:
+                self.data[localCount - 1].parents = [logs[0].sha1]
+            self.data[localCount:localCount] = logs
+
+            count = len(logs)
+            if self.curIdx >= localCount:
+                self.curIdx += count
+            self.__shiftMarker(count)
+
+            vScrollBar = self.verticalScrollBar()
+            firstLine = vScrollBar.value()
+
+            self.clearFindData()
+            self.__resetGraphs()
+            self.updateGeometries()
+            # keep the view if it was scrolled
+            if firstLine > 0:
+                vScrollBar.setValue(firstLine + count)
+
+        self.viewport().update()
+        self.refreshLocalChanges()
 
     def clear(self):
         self.data.clear()
+        self.rowCache.clear()
+        self.lazyCommits.clear()
+        self.lazyRange = None
+        self.commitsReader.cancel()
         self.curIdx = -1
         self.__resetGraphs()
         self.marker.clear()
@@ -668,7 +899,10 @@ class LogView(QAbstractScrollArea):
             self.logGraph.render(None)
 
     def getCommit(self, index):
-        return self.data[index]
+        commit = self.data[index]
+        if commit.sha1 in self.lazyCommits:
+            self.__ensureCommitsText([commit])
+        return commit
 
     def getCount(self):
         return len(self.data)
@@ -713,7 +947,7 @@ class LogView(QAbstractScrollArea):
         index = self.findCommitIndex(sha1)
         if index != -1:
             self.setCurrentIndex(index)
-        elif self.fetcher.isLoading() or delay:
+        elif self.__isFetching() or delay:
             self.preferSha1 = sha1
             return True
 
@@ -762,6 +996,7 @@ class LogView(QAbstractScrollArea):
         hasMark = self.marker.hasMark()
         self.acMarkTo.setVisible(hasMark)
         self.acClearMarks.setVisible(hasMark)
+        self.acExportMarked.setVisible(hasMark)
 
         globalPos = self.mapToGlobal(pos)
         self.menu.exec_(globalPos)
@@ -772,6 +1007,7 @@ class LogView(QAbstractScrollArea):
 
         self.lineHeight = QFontMetrics(self.font).height() + self.lineSpace
 
+        self.rowCache.clear()
         self.updateGeometries()
         self.viewport().update()
 
@@ -867,7 +1103,7 @@ class LogView(QAbstractScrollArea):
             self,
             self.tr("Save Patch"))
         if f:
-           Git.generatePatch(commit.sha1, f)
+            self.__exportToFiles([ExportJob(Git.patchArgs(commit.sha1), f)])
 
     def __onGenerateDiff(self):
         if self.curIdx == -1:
@@ -880,7 +1116,45 @@ class LogView(QAbstractScrollArea):
             self,
             self.tr("Save Diff"))
         if f:
-            Git.generateDiff(commit.sha1, f)
+            self.__exportToFiles([ExportJob(Git.rawDiffArgs(commit.sha1), f)])
+
+    def __onExportMarked(self):
+        if not self.marker.hasMark():
+            return
+
+        sha1s = []
+        merges = 0
+        for i in range(self.marker.begin(), self.marker.end() + 1):
+            commit = self.data[i]
+            if commit.sha1 in [Git.LUC_SHA1, Git.LCC_SHA1]:
+                continue
+            # no patch for merge commit
+            if len(commit.parents) > 1:
+                merges += 1
+                continue
+            sha1s.append(commit.sha1)
+
+        if merges:
+            QMessageBox.information(
+                self, self.window().windowTitle(),
+                self.tr("No patch for the merge commits, {0} of the "
+                        "marked commits are skipped.").format(merges))
+
+        if not sha1s:
+            return
+
+        dir = QFileDialog.getExistingDirectory(
+            self, self.tr("Export Patches"))
+        if dir:
+            self.__exportToFiles(formatPatchJobs(sha1s, dir))
+
+    def __exportToFiles(self, jobs):
+        dialog = ExportProgressDialog(jobs, self)
+        dialog.exec_()
+        if dialog.errors:
+            QMessageBox.critical(
+                self, self.window().windowTitle(),
+                "\n".join(dialog.errors))
 
     def __onRevertCommit(self):
         if self.curIdx == -1:
@@ -934,6 +1208,10 @@ class LogView(QAbstractScrollArea):
 
             self.viewport().update()
 
+    def __onFindCommentsFinished(self, result):
+        self.isFindingComments = False
+        self.findFinished.emit(result)
+
     def __onFindFinished(self, exitCode, exitStatus):
         self.findProc = None
         self.isFindFinished = True
@@ -983,7 +1261,28 @@ class LogView(QAbstractScrollArea):
         else:
             self.viewport().update()
 
-    def __onCheckFinished(self, hasLCC, hasLUC):
+    def __onCheckFinished(self, branch, hasLCC, hasLUC):
+        if not self.checkingLocalChanges or branch != self.curBranch:
+            return
+        self.checkingLocalChanges = False
+
+        refreshing = self.refreshingLocalChanges
+        self.refreshingLocalChanges = False
+        if refreshing:
+            oldCount = self.__localChangesCount()
+            oldSha1s = [commit.sha1 for commit in self.data[:oldCount]]
+            curIdx = self.curIdx
+            curSha1 = self.data[curIdx].sha1 if curIdx != -1 else None
+
+            if (Git.LCC_SHA1 in oldSha1s) == hasLCC and \
+                    (Git.LUC_SHA1 in oldSha1s) == hasLUC:
+                if curSha1 in oldSha1s:
+                    # the changes might differ
+                    self.currentIndexChanged.emit(curIdx)
+                return
+
+            self.__removeLocalChanges()
+
         parent_sha1 = self.data[0].sha1 if self.data else None
 
         self.delayUpdateParents = False
@@ -992,6 +1291,7 @@ class LogView(QAbstractScrollArea):
             lcc_cmit.sha1 = Git.LCC_SHA1
             lcc_cmit.comments = self.tr(
                 "Local changes checked in to index but not committed")
+            lcc_cmit.updateDisplayFields()
             lcc_cmit.parents = [parent_sha1] if parent_sha1 else []
             lcc_cmit.children = [Git.LUC_SHA1] if hasLUC else []
 
@@ -1013,6 +1313,7 @@ class LogView(QAbstractScrollArea):
             luc_cmit.sha1 = Git.LUC_SHA1
             luc_cmit.comments = self.tr(
                 "Local uncommitted changes, not checked in to index")
+            luc_cmit.updateDisplayFields()
             luc_cmit.parents = [parent_sha1] if parent_sha1 else []
             luc_cmit.children = []
 
@@ -1033,17 +1334,33 @@ class LogView(QAbstractScrollArea):
             self.__resetGraphs()
             self.viewport().update()
 
+        if refreshing:
+            newCount = self.__localChangesCount()
+            self.__shiftMarker(newCount)
+            self.updateGeometries()
+            self.viewport().update()
+
+            if curSha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
+                newSha1s = [commit.sha1 for commit in self.data[:newCount]]
+                if curSha1 in newSha1s:
+                    self.curIdx = newSha1s.index(curSha1)
+                else:
+                    self.curIdx = 0 if self.data else -1
+                    self.currentIndexChanged.emit(self.curIdx)
+            elif curIdx != -1:
+                self.curIdx = curIdx - oldCount + newCount
+            return
+
         if self.curIdx == 0 and (hasLUC or hasLCC):
             # force update the diff
             self.currentIndexChanged.emit(0)
             self.viewport().update()
 
-        self.checkThread = None
-
     def __resetGraphs(self):
         self.graphs.clear()
         self.lanes = Lanes()
         self.firstFreeLane = 0
+        self.graphsVersion += 1
 
     def __sha1Url(self, sha1):
         sha1Url = qApp.settings().commitUrl(qApp.repoName())
@@ -1188,7 +1505,7 @@ class LogView(QAbstractScrollArea):
     def __laneWidth(self):
         return int(self.lineHeight * 3 / 4)
 
-    def __drawGraph(self, painter, graphPainter, rect, cid):
+    def __drawGraph(self, graphPainter, rect, cid):
         commit = self.data[cid]
         if not commit.sha1 in self.graphs:
             self.__updateGraph(cid)
@@ -1214,6 +1531,7 @@ class LogView(QAbstractScrollArea):
 
         if graphPainter:
             maxW = graphPainter.device().width()
+            margin = LANE_GLYPH_MARGIN
             x2 = 0
 
             graphPainter.save()
@@ -1230,14 +1548,15 @@ class LogView(QAbstractScrollArea):
                     color = activeColor
                 else:
                     color = GRAPH_COLORS[i % totalColor]
-                self.__drawGraphLane(graphPainter, lane, x1, x2,
-                                     color, activeColor, isHead, firstCommit)
+                glyph = self.__laneGlyph(graphPainter, lane, color,
+                                         activeColor, isHead, firstCommit)
+                graphPainter.drawPixmap(x1 - margin, -margin, glyph)
 
                 if x2 > maxW:
                     break
             graphPainter.restore()
 
-        # refs
+    def __drawRefs(self, painter, rect, commit):
         rc = QRect(rect)
         rc.moveTo(0, 0)
         preL = rc.left()
@@ -1251,9 +1570,35 @@ class LogView(QAbstractScrollArea):
         offset = rc.left() - preL
         if offset != 0:  # have refs
             # spaces after refs
-            offset += int(w / 3)
+            offset += int(self.__laneWidth() / 3)
             rect.adjust(offset, 0, 0, 0)
 
+    def __laneGlyph(self, graphPainter, lane, color, activeColor,
+                    isHead, firstCommit):
+        w = self.__laneWidth()
+        dpr = graphPainter.device().devicePixelRatioF()
+        key = (lane, QColor(color).rgba(), QColor(activeColor).rgba(),
+               isHead, firstCommit, w, self.lineHeight, dpr)
+        glyph = self.laneGlyphs.get(key)
+        if glyph:
+            return glyph
+
+        margin = LANE_GLYPH_MARGIN
+        size = QSize(w + 2 * margin, int(self.lineHeight) + 2 * margin)
+        glyph = QPixmap(size * dpr)
+        glyph.setDevicePixelRatio(dpr)
+        glyph.fill(Qt.transparent)
+
+        painter = QPainter(glyph)
+        painter.setRenderHints(graphPainter.renderHints())
+        painter.translate(margin, margin)
+        self.__drawGraphLane(painter, lane, 0, w, color,
+                             activeColor, isHead, firstCommit)
+        painter.end()
+
+        self.laneGlyphs[key] = glyph
+        return glyph
+
     def __drawGraphLane(self, painter, lane, x1, x2, color, activeColor, isHead, firstCommit):
         h = int(self.lineHeight / 2)
         m = int((x1 + x2) / 2)
@@ -1396,6 +1741,110 @@ class LogView(QAbstractScrollArea):
 
         painter.restore()
 
+    def __rowPixmap(self, index, rect):
+        commit = self.data[index]
+        isCurrent = index == self.curIdx
+        refs = Git.REF_MAP.get(commit.sha1) if Git.REF_MAP else None
+        dpr = self.viewport().devicePixelRatioF()
+        key = (rect.width(),
+               dpr,
+               isCurrent,
+               isCurrent and self.hasFocus(),
+               index in self.findData.result,
+               self.marker.isMarked(index),
+               commit.sha1 in self.lazyCommits,
+               tuple((ref.type, ref.name) for ref in refs) if refs else None,
+               commit.sha1 == Git.REV_HEAD)
+
+        cache = self.rowCache.get(commit.sha1)
+        if cache and cache[0] == key:
+            self.rowCache.move_to_end(commit.sha1)
+            return cache[1]
+
+        pixmap = QPixmap(rect.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(self.palette().color(QPalette.Base))
+
+        painter = QPainter(pixmap)
+        self.__drawRow(painter, QRect(QPoint(0, 0), rect.size()), index)
+        painter.end()
+
+        self.rowCache[commit.sha1] = (key, pixmap)
+        # a few pages are enough for scrolling back and forth
+        while len(self.rowCache) > max(256, self.__linesPerPage() * 4):
+            self.rowCache.popitem(last=False)
+
+        return pixmap
+
+    def __drawRow(self, painter, rect, i):
+        painter.setFont(self.font)
+        palette = self.palette()
+        flags = Qt.AlignLeft | Qt.AlignVCenter | Qt.TextSingleLine
+
+        commit = self.data[i]
+        self.__drawRefs(painter, rect, commit)
+
+        if not commit.sha1 in [Git.LCC_SHA1, Git.LUC_SHA1] and \
+                commit.sha1 not in self.lazyCommits:
+            # author
+            color = Qt.gray
+            self.__drawTag(painter, rect, color, commit.authorName)
+
+            # date
+            color = QColor(140, 208, 80)
+            self.__drawTag(painter, rect, color, commit.date)
+            rect.adjust(dpiScaled(4), 0, 0, 0)
+
+        # marker
+        self.marker.draw(i, painter, rect)
+
+        # subject
+        painter.save()
+        if i == self.curIdx:
+            painter.fillRect(rect, palette.highlight())
+            if self.hasFocus():
+                painter.setPen(QPen(Qt.DotLine))
+                painter.drawRect(rect.adjusted(
+                    0, 0, dpiScaled(-1), dpiScaled(-1)))
+            painter.setPen(palette.color(QPalette.HighlightedText))
+        else:
+            painter.setPen(palette.color(QPalette.WindowText))
+
+        content = commit.subject
+
+        # bold find result
+        # it seems that *in* already fast, so no bsearch
+        if i in self.findData.result:
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+
+        if self.highlightPattern:
+            matchs = self.highlightPattern.finditer(content)
+            start = 0
+            oldPen = painter.pen()
+            for m in matchs:
+                if m.start() > start:
+                    br = painter.drawText(rect, flags, content[start:m.start()])
+                    rect.adjust(br.width(), 0, 0, 0)
+
+                text = content[m.start():m.end()]
+                if i == self.curIdx:
+                    painter.setPen(Qt.yellow)
+                else:
+                    br = painter.boundingRect(rect, flags, text)
+                    painter.fillRect(br, Qt.yellow)
+                br = painter.drawText(rect, flags, text)
+                rect.adjust(br.width(), 0, 0, 0)
+                start = m.end()
+                painter.setPen(oldPen)
+
+            if start < len(content):
+                painter.drawText(rect, flags, content[start:])
+        else:
+            painter.drawText(rect, flags, content)
+        painter.restore()
+
     def __drawGraphRef(self, painter, rc, commit):
         if not commit.sha1 in Git.REF_MAP:
             return
@@ -1428,41 +1877,7 @@ class LogView(QAbstractScrollArea):
         self.firstFreeLane = i + 1
 
     def __updateLanes(self, commit, lanes):
-        if lanes.isEmpty():
-            lanes.init(commit.sha1)
-
-        isFork, isDiscontinuity = lanes.isFork(commit.sha1)
-        isMerge = (len(commit.parents) > 1)
-        isInitial = (not commit.parents)
-
-        if isDiscontinuity:
-            lanes.changeActiveLane(commit.sha1)
-
-        lanes.setBoundary(False)  # TODO
-        if isFork:
-            lanes.setFork(commit.sha1)
-        if isMerge:
-            lanes.setMerge(commit.parents)
-        if isInitial:
-            lanes.setInitial()
-
-        l = lanes.getLanes()
-        self.graphs[commit.sha1] = l
-
-        if isInitial:
-            nextSha1 = ""
-        else:
-            nextSha1 = commit.parents[0]
-
-        lanes.nextParent(nextSha1)
-
-        # TODO: applied
-        if isMerge:
-            lanes.afterMerge()
-        if isFork:
-            lanes.afterFork()
-        if lanes.isBranch():
-            lanes.afterBranch()
+        self.graphs[commit.sha1] = lanes.update(commit.sha1, commit.parents)
 
     def __ensureChildren(self, index):
         commit = self.data[index]
@@ -1564,6 +1979,9 @@ class LogView(QAbstractScrollArea):
         return True
 
     def findCommitSync(self, findPattern, findRange, findField):
+        """returns the index found, None if finding in background as
+        the text of some commits is not read yet, the result is
+        emitted by findFinished"""
         # only use for finding in comments, as it should pretty fast
         assert findField == FindField.Comments
 
@@ -1593,7 +2011,16 @@ class LogView(QAbstractScrollArea):
             return False
 
         result = -1
-        total = abs(findRange.stop - findRange.start)
+
+        lazySha1s = set()
+        if self.lazyCommits:
+            lazySha1s = {self.data[i].sha1 for i in findRange
+                         if self.data[i].sha1 in self.lazyCommits}
+        if lazySha1s:
+            self.isFindingComments = True
+            self.commitsReader.find([(i, self.data[i]) for i in findRange],
+                                    lazySha1s, findInCommit)
+            return None
 
         for i in findRange:
             if findInCommit(self.data[i]):
@@ -1606,6 +2033,14 @@ class LogView(QAbstractScrollArea):
         self.isFindFinished = False
         self.findData.needUpdate = False
 
+        canceled = False
+        if self.isFindingComments:
+            self.isFindingComments = False
+            self.commitsReader.cancel()
+            if not forced:
+                self.findFinished.emit(FIND_CANCELED)
+            canceled = forced
+
         needEmit = self.findProc is not None
 
         # only terminate when forced
@@ -1624,10 +2059,11 @@ class LogView(QAbstractScrollArea):
         if needEmit:
             self.findFinished.emit(FIND_CANCELED)
 
-        return False
+        return canceled
 
     def highlightKeyword(self, pattern):
         self.highlightPattern = pattern
+        self.rowCache.clear()
         self.viewport().update()
 
     def clearFindData(self):
@@ -1677,88 +2113,31 @@ class LogView(QAbstractScrollArea):
             endLine = startLine + self.__linesPerPage() + 1
             endLine = min(len(self.data), endLine)
 
-        palette = self.palette()
+        self.__fetchCommitsText(startLine, endLine)
 
         graphPainter = None
         graphImage = None
         if self.logGraph and not self.logGraph.size().isEmpty() and \
                 eventRect.height() == self.viewport().height():
-            graphImage = QPixmap(self.logGraph.size())
-            graphImage.fill(self.logGraph.palette().color(QPalette.Base))
-            graphPainter = QPainter(graphImage)
-            graphPainter.setRenderHints(QPainter.Antialiasing)
+            # no need to render again if showing the same lanes
+            graphState = (self.graphsVersion, startLine, endLine,
+                          len(self.data), self.data[startLine].sha1,
+                          Git.REV_HEAD, self.logGraph.size(),
+                          self.lineHeight)
+            if graphState != self.graphState:
+                self.graphState = graphState
+                graphImage = QPixmap(self.logGraph.size())
+                graphImage.fill(self.logGraph.palette().color(QPalette.Base))
+                graphPainter = QPainter(graphImage)
+                graphPainter.setRenderHints(QPainter.Antialiasing)
 
-        painter.setFont(self.font)
-        flags = Qt.AlignLeft | Qt.AlignVCenter | Qt.TextSingleLine
         for i in range(startLine, endLine):
             rect = self.__itemRect(i)
             rect.adjust(dpiScaled(2), 0, 0, 0)
 
-            self.__drawGraph(painter, graphPainter, rect, i)
+            self.__drawGraph(graphPainter, rect, i)
 
-            commit = self.data[i]
-
-            if not commit.sha1 in [Git.LCC_SHA1, Git.LUC_SHA1]:
-                # author
-                text = self.authorRe.sub("\\1", commit.author)
-                color = Qt.gray
-                self.__drawTag(painter, rect, color, text)
-
-                # date
-                text = commit.authorDate.split(' ')[0]
-                color = QColor(140, 208, 80)
-                self.__drawTag(painter, rect, color, text)
-                rect.adjust(dpiScaled(4), 0, 0, 0)
-
-            # marker
-            self.marker.draw(i, painter, rect)
-
-            # subject
-            painter.save()
-            if i == self.curIdx:
-                painter.fillRect(rect, palette.highlight())
-                if self.hasFocus():
-                    painter.setPen(QPen(Qt.DotLine))
-                    painter.drawRect(rect.adjusted(
-                        0, 0, dpiScaled(-1), dpiScaled(-1)))
-                painter.setPen(palette.color(QPalette.HighlightedText))
-            else:
-                painter.setPen(palette.color(QPalette.WindowText))
-
-            content = commit.comments.split('\n')[0]
-
-            # bold find result
-            # it seems that *in* already fast, so no bsearch
-            if i in self.findData.result:
-                font = painter.font()
-                font.setBold(True)
-                painter.setFont(font)
-
-            if self.highlightPattern:
-                matchs = self.highlightPattern.finditer(content)
-                start = 0
-                oldPen = painter.pen()
-                for m in matchs:
-                    if m.start() > start:
-                        br = painter.drawText(rect, flags, content[start:m.start()])
-                        rect.adjust(br.width(), 0, 0, 0)
-
-                    text = content[m.start():m.end()]
-                    if i == self.curIdx:
-                        painter.setPen(Qt.yellow)
-                    else:
-                        br = painter.boundingRect(rect, flags, text)
-                        painter.fillRect(br, Qt.yellow)
-                    br = painter.drawText(rect, flags, text)
-                    rect.adjust(br.width(), 0, 0, 0)
-                    start = m.end()
-                    painter.setPen(oldPen)
-
-                if start < len(content):
-                    painter.drawText(rect, flags, content[start:])
-            else:
-                painter.drawText(rect, flags, content)
-            painter.restore()
+            painter.drawPixmap(rect.topLeft(), self.__rowPixmap(i, rect))
 
         if graphImage:
             del graphPainter
@@ -1820,6 +2199,11 @@ class LogView(QAbstractScrollArea):
         else:
             super(LogView, self).keyPressEvent(event)
 
+    def changeEvent(self, event):
+        if event.type() == QEvent.PaletteChange:
+            self.rowCache.clear()
+        super(LogView, self).changeEvent(event)
+
     def focusInEvent(self, event):
         self.invalidateItem(self.curIdx)
 
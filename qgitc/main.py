@@ -8,7 +8,7 @@ from PySide2.QtWidgets import (
 from .gitutils import Git
 from .excepthandler import ExceptHandler
 from .application import Application
-from .mainwindow import MainWindow
+from .instanceserver import forwardRequest
 from .shell import setup_shell_args
 from .common import isXfce4
 
@@ -83,6 +83,18 @@ def _setup_argument(prog):
         help="The file to blame.")
     blame_parser.set_defaults(func=_do_blame)
 
+    export_log_parser = subparsers.add_parser(
+        "export-log",
+        help="Export the commit graph as JSON lines without GUI.")
+    export_log_parser.add_argument(
+        "--output", "-o",
+        metavar="<file>",
+        help="Write to <file> instead of the standard output.")
+    export_log_parser.add_argument(
+        "log_args", metavar="<log-args>", nargs="*",
+        help="The arguments passed to git log, options go after --.")
+    export_log_parser.set_defaults(func=_do_export_log)
+
     setup_shell_args(subparsers)
 
     return parser.parse_args()
@@ -95,6 +107,26 @@ def _move_center(window):
         qApp.desktop().availableGeometry()))
 
 
+def _init_repo():
+    cwd = os.getcwd()
+    repoDir = Git.repoTopLevelDir(cwd)
+    Git.REPO_DIR = repoDir or cwd
+
+
+def _filter_file(file):
+    filterFile = file
+    if not os.path.isabs(filterFile):
+        filterFile = os.path.abspath(filterFile)
+
+    if Git.REPO_DIR:
+        normPath = os.path.normcase(os.path.normpath(filterFile))
+        repoDir = os.path.normcase(os.path.normpath(Git.REPO_DIR))
+        if normPath.find(repoDir) != -1:
+            filterFile = filterFile[len(repoDir) + 1:]
+
+    return filterFile
+
+
 def _init_gui():
     setAppUserId("appid.qgitc.xyz")
     app = Application(sys.argv)
@@ -105,7 +137,17 @@ def _init_gui():
 
 
 def _do_log(args):
+    _init_repo()
+
+    if args.cmd == "log":
+        request = {"cmd": "log",
+                   "compareMode": args.compare_mode,
+                   "filterFile": _filter_file(args.file) if args.file else None}
+        if forwardRequest(request):
+            return 0
+
     app = _init_gui()
+    from .mainwindow import MainWindow
 
     merge_mode = args.cmd == "mergetool"
     window = app.getWindow(Application.LogWindow)
@@ -119,17 +161,7 @@ def _do_log(args):
             window.setMode(MainWindow.CompareMode)
 
         if args.file:
-            filterFile = args.file
-            if not os.path.isabs(filterFile):
-                filterFile = os.path.abspath(filterFile)
-
-            if Git.REPO_DIR:
-                normPath = os.path.normcase(os.path.normpath(filterFile))
-                repoDir = os.path.normcase(os.path.normpath(Git.REPO_DIR))
-                if normPath.find(repoDir) != -1:
-                    filterFile = filterFile[len(repoDir) + 1:]
-
-            window.setFilterFile(filterFile)
+            window.setFilterFile(_filter_file(args.file))
 
     if window.restoreState():
         window.show()
@@ -140,6 +172,15 @@ def _do_log(args):
 
 
 def _do_blame(args):
+    _init_repo()
+
+    request = {"cmd": "blame",
+               "file": os.path.abspath(args.file),
+               "rev": args.rev,
+               "lineNo": args.line_number}
+    if forwardRequest(request):
+        return 0
+
     app = _init_gui()
 
     window = app.getWindow(Application.BlameWindow)
@@ -155,6 +196,29 @@ def _do_blame(args):
     return app.exec_()
 
 
+def _do_export_log(args):
+    _init_repo()
+
+    from .exportlog import exportLog
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            exitCode, error = exportLog(f, args.log_args)
+    else:
+        try:
+            exitCode, error = exportLog(sys.stdout, args.log_args)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # such as piped to head
+            sys.stdout = None
+            return 0
+
+    if error:
+        sys.stderr.write(error)
+
+    return exitCode
+
+
 def _update_scale_factor():
     if sys.platform != "linux":
         return
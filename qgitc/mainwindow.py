@@ -11,13 +11,12 @@ from PySide2.QtWidgets import (
 
 from .ui_mainwindow import Ui_MainWindow
 from .gitview import GitView
-from .preferences import Preferences
-from .gitutils import Git, GitProcess
+from .gitutils import Git, GitProcess, RefDatabase
 from .diffview import PatchViewer
-from .aboutdialog import AboutDialog
-from .mergewidget import MergeWidget
 from .stylehelper import dpiScaled
 from .statewindow import StateWindow
+from .repowatcher import RepoWatcher
+from .repoloader import RepoLoader
 
 import os
 import sys
@@ -104,6 +103,21 @@ class MainWindow(StateWindow):
         self._delayTimer = QTimer(self)
         self._delayTimer.setSingleShot(True)
 
+        self._repoWatcher = RepoWatcher(self)
+        self._repoWatcher.refsChanged.connect(
+            self.__onRepoRefsChanged)
+        self._repoWatcher.localChangesChanged.connect(
+            self.__onRepoLocalChangesChanged)
+
+        self._repoLoader = RepoLoader(self)
+        self._repoLoader.refsAvailable.connect(
+            self.__onRepoRefsAvailable)
+        self._repoLoader.mergeBranchAvailable.connect(
+            self.__onRepoMergeBranchAvailable)
+        # the refs and merge branch for view B in merge mode
+        self._loadedRefs = None
+        self._mergeBranch = None
+
         self.ui.cbSubmodule.setVisible(False)
         self.ui.lbSubmodule.setVisible(False)
 
@@ -233,8 +247,22 @@ class MainWindow(StateWindow):
         else:
             Git.REPO_DIR = repoDir
             Git.REPO_TOP_DIR = repoDir
-            Git.REF_MAP = Git.refs()
-            Git.REV_HEAD = Git.revHead()
+            if Git.REF_MAP:
+                Git.REF_MAP.clear()
+            Git.REV_HEAD = None
+
+        self._loadedRefs = None
+        self._mergeBranch = None
+        if repoDir:
+            # the log fetching starts once the refs available
+            self._repoLoader.load(self.mergeWidget is not None)
+        else:
+            self._repoLoader.cancel()
+            self.ui.gitViewA.reloadBranches()
+            if self.gitViewB:
+                self.gitViewB.reloadBranches()
+
+        self._repoWatcher.setRepoDir(repoDir)
 
         if self.findSubmoduleThread and self.findSubmoduleThread.isRunning():
             self.findSubmoduleThread.disconnect(self)
@@ -249,14 +277,36 @@ class MainWindow(StateWindow):
                 self.__onFindSubmoduleFinished)
             self.findSubmoduleThread.start()
 
-        branch = Git.mergeBranchName() if self.mergeWidget else None
+    def __onRepoRefsAvailable(self, refDb):
+        Git.REF_MAP = dict(refDb.refMap()) if refDb else {}
+        Git.REV_HEAD = refDb.headSha1 if refDb else None
+
+        self.ui.gitViewA.reloadBranches(refDb=refDb)
+        if self.mergeWidget:
+            self._loadedRefs = refDb
+            self.__reloadMergeBranches()
+        elif self.gitViewB:
+            self.gitViewB.reloadBranches(refDb=refDb)
+
+    def __onRepoMergeBranchAvailable(self, branch):
         if branch and branch.startswith("origin/"):
             branch = "remotes/" + branch
-        self.ui.gitViewA.reloadBranches()
+        self._mergeBranch = branch or ""
+        self.__reloadMergeBranches()
+
+    def __reloadMergeBranches(self):
+        if self._loadedRefs is None or self._mergeBranch is None:
+            return
+
         if self.gitViewB:
-            self.gitViewB.reloadBranches(branch)
+            self.gitViewB.reloadBranches(
+                self._mergeBranch or None, self._loadedRefs)
+        self._loadedRefs = None
+        self._mergeBranch = None
 
     def __onAcPreferencesTriggered(self):
+        from .preferences import Preferences
+
         settings = qApp.instance().settings()
         preferences = Preferences(settings, self)
         if preferences.exec_() == QDialog.Accepted:
@@ -314,6 +364,8 @@ class MainWindow(StateWindow):
         fw.executeFind()
 
     def __onAboutTriggered(self):
+        from .aboutdialog import AboutDialog
+
         aboutDlg = AboutDialog(self)
         aboutDlg.exec_()
 
@@ -328,12 +380,27 @@ class MainWindow(StateWindow):
             return
 
         Git.REPO_DIR = newRepo
+        self._repoWatcher.setRepoDir(newRepo)
         self.ui.gitViewA.reloadBranches(
             self.ui.gitViewA.currentBranch())
         if self.gitViewB:
             self.gitViewB.reloadBranches(
                 self.gitViewB.currentBranch())
 
+    def __onRepoRefsChanged(self):
+        refDb = RefDatabase.load()
+        Git.updateRefs(refDb)
+        Git.REV_HEAD = refDb.headSha1 if refDb else None
+
+        self.ui.gitViewA.refreshRefs(refDb)
+        if self.gitViewB:
+            self.gitViewB.refreshRefs(refDb)
+
+    def __onRepoLocalChangesChanged(self):
+        self.ui.gitViewA.refreshLocalChanges()
+        if self.gitViewB:
+            self.gitViewB.refreshLocalChanges()
+
     def __onFindSubmoduleFinished(self):
         submodules = self.findSubmoduleThread.submodules
         for submodule in submodules:
@@ -452,6 +519,7 @@ class MainWindow(StateWindow):
                 self.gitViewB.reloadBranches(branch)
             self.ui.acCompare.setChecked(True)
         elif mode == MainWindow.MergeMode:
+            from .mergewidget import MergeWidget
             self.mergeWidget = MergeWidget()
             self.mergeWidget.requestResolve.connect(
                 self.__onRequestResolve)
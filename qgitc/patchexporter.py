@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QElapsedTimer,
+    QObject,
+    QProcess,
+    QThread,
+    QTimer,
+    Qt,
+    Signal)
+from PySide2.QtWidgets import QProgressDialog
+
+from .gitutils import Git
+
+import os
+
+
+__all__ = ["ExportJob", "FormatPatchJob", "ExportProgressDialog",
+           "formatPatchJobs"]
+
+
+# how often the written size is checked
+PROGRESS_INTERVAL = 200
+# the commits of each format-patch, also limits the command line
+MAX_CHUNK_COMMITS = 200
+MAX_EXPORT_JOBS = 4
+
+
+def _formatSize(size):
+    if size < 1024:
+        return "{} B".format(size)
+    for unit in ["KB", "MB", "GB"]:
+        size /= 1024
+        if size < 1024 or unit == "GB":
+            return "{:.1f} {}".format(size, unit)
+
+
+class ExportJob(QObject):
+    """Run git with the output written to a file directly, so that
+    the huge output never goes through the memory"""
+
+    # bytes written
+    progress = Signal(int)
+    # exitCode, error message
+    finished = Signal(int, str)
+
+    def __init__(self, args, filePath, cwd=None, parent=None):
+        super().__init__(parent)
+        self._args = args
+        self._filePath = filePath
+        self._cwd = cwd
+        self._process = None
+        self._written = 0
+        self._exported = 0
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(PROGRESS_INTERVAL)
+        self._timer.timeout.connect(self._onTimeout)
+
+    @property
+    def filePath(self):
+        return self._filePath
+
+    @property
+    def written(self):
+        return self._written
+
+    @property
+    def total(self):
+        """the count of files to export"""
+        return 1
+
+    @property
+    def exported(self):
+        return self._exported
+
+    def isRunning(self):
+        return self._process is not None
+
+    def start(self):
+        self._process = QProcess(self)
+        self._process.setWorkingDirectory(self._cwd or Git.REPO_DIR)
+        self._initProcess(self._process)
+        self._process.finished.connect(self._onFinished)
+        self._process.start("git", self._args)
+        self._timer.start()
+
+    def cancel(self):
+        """stop the job and remove the incomplete output"""
+        if not self._process:
+            return
+
+        self._timer.stop()
+        # no finished signal for the canceled one
+        process = self._process
+        self._process = None
+        process.kill()
+        process.waitForFinished()
+        self._removeOutput()
+
+    def _initProcess(self, process):
+        process.setStandardOutputFile(self._filePath)
+
+    def _removeOutput(self):
+        try:
+            os.remove(self._filePath)
+        except OSError:
+            pass
+
+    def _writtenSize(self):
+        return os.path.getsize(self._filePath)
+
+    def _updateWritten(self):
+        try:
+            written = self._writtenSize()
+        except OSError:
+            return
+        if written != self._written:
+            self._written = written
+            self.progress.emit(written)
+
+    def _onTimeout(self):
+        self._updateWritten()
+
+    def _onFinished(self, exitCode, exitStatus):
+        if not self._process:
+            return
+
+        self._timer.stop()
+        self._onProcessFinished()
+        self._updateWritten()
+
+        error = self._process.readAllStandardError().data()
+        error = error.decode("utf-8", "replace")
+        if exitStatus != QProcess.NormalExit and not exitCode:
+            exitCode = -1
+        elif exitCode == 0:
+            outputError = self._outputError()
+            if outputError:
+                exitCode = -1
+                error = outputError
+
+        self._process = None
+        if exitCode != 0:
+            self._removeOutput()
+        else:
+            self._exported = self.total
+
+        self.finished.emit(exitCode, error)
+
+    def _onProcessFinished(self):
+        pass
+
+    def _outputError(self):
+        """returns the error of a successful run, None if no error"""
+        return None
+
+
+class FormatPatchJob(ExportJob):
+    """Export the patches of @sha1s into @outputDir, numbered from
+    @startNumber. The @sha1s are in log order, newest first"""
+
+    def __init__(self, sha1s, outputDir, startNumber=1, cwd=None,
+                 parent=None):
+        # a single revision is "since <sha1>" without the count
+        args = ["format-patch", "-o", outputDir,
+                "-{}".format(len(sha1s)),
+                "--start-number", str(startNumber),
+                # the total is unknown to each job
+                "--no-numbered",
+                "--no-walk=unsorted"]
+        args.extend(sha1s)
+        super().__init__(args, outputDir, cwd, parent)
+
+        self._total = len(sha1s)
+        # the files git has created
+        self._files = []
+        self._filesSize = 0
+        self._output = b''
+
+    @property
+    def total(self):
+        return self._total
+
+    def _initProcess(self, process):
+        process.readyReadStandardOutput.connect(self._onReadyRead)
+
+    def _addFiles(self, data):
+        lines = (self._output + data).split(b'\n')
+        self._output = lines[-1]
+        for line in lines[:-1]:
+            path = line.rstrip(b'\r').decode("utf-8")
+            if not path:
+                continue
+            # the previous one is done
+            if self._files:
+                self._filesSize += self._fileSize(self._files[-1])
+            self._files.append(os.path.join(self._cwd or Git.REPO_DIR,
+                                            path))
+        self._exported = max(0, len(self._files) - 1)
+
+    @staticmethod
+    def _fileSize(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _onReadyRead(self):
+        self._addFiles(self._process.readAllStandardOutput().data())
+
+    def _onProcessFinished(self):
+        self._addFiles(self._process.readAllStandardOutput().data() + b'\n')
+
+    def _outputError(self):
+        if len(self._files) != self._total:
+            return self.tr("Exported {0} of {1} patches to {2}").format(
+                len(self._files), self._total, self._filePath)
+        return None
+
+    def _writtenSize(self):
+        if not self._files:
+            return 0
+        return self._filesSize + self._fileSize(self._files[-1])
+
+    def _removeOutput(self):
+        for path in self._files:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def idealExportJobs():
+    return max(1, min(QThread.idealThreadCount(), MAX_EXPORT_JOBS))
+
+
+def formatPatchJobs(sha1s, outputDir, cwd=None):
+    """split @sha1s (newest first) into the jobs, the patch of the
+    oldest commit is numbered 1"""
+    jobs = []
+    count = len(sha1s)
+    chunkSize = -(-count // idealExportJobs())
+    chunkSize = max(1, min(MAX_CHUNK_COMMITS, chunkSize))
+    for end in range(count, 0, -chunkSize):
+        begin = max(0, end - chunkSize)
+        jobs.append(FormatPatchJob(
+            sha1s[begin:end], outputDir, count - end + 1, cwd))
+    return jobs
+
+
+class ExportProgressDialog(QProgressDialog):
+    """Show the progress of the export @jobs, cancel them all when
+    canceled. The jobs are started by the dialog, no more than
+    @maxJobs at the same time"""
+
+    def __init__(self, jobs, parent=None, maxJobs=MAX_EXPORT_JOBS):
+        super().__init__(parent)
+        self._jobs = jobs
+        self._maxJobs = maxJobs
+        self._started = 0
+        self._done = 0
+        self._errors = []
+        self._total = sum(job.total for job in jobs)
+        self._elapsed = QElapsedTimer()
+
+        self.setWindowTitle(self.tr("Export"))
+        self.setWindowModality(Qt.WindowModal)
+        self.setMinimumDuration(500)
+        self.setAutoClose(False)
+        self.setAutoReset(False)
+        # the size of a single output is unknown
+        self.setRange(0, self._total if self._total > 1 else 0)
+
+        for job in jobs:
+            job.progress.connect(self._updateProgress)
+            job.finished.connect(self._onJobFinished)
+
+        self.canceled.connect(self._onCanceled)
+        self._updateProgress()
+
+    @property
+    def errors(self):
+        return self._errors
+
+    def exec_(self):
+        self._elapsed.start()
+        while self._started < min(self._maxJobs, len(self._jobs)):
+            self._startNext()
+        return super().exec_()
+
+    def _startNext(self):
+        self._jobs[self._started].start()
+        self._started += 1
+
+    def _updateProgress(self):
+        written = sum(job.written for job in self._jobs)
+        if self._total <= 1:
+            self.setLabelText(
+                self.tr("{0} written").format(_formatSize(written)))
+            return
+
+        exported = sum(job.exported for job in self._jobs)
+        self.setValue(exported)
+
+        elapsed = 0
+        if self._elapsed.isValid():
+            elapsed = self._elapsed.elapsed() / 1000
+        speed = int(written / elapsed) if elapsed > 0 else 0
+        self.setLabelText(
+            self.tr("Exported {0} of {1} files, {2} written ({3}/s)").format(
+                exported, self._total, _formatSize(written),
+                _formatSize(speed)))
+
+    def _onJobFinished(self, exitCode, error):
+        self._done += 1
+        if exitCode != 0:
+            self._errors.append(error or self.tr("Failed to export {0}")
+                                .format(self.sender().filePath))
+
+        self._updateProgress()
+
+        if self._done == len(self._jobs):
+            self.done(QProgressDialog.Accepted if not self._errors
+                      else QProgressDialog.Rejected)
+        elif self._started < len(self._jobs):
+            self._startNext()
+
+    def _onCanceled(self):
+        for job in self._jobs:
+            job.cancel()
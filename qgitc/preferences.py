@@ -240,11 +240,16 @@ class Preferences(QDialog):
 
         self.ui.cbEsc.setChecked(self.settings.quitViaEsc())
         self.ui.cbState.setChecked(self.settings.rememberWindowState())
+        self.ui.cbSlimLog.setChecked(self.settings.slimLog())
 
         index = self.settings.ignoreWhitespace()
         if index < 0 or index >= self.ui.cbIgnoreWhitespace.count():
             index = 0
         self.ui.cbIgnoreWhitespace.setCurrentIndex(index)
+        self.ui.cbDiffStat.setChecked(self.settings.diffStat())
+        self.ui.leCollapseFiles.setText(
+            ";".join(self.settings.collapsePatterns()))
+        self.ui.sbMaxFileLines.setValue(self.settings.maxDiffFileLines())
 
         tools = self.settings.mergeToolList()
         self.ui.tableView.model().setRawData(tools)
@@ -592,9 +597,22 @@ class Preferences(QDialog):
         value = self.ui.cbState.isChecked()
         self.settings.setRememberWindowState(value)
 
+        value = self.ui.cbSlimLog.isChecked()
+        self.settings.setSlimLog(value)
+
         value = self.ui.cbIgnoreWhitespace.currentIndex()
         self.settings.setIgnoreWhitespace(value)
 
+        value = self.ui.cbDiffStat.isChecked()
+        self.settings.setDiffStat(value)
+
+        value = self.ui.leCollapseFiles.text().split(";")
+        self.settings.setCollapsePatterns(
+            [p.strip() for p in value if p.strip()])
+
+        value = self.ui.sbMaxFileLines.value()
+        self.settings.setMaxDiffFileLines(value)
+
         tools = self.ui.tableView.model().rawData()
         # TODO: validate if all tool isValid before saving
         self.settings.setMergeToolList(tools)
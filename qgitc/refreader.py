@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+
+import os
+import re
+import subprocess
+import threading
+import time
+import zlib
+
+
+__all__ = ["RefReader", "gitDirs"]
+
+# a file modified within this time of reading might be modified again
+# without changing its mtime, don't trust the cache of it
+RACY_NS = 2 * 1000 * 1000 * 1000
+
+_oid_re = re.compile(rb"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+# the refs of each worktree, others are shared by all worktrees
+_worktreeRefs = ["refs/bisect", "refs/worktree", "refs/rewritten"]
+
+# object id: peeled object id, never changes
+_peeledCache = {}
+
+_readers = {}
+_readersLock = threading.Lock()
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _readFile(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _isRacy(stamp, readTime):
+    return stamp is not None and stamp[0] + RACY_NS >= readTime
+
+
+def _isWorktreeRef(refname):
+    for name in _worktreeRefs:
+        if refname == name or refname.startswith(name + "/"):
+            return True
+    return False
+
+
+def gitDirs(repoDir):
+    """returns (gitDir, commonDir) of the work tree @repoDir
+    without running git, (None, None) if not found"""
+    dotGit = os.path.join(repoDir, ".git")
+    if os.path.isdir(dotGit):
+        gitDir = dotGit
+    else:
+        # linked worktree or submodule
+        data = _readFile(dotGit)
+        if not data or not data.startswith(b"gitdir: "):
+            return None, None
+        gitDir = data[8:].strip().decode("utf-8")
+        if not os.path.isabs(gitDir):
+            gitDir = os.path.join(repoDir, gitDir)
+
+    commonDir = gitDir
+    data = _readFile(os.path.join(gitDir, "commondir"))
+    if data:
+        commonDir = data.strip().decode("utf-8")
+        if not os.path.isabs(commonDir):
+            commonDir = os.path.join(gitDir, commonDir)
+
+    return os.path.normpath(gitDir), os.path.normpath(commonDir)
+
+
+def _parseRef(data):
+    """returns (oid, symref) of a loose ref file"""
+    data = data.strip()
+    if data.startswith(b"ref: "):
+        return None, data[5:].decode("utf-8")
+    if _oid_re.match(data):
+        return data.decode("utf-8"), None
+    return None, None
+
+
+def parsePackedRefs(data):
+    """returns {refname: (oid, peeled)}, peeled is None if unknown"""
+    refs = {}
+    lines = data.split(b'\n')
+    traits = []
+    if lines and lines[0].startswith(b"# pack-refs with:"):
+        traits = lines[0][17:].split()
+
+    fullyPeeled = b"fully-peeled" in traits
+    tagsPeeled = b"peeled" in traits
+
+    lastRef = None
+    for line in lines:
+        if not line or line.startswith(b"#"):
+            continue
+
+        if line.startswith(b"^"):
+            # the peeled object of the previous ref
+            if lastRef:
+                refs[lastRef] = (refs[lastRef][0], line[1:].decode("utf-8"))
+            continue
+
+        parts = line.split(b' ', 1)
+        if len(parts) != 2 or not _oid_re.match(parts[0]):
+            lastRef = None
+            continue
+
+        oid = parts[0].decode("utf-8")
+        lastRef = parts[1].decode("utf-8")
+        # no peeled line means not a tag object
+        if fullyPeeled or (tagsPeeled and lastRef.startswith("refs/tags/")):
+            refs[lastRef] = (oid, oid)
+        else:
+            refs[lastRef] = (oid, None)
+
+    return refs
+
+
+class RefReader():
+    """Read the refs from packed-refs and loose ref files directly.
+    Each directory is cached until its mtime changed, as git always
+    renames the lock file to update a ref"""
+
+    def __init__(self, repoDir, gitDir, commonDir):
+        self._repoDir = repoDir
+        self._gitDir = gitDir
+        self._commonDir = commonDir
+
+        self._lock = threading.Lock()
+
+        self._packedStamp = None
+        self._packedTime = 0
+        self._packed = {}
+
+        # dir: (stamp, readTime, subdirs, {refname: (oid, symref)})
+        self._dirs = {}
+
+        self._headStamp = None
+        self._headTime = 0
+        self._head = (None, None)
+
+        self._result = None
+
+    @staticmethod
+    def forRepo(repoDir):
+        """returns None if the refs can't be read directly"""
+        if not repoDir:
+            return None
+
+        with _readersLock:
+            if repoDir in _readers:
+                return _readers[repoDir]
+
+        gitDir, commonDir = gitDirs(repoDir)
+        reader = None
+        # the reftable format is not supported
+        if gitDir and os.path.isdir(os.path.join(commonDir, "refs")) and \
+                not os.path.exists(os.path.join(commonDir, "reftable")):
+            reader = RefReader(repoDir, gitDir, commonDir)
+
+        with _readersLock:
+            _readers[repoDir] = reader
+        return reader
+
+    @property
+    def gitDir(self):
+        return self._gitDir
+
+    @property
+    def commonDir(self):
+        return self._commonDir
+
+    def read(self):
+        """returns (records, detachedOid), the records are the list of
+        (oid, peeled, refname, head, symref) sorted by refname like
+        `for-each-ref` does, detachedOid is None if HEAD is a symref.
+        The same object is returned if nothing changed"""
+        with self._lock:
+            changed = self._readPacked()
+            changed = self._readHead() or changed
+
+            loose = {}
+            changed = self._readDir(os.path.join(self._commonDir, "refs"),
+                                    "refs", loose,
+                                    self._gitDir != self._commonDir) \
+                or changed
+            if self._gitDir != self._commonDir:
+                for name in _worktreeRefs:
+                    dir = os.path.join(self._gitDir, name)
+                    changed = self._readDir(dir, name, loose, False) \
+                        or changed
+
+            if changed or self._result is None:
+                result = (self._makeRecords(loose), self._head[0])
+                if result != self._result:
+                    self._result = result
+
+            return self._result
+
+    def _readPacked(self):
+        path = os.path.join(self._commonDir, "packed-refs")
+        stamp = _stat(path)
+        if stamp == self._packedStamp and \
+                not _isRacy(stamp, self._packedTime):
+            return False
+
+        readTime = time.time_ns()
+        data = _readFile(path) if stamp else None
+        self._packed = parsePackedRefs(data) if data else {}
+        self._packedStamp = stamp
+        self._packedTime = readTime
+        return True
+
+    def _readHead(self):
+        path = os.path.join(self._gitDir, "HEAD")
+        stamp = _stat(path)
+        if stamp == self._headStamp and \
+                not _isRacy(stamp, self._headTime):
+            return False
+
+        readTime = time.time_ns()
+        data = _readFile(path)
+        self._head = _parseRef(data) if data else (None, None)
+        self._headStamp = stamp
+        self._headTime = readTime
+        return True
+
+    def _readDir(self, dir, prefix, loose, skipWorktreeRefs):
+        stamp = _stat(dir)
+        if stamp is None:
+            self._dirs.pop(dir, None)
+            return False
+
+        changed = False
+        cache = self._dirs.get(dir)
+        if cache is None or cache[0] != stamp or _isRacy(stamp, cache[1]):
+            readTime = time.time_ns()
+            subdirs = []
+            refs = {}
+            try:
+                entries = list(os.scandir(dir))
+            except OSError:
+                entries = []
+
+            for entry in entries:
+                refname = prefix + "/" + entry.name
+                if entry.is_dir():
+                    subdirs.append(entry.name)
+                elif not entry.name.endswith(".lock"):
+                    data = _readFile(entry.path)
+                    if data:
+                        refs[refname] = _parseRef(data)
+
+            cache = (stamp, readTime, subdirs, refs)
+            self._dirs[dir] = cache
+            changed = True
+
+        loose.update(cache[3])
+        for name in cache[2]:
+            refname = prefix + "/" + name
+            # the ones in common dir belong to the main worktree
+            if skipWorktreeRefs and _isWorktreeRef(refname):
+                continue
+            changed = self._readDir(os.path.join(dir, name), refname,
+                                    loose, skipWorktreeRefs) or changed
+
+        return changed
+
+    def _makeRecords(self, loose):
+        isLinked = self._gitDir != self._commonDir
+        refs = {}
+        for refname, (oid, peeled) in self._packed.items():
+            if isLinked and _isWorktreeRef(refname):
+                continue
+            refs[refname] = (oid, peeled, "")
+
+        symrefs = []
+        for refname, (oid, symref) in loose.items():
+            if oid:
+                # loose ones override the packed
+                packed = refs.get(refname)
+                peeled = packed[1] if packed and packed[0] == oid else None
+                refs[refname] = (oid, peeled, "")
+            elif symref:
+                symrefs.append((refname, symref))
+
+        for refname, symref in symrefs:
+            target = refs.get(symref)
+            if target:
+                refs[refname] = (target[0], target[1], symref)
+
+        # only tags can point to a tag object
+        unknown = [oid for refname, (oid, peeled, _) in refs.items()
+                   if peeled is None and refname.startswith("refs/tags/")
+                   and oid not in _peeledCache]
+        if unknown:
+            self._peel(unknown)
+
+        headRef = self._head[1]
+        records = []
+        for refname in sorted(refs.keys()):
+            oid, peeled, symref = refs[refname]
+            if peeled is None:
+                peeled = _peeledCache.get(oid, oid)
+            head = "*" if refname == headRef else " "
+            # same as for-each-ref, no peeled for non tag object
+            records.append((oid, peeled if peeled != oid else "",
+                            refname, head, symref))
+
+        return records
+
+    def _looseObjectHeader(self, oid):
+        path = os.path.join(self._commonDir, "objects", oid[:2], oid[2:])
+        try:
+            with open(path, "rb") as f:
+                data = zlib.decompressobj().decompress(f.read(512), 256)
+        except (OSError, zlib.error):
+            return None
+        return data
+
+    def _peel(self, oids):
+        unresolved = []
+        for oid in set(oids):
+            data = self._looseObjectHeader(oid)
+            if not data:
+                unresolved.append(oid)
+            elif not data.startswith(b"tag "):
+                _peeledCache[oid] = oid
+            else:
+                # object <oid>\ntype <type>\n
+                m = re.search(rb"\0object ([0-9a-f]+)\ntype (\w+)\n", data)
+                if m and m.group(2) != b"tag":
+                    _peeledCache[oid] = m.group(1).decode("utf-8")
+                else:
+                    unresolved.append(oid)
+
+        if not unresolved:
+            return
+
+        startupinfo = None
+        if os.name == "nt":
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+
+        try:
+            process = subprocess.Popen(
+                ["git", "cat-file", "--batch-check"],
+                cwd=self._repoDir,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                startupinfo=startupinfo)
+            input = "".join(oid + "^{}\n" for oid in unresolved)
+            data, _ = process.communicate(input.encode("utf-8"))
+        except OSError:
+            return
+
+        lines = data.decode("utf-8").split('\n')
+        for oid, line in zip(unresolved, lines):
+            parts = line.split(' ')
+            if len(parts) == 3:
+                _peeledCache[oid] = parts[0]
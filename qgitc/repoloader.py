@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
+    Signal)
+
+from .gitutils import Git, RefDatabase
+
+
+__all__ = ["RepoLoader"]
+
+
+class QueryRunnable(QRunnable):
+
+    def __init__(self, loader, serial, query, func):
+        super().__init__()
+        self._loader = loader
+        self._serial = serial
+        self._query = query
+        self._func = func
+
+    def run(self):
+        try:
+            result = self._func()
+        except Exception:
+            result = None
+        self._loader._resultReady.emit(self._serial, self._query, result)
+
+
+class RepoLoader(QObject):
+    """Run the independent queries of opening a repo concurrently,
+    each result is notified as soon as it is ready"""
+
+    # the RefDatabase with branches, refs and HEAD
+    refsAvailable = Signal(object)
+    mergeBranchAvailable = Signal(object)
+    # all the queries finished
+    finished = Signal()
+
+    _resultReady = Signal(int, int, object)
+
+    Refs = 1
+    MergeBranch = 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(4)
+
+        self._serial = 0
+        self._pending = set()
+
+        self._resultReady.connect(self._onResultReady)
+
+    def load(self, withMergeBranch=False):
+        """query the repo of Git.REPO_DIR"""
+        self.cancel()
+
+        queries = [(RepoLoader.Refs, RefDatabase.load)]
+        if withMergeBranch:
+            queries.append((RepoLoader.MergeBranch, Git.mergeBranchName))
+
+        for query, func in queries:
+            self._pending.add(query)
+            self._pool.start(QueryRunnable(self, self._serial, query, func))
+
+    def cancel(self):
+        # the results of previous serial are dropped
+        self._serial += 1
+        self._pending.clear()
+
+    def isLoading(self):
+        return len(self._pending) > 0
+
+    def waitForDone(self):
+        self._pool.waitForDone()
+
+    def _onResultReady(self, serial, query, result):
+        if serial != self._serial or query not in self._pending:
+            return
+
+        self._pending.remove(query)
+        if query == RepoLoader.Refs:
+            self.refsAvailable.emit(result)
+        elif query == RepoLoader.MergeBranch:
+            self.mergeBranchAvailable.emit(result)
+
+        if not self._pending:
+            self.finished.emit()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtCore import (
+    QObject,
+    QFileSystemWatcher,
+    QTimer,
+    Signal)
+
+from .gitutils import Git
+from .localchanges import LocalChangesProbe
+
+import os
+
+
+__all__ = ["RepoWatcher"]
+
+
+class RepoWatcher(QObject):
+    """Watch HEAD, refs, packed-refs, index and worktrees of the repo,
+    the changes are debounced as git touches them many times
+    for a single command"""
+
+    # HEAD or any refs changed
+    refsChanged = Signal()
+    # index or work tree changed
+    localChangesChanged = Signal()
+
+    RefsChanged = 0x1
+    LocalChangesChanged = 0x2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self._gitDir = None
+        self._commonDir = None
+        self._changes = 0
+
+        self._watcher = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(500)
+        self._timer.timeout.connect(self._onTimeout)
+
+        LocalChangesProbe.instance().invalidated.connect(
+            self._onLocalChangesInvalidated)
+
+    def setRepoDir(self, repoDir):
+        self._timer.stop()
+        self._changes = 0
+        self._gitDir = None
+        self._commonDir = None
+
+        if self._watcher:
+            self._watcher.deleteLater()
+            self._watcher = None
+
+        if not repoDir:
+            return
+
+        args = ["rev-parse", "--absolute-git-dir", "--git-common-dir"]
+        data = Git.checkOutput(args)
+        if not data:
+            return
+
+        dirs = data.decode("utf-8").rstrip('\n').split('\n')
+        if len(dirs) != 2:
+            return
+
+        self._gitDir = os.path.normpath(dirs[0])
+        self._commonDir = os.path.normpath(os.path.join(repoDir, dirs[1]))
+
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._onFileChanged)
+        self._watcher.directoryChanged.connect(self._onDirectoryChanged)
+
+        self._watchFile(os.path.join(self._gitDir, "HEAD"))
+        self._watchFile(os.path.join(self._gitDir, "index"))
+        # HEAD of the main worktree, for the linked one
+        self._watchFile(os.path.join(self._commonDir, "HEAD"))
+        self._watchFile(os.path.join(self._commonDir, "packed-refs"))
+        # for packed-refs created later
+        self._watcher.addPath(self._commonDir)
+        self._watchRefsDir()
+        self._watchWorktrees()
+
+    @property
+    def gitDir(self):
+        return self._gitDir
+
+    @property
+    def commonDir(self):
+        return self._commonDir
+
+    def _watchFile(self, path):
+        if os.path.exists(path) and path not in self._watcher.files():
+            self._watcher.addPath(path)
+
+    def _watchRefsDir(self):
+        refsDir = os.path.join(self._commonDir, "refs")
+        dirs = set(self._watcher.directories())
+        newDirs = []
+        for root, _, _ in os.walk(refsDir):
+            if root not in dirs:
+                newDirs.append(root)
+
+        if newDirs:
+            self._watcher.addPaths(newDirs)
+
+    def _watchWorktrees(self):
+        worktreesDir = os.path.join(self._commonDir, "worktrees")
+        if not os.path.isdir(worktreesDir):
+            return
+
+        if worktreesDir not in self._watcher.directories():
+            self._watcher.addPath(worktreesDir)
+
+        for name in os.listdir(worktreesDir):
+            self._watchFile(os.path.join(worktreesDir, name, "HEAD"))
+
+    def _isWorktreePath(self, path):
+        worktreesDir = os.path.join(self._commonDir, "worktrees")
+        return path == worktreesDir or \
+            path.startswith(worktreesDir + os.sep)
+
+    def _notify(self, change):
+        self._changes |= change
+        self._timer.start()
+
+    def _onFileChanged(self, path):
+        # git replaces the file by renaming the lock file
+        self._watchFile(path)
+
+        if path == os.path.join(self._gitDir, "HEAD"):
+            Git.invalidateWorktrees()
+            self._notify(RepoWatcher.RefsChanged)
+        elif os.path.basename(path) == "index":
+            self._notify(RepoWatcher.LocalChangesChanged)
+        elif self._isWorktreePath(path) or \
+                path == os.path.join(self._commonDir, "HEAD"):
+            # branch switched in other worktree
+            Git.invalidateWorktrees()
+            self._notify(RepoWatcher.LocalChangesChanged)
+        else:
+            self._notify(RepoWatcher.RefsChanged)
+
+    def _onDirectoryChanged(self, path):
+        if path == self._commonDir:
+            packedRefs = os.path.join(self._commonDir, "packed-refs")
+            if packedRefs not in self._watcher.files() and \
+                    os.path.exists(packedRefs):
+                self._watcher.addPath(packedRefs)
+                self._notify(RepoWatcher.RefsChanged)
+            worktreesDir = os.path.join(self._commonDir, "worktrees")
+            if worktreesDir not in self._watcher.directories() and \
+                    os.path.isdir(worktreesDir):
+                Git.invalidateWorktrees()
+                self._watchWorktrees()
+        elif self._isWorktreePath(path):
+            # worktree added or removed
+            Git.invalidateWorktrees()
+            self._watchWorktrees()
+            self._notify(RepoWatcher.LocalChangesChanged)
+        elif os.path.exists(path):
+            self._watchRefsDir()
+            self._notify(RepoWatcher.RefsChanged)
+        else:
+            self._notify(RepoWatcher.RefsChanged)
+
+    def _onLocalChangesInvalidated(self, repoDir):
+        if self._gitDir:
+            self._notify(RepoWatcher.LocalChangesChanged)
+
+    def _onTimeout(self):
+        changes = self._changes
+        self._changes = 0
+
+        if changes & RepoWatcher.RefsChanged:
+            self.refsChanged.emit()
+        elif changes & RepoWatcher.LocalChangesChanged:
+            self.localChangesChanged.emit()
@@ -129,6 +129,27 @@ class Settings(QSettings):
         self.setValue("showWhitespace", show)
         self.showWhitespaceChanged.emit(show)
 
+    def diffStat(self):
+        return self.value("diffStat", True, type=bool)
+
+    def setDiffStat(self, show):
+        self.setValue("diffStat", show)
+
+    def collapsePatterns(self):
+        patterns = self.value(
+            "collapseFiles",
+            "*.lock;*.min.js;*.min.css;*.map;package-lock.json")
+        return [p.strip() for p in patterns.split(";") if p.strip()]
+
+    def setCollapsePatterns(self, patterns):
+        self.setValue("collapseFiles", ";".join(patterns))
+
+    def maxDiffFileLines(self):
+        return self.value("maxDiffFileLines", 10000, type=int)
+
+    def setMaxDiffFileLines(self, lines):
+        self.setValue("maxDiffFileLines", lines)
+
     def tabSize(self):
         return self.value("tabSize", 4, type=int)
 
@@ -142,6 +163,12 @@ class Settings(QSettings):
     def setQuitViaEsc(self, via):
         self.setValue("quitViaEsc", via)
 
+    def slimLog(self):
+        return self.value("slimLog", False, type=bool)
+
+    def setSlimLog(self, slim):
+        self.setValue("slimLog", slim)
+
     def rememberWindowState(self):
         return self.value("rememberWindowState", True, type=bool)
 
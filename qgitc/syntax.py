@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+from PySide2.QtGui import (
+    QFont,
+    QTextCharFormat)
+
+from array import array
+from collections import OrderedDict
+
+from .colorschema import ColorSchema
+from .textline import createFormatRange
+
+import os
+import re
+
+
+__all__ = ["TokenKind", "LineSide", "Lexer", "RegexLexer",
+           "SyntaxHighlighter", "registerLexer", "lexerForPath"]
+
+
+# lines farther than this from the known states are tokenized
+# from a guessed state instead of all the lines before
+MAX_RESYNC_LINES = 1000
+MAX_CACHED_LINES = 10000
+# the state is kept every this lines to resume from
+CHECKPOINT_LINES = 100
+
+
+class TokenKind:
+    Text = 0
+    Keyword = 1
+    Type = 2
+    String = 3
+    Number = 4
+    Comment = 5
+    Preprocessor = 6
+
+
+class LineSide:
+    """the sides of a diff line, the removed lines are in the old file
+    only and the context lines are in both"""
+    Old = 0x1
+    New = 0x2
+    Both = Old | New
+
+
+class Lexer():
+    """Tokenize a single line with the state carried from the line before,
+    the state is a small int and 0 is the initial state"""
+
+    def tokenize(self, text, state):
+        """returns (tokens, state), tokens is an array of the triples of
+        (start, length, kind) without the plain text ones. The whole
+        line is plain text by default"""
+        return array('I'), state
+
+
+class RegexLexer(Lexer):
+    """@rules is {state: [(pattern, kind, nextState)]}, @kind can be a
+    function to get the kind of the matched text, @nextState is None
+    to keep current state"""
+
+    def __init__(self, rules):
+        self._rules = {}
+        for state, stateRules in rules.items():
+            patterns = ["(?P<r%d>%s)" % (i, rule[0])
+                        for i, rule in enumerate(stateRules)]
+            # anything else is plain text
+            patterns.append(r"(?P<r%d>\w+|\s+|.)" % len(stateRules))
+            actions = [(kind, nextState)
+                       for _, kind, nextState in stateRules]
+            actions.append((TokenKind.Text, None))
+            self._rules[state] = (re.compile("|".join(patterns)), actions)
+
+    def tokenize(self, text, state):
+        tokens = array('I')
+        pos = 0
+        length = len(text)
+        while pos < length:
+            regex, actions = self._rules.get(state, self._rules[0])
+            m = regex.match(text, pos)
+            kind, nextState = actions[int(m.lastgroup[1:])]
+            end = m.end()
+            if callable(kind):
+                kind = kind(m.group())
+            if kind != TokenKind.Text:
+                # merge with the previous one of same kind
+                if tokens and tokens[-1] == kind and \
+                        tokens[-3] + tokens[-2] == pos:
+                    tokens[-2] += end - pos
+                else:
+                    tokens.extend((pos, end - pos, kind))
+            if nextState is not None:
+                state = nextState
+            pos = end
+
+        return tokens, state
+
+
+def _wordKind(keywords, types=()):
+    keywords = frozenset(keywords)
+    types = frozenset(types)
+
+    def _kind(word):
+        if word in keywords:
+            return TokenKind.Keyword
+        if word in types:
+            return TokenKind.Type
+        return TokenKind.Text
+
+    return _kind
+
+
+_number = r"\b(0[xX][0-9a-fA-F]+|\d+\.?\d*([eE][+-]?\d+)?)[uUlLfF]*\b"
+_dqString = r'"([^"\\]|\\.)*"?'
+_sqString = r"'([^'\\]|\\.)*'?"
+
+
+def _cLikeLexer(keywords, types=(), preprocessor=False):
+    rules = [
+        (r"//.*", TokenKind.Comment, None),
+        (r"/\*.*?\*/", TokenKind.Comment, None),
+        (r"/\*.*", TokenKind.Comment, 1),
+        (_dqString, TokenKind.String, None),
+        (_sqString, TokenKind.String, None),
+        (_number, TokenKind.Number, None),
+        (r"[A-Za-z_]\w*", _wordKind(keywords, types), None),
+    ]
+    if preprocessor:
+        rules.insert(0, (r"^\s*#\s*\w+", TokenKind.Preprocessor, None))
+
+    return RegexLexer({
+        0: rules,
+        # in the block comment
+        1: [(r".*?\*/", TokenKind.Comment, 0),
+            (r".+", TokenKind.Comment, None)]
+    })
+
+
+def _pythonLexer():
+    keywords = [
+        "and", "as", "assert", "async", "await", "break", "class",
+        "continue", "def", "del", "elif", "else", "except", "finally",
+        "for", "from", "global", "if", "import", "in", "is", "lambda",
+        "nonlocal", "not", "or", "pass", "raise", "return", "try",
+        "while", "with", "yield", "None", "True", "False", "self"]
+    prefix = r"(\b[rRbBuUfF]{1,2})?"
+    return RegexLexer({
+        0: [(r"#.*", TokenKind.Comment, None),
+            (prefix + r'""".*?"""', TokenKind.String, None),
+            (prefix + r"'''.*?'''", TokenKind.String, None),
+            (prefix + r'""".*', TokenKind.String, 1),
+            (prefix + r"'''.*", TokenKind.String, 2),
+            (prefix + _dqString, TokenKind.String, None),
+            (prefix + _sqString, TokenKind.String, None),
+            (r"^\s*@[\w.]+", TokenKind.Preprocessor, None),
+            (_number, TokenKind.Number, None),
+            (r"[A-Za-z_]\w*", _wordKind(keywords), None)],
+        # in the triple quoted strings
+        1: [(r'.*?"""', TokenKind.String, 0),
+            (r".+", TokenKind.String, None)],
+        2: [(r".*?'''", TokenKind.String, 0),
+            (r".+", TokenKind.String, None)],
+    })
+
+
+def _shellLexer():
+    keywords = [
+        "if", "then", "else", "elif", "fi", "for", "while", "until",
+        "do", "done", "case", "esac", "in", "function", "return",
+        "local", "export", "set", "unset"]
+    return RegexLexer({
+        0: [(r"(?<![\w$])#.*", TokenKind.Comment, None),
+            (_dqString, TokenKind.String, None),
+            (_sqString, TokenKind.String, None),
+            (r"\$\{?\w+\}?", TokenKind.Type, None),
+            (_number, TokenKind.Number, None),
+            (r"[A-Za-z_][\w-]*", _wordKind(keywords), None)],
+    })
+
+
+_cKeywords = [
+    "auto", "break", "case", "const", "continue", "default", "do",
+    "else", "enum", "extern", "for", "goto", "if", "inline", "register",
+    "restrict", "return", "sizeof", "static", "struct", "switch",
+    "typedef", "union", "volatile", "while", "NULL"]
+_cTypes = [
+    "bool", "char", "double", "float", "int", "long", "short", "signed",
+    "unsigned", "void", "size_t", "int8_t", "int16_t", "int32_t",
+    "int64_t", "uint8_t", "uint16_t", "uint32_t", "uint64_t"]
+_cppKeywords = _cKeywords + [
+    "alignas", "alignof", "catch", "class", "constexpr", "const_cast",
+    "decltype", "delete", "dynamic_cast", "explicit", "false", "final",
+    "friend", "mutable", "namespace", "new", "noexcept", "nullptr",
+    "operator", "override", "private", "protected", "public",
+    "reinterpret_cast", "static_assert", "static_cast", "template",
+    "this", "throw", "true", "try", "typename", "using", "virtual"]
+_javaKeywords = [
+    "abstract", "break", "case", "catch", "class", "const", "continue",
+    "default", "do", "else", "enum", "extends", "false", "final",
+    "finally", "for", "if", "implements", "import", "instanceof",
+    "interface", "native", "new", "null", "package", "private",
+    "protected", "public", "return", "static", "super", "switch",
+    "synchronized", "this", "throw", "throws", "true", "try", "var",
+    "while", "async", "await", "const", "export", "from", "function",
+    "let", "of", "typeof", "undefined", "yield", "namespace", "using",
+    "override", "virtual", "readonly", "internal"]
+_javaTypes = [
+    "boolean", "byte", "char", "double", "float", "int", "long",
+    "short", "void", "string", "object", "bool", "decimal", "uint",
+    "ulong", "ushort", "sbyte", "number", "any"]
+
+# ext: lexer
+_lexers = {}
+
+
+def registerLexer(lexer, extensions):
+    """use @lexer for the files with @extensions, such as ".c" """
+    for ext in extensions:
+        _lexers[ext.lower()] = lexer
+
+
+def lexerForPath(path):
+    """returns the lexer for @path, None if not supported"""
+    if not path:
+        return None
+
+    name = os.path.basename(path).lower()
+    if name in _lexers:
+        return _lexers[name]
+
+    _, ext = os.path.splitext(name)
+    return _lexers.get(ext) if ext else None
+
+
+registerLexer(_cLikeLexer(_cKeywords, _cTypes, True), [".c", ".h"])
+registerLexer(_cLikeLexer(_cppKeywords, _cTypes, True),
+              [".cc", ".cpp", ".cxx", ".hh", ".hpp", ".hxx", ".inl",
+               ".m", ".mm"])
+registerLexer(_cLikeLexer(_javaKeywords, _javaTypes),
+              [".java", ".js", ".jsx", ".ts", ".tsx", ".cs", ".kt",
+               ".go", ".rs", ".swift", ".scala"])
+registerLexer(_pythonLexer(), [".py", ".pyw", ".pyi"])
+registerLexer(_shellLexer(), [".sh", ".bash", ".zsh", ".cmake",
+                              "CMakeLists.txt", "Makefile", ".mk"])
+
+
+def _createFormats():
+    formats = {}
+
+    def _add(kind, color, bold=False, italic=False):
+        fmt = QTextCharFormat()
+        fmt.setForeground(color)
+        if bold:
+            fmt.setFontWeight(QFont.Bold)
+        if italic:
+            fmt.setFontItalic(True)
+        formats[kind] = fmt
+
+    _add(TokenKind.Keyword, ColorSchema.Keyword, bold=True)
+    _add(TokenKind.Type, ColorSchema.Type)
+    _add(TokenKind.String, ColorSchema.String)
+    _add(TokenKind.Number, ColorSchema.Number)
+    _add(TokenKind.Comment, ColorSchema.Comment, italic=True)
+    _add(TokenKind.Preprocessor, ColorSchema.Preprocessor)
+
+    return formats
+
+
+class SyntaxHighlighter():
+    """Highlight the lines from @firstLine of a text viewer lazily.
+    @lineText(lineNo) returns (text, offset[, sides]) of the code in the
+    line, None to skip the line and a None text to start over, such as
+    a new hunk. The old and new sides of a diff have their own states,
+    the ones at the end of each line are kept to resume the tokenizing
+    from any line"""
+
+    _formats = None
+
+    # the (old, new) states of the lexer
+    _initialState = (0, 0)
+
+    def __init__(self, lexer, lineText, firstLine=0):
+        self._lexer = lexer
+        self._lineText = lineText
+        self._firstLine = firstLine
+        # index from firstLine: (state at the start of the line, exact),
+        # the not exact ones are resumed from a guessed state
+        self._checkpoints = {0: (SyntaxHighlighter._initialState, True)}
+        # (index, state, exact) of the line after the last tokenized one
+        self._next = None
+        # lineNo: tokens
+        self._tokens = OrderedDict()
+
+    @property
+    def firstLine(self):
+        return self._firstLine
+
+    def setFirstLine(self, firstLine):
+        """the lines are moved to @firstLine"""
+        self._firstLine = firstLine
+        self._tokens.clear()
+
+    def invalidate(self, lineNo):
+        """the lines from @lineNo are changed"""
+        index = max(0, lineNo - self._firstLine)
+        for i in [i for i in self._checkpoints if i > index]:
+            del self._checkpoints[i]
+        if self._next and self._next[0] > index:
+            self._next = None
+        for n in [n for n in self._tokens if n >= lineNo]:
+            del self._tokens[n]
+
+    def _tokenize(self, lineNo, state):
+        item = self._lineText(lineNo)
+        if item is None:
+            return None, state
+        if item[0] is None:
+            return None, SyntaxHighlighter._initialState
+
+        text = item[0]
+        sides = item[2] if len(item) > 2 else LineSide.Both
+        oldState, newState = state
+        if sides == LineSide.Old:
+            tokens, oldState = self._lexer.tokenize(text, oldState)
+        elif sides == LineSide.New:
+            tokens, newState = self._lexer.tokenize(text, newState)
+        else:
+            # the context line is shown as the new one
+            tokens, newState = self._lexer.tokenize(text, newState)
+            if oldState == state[1]:
+                oldState = newState
+            else:
+                _, oldState = self._lexer.tokenize(text, oldState)
+
+        if item[1]:
+            for i in range(0, len(tokens), 3):
+                tokens[i] += item[1]
+        return tokens, (oldState, newState)
+
+    def _cacheTokens(self, lineNo, tokens, exact):
+        self._tokens[lineNo] = (tokens, exact)
+        if len(self._tokens) > MAX_CACHED_LINES:
+            self._tokens.popitem(False)
+
+    def _resumePoint(self, index):
+        """returns (index, state, exact) to tokenize from for @index,
+        the exact one goes first"""
+        lowest = max(0, index - MAX_RESYNC_LINES)
+        points = []
+        if self._next and lowest <= self._next[0] <= index:
+            points.append(self._next)
+
+        i = index - index % CHECKPOINT_LINES
+        guessed = False
+        while i >= lowest:
+            checkpoint = self._checkpoints.get(i)
+            if checkpoint and (checkpoint[1] or not guessed):
+                points.append((i,) + checkpoint)
+                if checkpoint[1]:
+                    break
+                guessed = True
+            i -= CHECKPOINT_LINES
+
+        if points:
+            return max(points, key=lambda point: (point[2], point[0]))
+
+        # too far, guess from a nearby line
+        return (lowest - lowest % CHECKPOINT_LINES,
+                SyntaxHighlighter._initialState, False)
+
+    def _setCheckpoint(self, index, state, exact):
+        """returns the (state, exact) to go on with"""
+        old = self._checkpoints.get(index)
+        if old:
+            if old[1] or old == (state, exact):
+                return old
+            if old[0] != state:
+                # the lines after a wrong guess are wrong too
+                self.invalidate(self._firstLine + index)
+
+        self._checkpoints[index] = (state, exact)
+        return state, exact
+
+    def tokens(self, lineNo):
+        """returns the tokens of @lineNo, None if not a code line"""
+        cached = self._tokens.get(lineNo)
+        if cached is not None:
+            self._tokens.move_to_end(lineNo)
+            if cached[1]:
+                return cached[0]
+
+        index = lineNo - self._firstLine
+        if index < 0:
+            return None
+
+        begin, state, exact = self._resumePoint(index)
+        # no better than the guessed one
+        if cached is not None and not exact:
+            return cached[0]
+
+        for i in range(begin, index + 1):
+            if i % CHECKPOINT_LINES == 0:
+                state, exact = self._setCheckpoint(i, state, exact)
+            tokens, state = self._tokenize(self._firstLine + i, state)
+            self._cacheTokens(self._firstLine + i, tokens, exact)
+
+        self._next = (index + 1, state, exact)
+        return tokens
+
+    def formats(self, lineNo):
+        """returns the format ranges of @lineNo"""
+        tokens = self.tokens(lineNo)
+        if not tokens:
+            return []
+
+        if SyntaxHighlighter._formats is None:
+            SyntaxHighlighter._formats = _createFormats()
+        formats = SyntaxHighlighter._formats
+
+        return [createFormatRange(tokens[i], tokens[i + 1],
+                                  formats[tokens[i + 2]])
+                for i in range(0, len(tokens), 3)]
@@ -268,10 +268,15 @@ class SourceTextLineBase(TextLine):
 
         self._crWidth = 0
         self._updateCRWidth()
+        self._highlighter = None
 
     def hasCR(self):
         return self._hasCR
 
+    def setHighlighter(self, highlighter):
+        self._highlighter = highlighter
+        self._rehighlight = True
+
     def setDefOption(self, option):
         super().setDefOption(option)
         self._updateCRWidth()
@@ -330,7 +335,10 @@ class SourceTextLineBase(TextLine):
             self._crWidth = 0
 
     def _commonHighlightFormats(self):
-        formats = []
+        if self._highlighter:
+            formats = self._highlighter.formats(self._lineNo)
+        else:
+            formats = []
 
         if self._defOption:
             if self._defOption.flags() & QTextOption.ShowTabsAndSpaces:
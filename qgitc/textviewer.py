@@ -170,6 +170,39 @@ class TextViewer(QAbstractScrollArea):
 
         self.viewport().update()
 
+    def replaceLines(self, lineNo, count, lines):
+        """replace @count lines from @lineNo with the raw @lines"""
+        delta = len(lines) - count
+        total = self.textLineCount()
+
+        textLines = {}
+        for n, textLine in self._textLines.items():
+            if n < lineNo:
+                textLines[n] = textLine
+            elif n >= lineNo + count:
+                textLine.setLineNo(n + delta)
+                textLines[n + delta] = textLine
+        self._textLines = textLines
+
+        if not self._lines:
+            self._lines = [None] * total
+        self._lines[lineNo:lineNo + count] = lines
+
+        # the line numbers are changed
+        self.cancelFind()
+        self._highlightFind.clear()
+        self._highlightLines = []
+        self._cursor.clear()
+
+        if self._convertTimerId is None:
+            self._convertIndex = lineNo
+            self._convertTimerId = self.startTimer(0)
+        else:
+            self._convertIndex = min(self._convertIndex, lineNo)
+
+        self._adjustScrollbars()
+        self.viewport().update()
+
     def beginReading(self):
         """ Call before reading lines to TextViewer """
         self._inReading = True
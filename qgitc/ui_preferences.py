@@ -43,6 +43,11 @@ class Ui_Preferences(object):
 
         self.verticalLayout_5.addWidget(self.cbState)
 
+        self.cbSlimLog = QCheckBox(self.groupBox_6)
+        self.cbSlimLog.setObjectName(u"cbSlimLog")
+
+        self.verticalLayout_5.addWidget(self.cbSlimLog)
+
         self.horizontalLayout_8 = QHBoxLayout()
         self.horizontalLayout_8.setObjectName(u"horizontalLayout_8")
         self.cbCheckUpdates = QCheckBox(self.groupBox_6)
@@ -124,6 +129,39 @@ class Ui_Preferences(object):
 
         self.verticalLayout_6.addLayout(self.horizontalLayout_3)
 
+        self.cbDiffStat = QCheckBox(self.groupBox_5)
+        self.cbDiffStat.setObjectName(u"cbDiffStat")
+
+        self.verticalLayout_6.addWidget(self.cbDiffStat)
+
+        self.horizontalLayout_9 = QHBoxLayout()
+        self.horizontalLayout_9.setObjectName(u"horizontalLayout_9")
+        self.label_15 = QLabel(self.groupBox_5)
+        self.label_15.setObjectName(u"label_15")
+
+        self.horizontalLayout_9.addWidget(self.label_15)
+
+        self.leCollapseFiles = QLineEdit(self.groupBox_5)
+        self.leCollapseFiles.setObjectName(u"leCollapseFiles")
+
+        self.horizontalLayout_9.addWidget(self.leCollapseFiles)
+
+        self.label_16 = QLabel(self.groupBox_5)
+        self.label_16.setObjectName(u"label_16")
+
+        self.horizontalLayout_9.addWidget(self.label_16)
+
+        self.sbMaxFileLines = QSpinBox(self.groupBox_5)
+        self.sbMaxFileLines.setObjectName(u"sbMaxFileLines")
+        self.sbMaxFileLines.setMaximum(10000000)
+        self.sbMaxFileLines.setSingleStep(1000)
+        self.sbMaxFileLines.setValue(10000)
+
+        self.horizontalLayout_9.addWidget(self.sbMaxFileLines)
+
+
+        self.verticalLayout_6.addLayout(self.horizontalLayout_9)
+
 
         self.verticalLayout.addWidget(self.groupBox_5)
 
@@ -442,6 +480,8 @@ class Ui_Preferences(object):
 #if QT_CONFIG(shortcut)
         self.label_10.setBuddy(self.sbTabSize)
         self.label_11.setBuddy(self.cbIgnoreWhitespace)
+        self.label_15.setBuddy(self.leCollapseFiles)
+        self.label_16.setBuddy(self.sbMaxFileLines)
         self.label_6.setBuddy(self.cbFamilyLog)
         self.label_7.setBuddy(self.cbSizeLog)
         self.label_9.setBuddy(self.cbSizeDiff)
@@ -456,10 +496,14 @@ class Ui_Preferences(object):
         QWidget.setTabOrder(self.colorB, self.buttonBox)
         QWidget.setTabOrder(self.buttonBox, self.cbEsc)
         QWidget.setTabOrder(self.cbEsc, self.cbState)
-        QWidget.setTabOrder(self.cbState, self.cbShowWhitespace)
+        QWidget.setTabOrder(self.cbState, self.cbSlimLog)
+        QWidget.setTabOrder(self.cbSlimLog, self.cbShowWhitespace)
         QWidget.setTabOrder(self.cbShowWhitespace, self.sbTabSize)
         QWidget.setTabOrder(self.sbTabSize, self.cbIgnoreWhitespace)
-        QWidget.setTabOrder(self.cbIgnoreWhitespace, self.cbFamilyDiff)
+        QWidget.setTabOrder(self.cbIgnoreWhitespace, self.cbDiffStat)
+        QWidget.setTabOrder(self.cbDiffStat, self.leCollapseFiles)
+        QWidget.setTabOrder(self.leCollapseFiles, self.sbMaxFileLines)
+        QWidget.setTabOrder(self.sbMaxFileLines, self.cbFamilyDiff)
         QWidget.setTabOrder(self.cbFamilyDiff, self.tabWidget)
         QWidget.setTabOrder(self.tabWidget, self.cbFamilyLog)
         QWidget.setTabOrder(self.cbFamilyLog, self.cbSizeLog)
@@ -480,6 +524,7 @@ class Ui_Preferences(object):
         self.groupBox_6.setTitle(QCoreApplication.translate("Preferences", u"Application", None))
         self.cbEsc.setText(QCoreApplication.translate("Preferences", u"&Quit also via Esc key", None))
         self.cbState.setText(QCoreApplication.translate("Preferences", u"&Remember window state", None))
+        self.cbSlimLog.setText(QCoreApplication.translate("Preferences", u"&Load commit details on demand", None))
         self.cbCheckUpdates.setText(QCoreApplication.translate("Preferences", u"Check updates every", None))
         self.label_14.setText(QCoreApplication.translate("Preferences", u"day(s)", None))
         self.groupBox_5.setTitle(QCoreApplication.translate("Preferences", u"Diff view", None))
@@ -489,6 +534,14 @@ class Ui_Preferences(object):
         self.cbIgnoreWhitespace.setItemText(0, QCoreApplication.translate("Preferences", u"None", None))
         self.cbIgnoreWhitespace.setItemText(1, QCoreApplication.translate("Preferences", u"At end of line", None))
         self.cbIgnoreWhitespace.setItemText(2, QCoreApplication.translate("Preferences", u"All", None))
+        self.cbDiffStat.setText(QCoreApplication.translate("Preferences", u"Show diff &statistics in file list", None))
+        self.label_15.setText(QCoreApplication.translate("Preferences", u"Colla&pse files:", None))
+#if QT_CONFIG(tooltip)
+        self.leCollapseFiles.setToolTip(QCoreApplication.translate("Preferences", u"Patterns separated by ';', such as *.lock;*.min.js", None))
+#endif // QT_CONFIG(tooltip)
+        self.label_16.setText(QCoreApplication.translate("Preferences", u"or diff &over:", None))
+        self.sbMaxFileLines.setSpecialValueText(QCoreApplication.translate("Preferences", u"Never", None))
+        self.sbMaxFileLines.setSuffix(QCoreApplication.translate("Preferences", u" lines", None))
 
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.tabGeneral), QCoreApplication.translate("Preferences", u"&General", None))
         self.groupBox_3.setTitle(QCoreApplication.translate("Preferences", u"Log view", None))
@@ -107,7 +107,7 @@ setup(name="qgitc",
       long_description=long_description,
       keywords="git conflict viewer",
       url="https://github.com/timxx/qgitc",
-      packages=find_packages(),
+      packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
       package_data={"qgitc": ["data/icons/qgitc.*",
                               "data/licenses/Apache-2.0.html",
                               "data/translations/*.qm"